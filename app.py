@@ -1,134 +1,681 @@
-from flask import Flask, render_template, request, jsonify
+import time
+
+# Inizio dell'avvio, per il riepilogo di ``flask startup`` e di /metrics
+_startup = time.perf_counter()
+
+from flask import Flask, g, render_template, request, jsonify, Response, url_for, send_file, stream_with_context
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
+import json
+import mimetypes
 import os
-import markdown
-import importlib.util
-import sys
+import atexit
+import click
+import functools
+import importlib
+import threading
 from pathlib import Path
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
-import numpy as np
+
+# numpy, matplotlib e Pillow non vengono importati qui: servono solo ai worker
+# delle simulazioni e, nel processo web, agli artifact (vedi ARTIFACT_LOADERS)
+from simkit.cache import ResultCache
+from simkit.content import ContentIndex
+from simkit import export, httpcache
+from simkit.executor import SimulationExecutor
+from simkit.figures import FigureStore, parse_formats
+from simkit.jobs import AdmissionError, JobManager, result_key
+from simkit.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry, SimulationMetrics, StartupTimer
+from simkit.notebook import CellCache
+from simkit.params import read_schema, validate
+from simkit.search import SearchIndex
 
 app = Flask(__name__)
+startup_timer = StartupTimer(_startup)
+startup_timer.mark('imports')
 
 # Configurazione
 PROJECTS_DIR = "projects"
 BLOG_DIR = "blog"
+CONTENT_REFRESH_INTERVAL = float(os.environ.get('CONTENT_REFRESH_INTERVAL', 2))
+RESPONSE_CACHE_MB = int(os.environ.get('RESPONSE_CACHE_MB', 32))
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.path.join('.cache', 'search.sqlite3'))
+SIMULATION_WORKERS = int(os.environ.get('SIMULATION_WORKERS', 0)) or None
+SIMULATION_TIMEOUT = int(os.environ.get('SIMULATION_TIMEOUT', 120))
+SIMULATION_MEMORY_MB = int(os.environ.get('SIMULATION_MEMORY_MB', 2048))
+SIMULATION_CACHE_DIR = os.environ.get('SIMULATION_CACHE_DIR', os.path.join('.cache', 'simulations'))
+SIMULATION_CACHE_MB = int(os.environ.get('SIMULATION_CACHE_MB', 512))
+SIMULATION_QUEUE_SIZE = int(os.environ.get('SIMULATION_QUEUE_SIZE', 0)) or None
+SIMULATION_CLIENT_LIMIT = int(os.environ.get('SIMULATION_CLIENT_LIMIT', 2))
+SIMULATION_CELL_CACHE_DIR = os.environ.get('SIMULATION_CELL_CACHE_DIR', os.path.join('.cache', 'cells'))
+SIMULATION_CELL_CACHE_MB = int(os.environ.get('SIMULATION_CELL_CACHE_MB', 512))
+SIMULATION_TRACE_FILE = os.environ.get('SIMULATION_TRACE_FILE')
+# Attesa massima delle richieste sincrone, coda compresa; il job prosegue in background
+SIMULATION_WAIT_TIMEOUT = int(os.environ.get('SIMULATION_WAIT_TIMEOUT', SIMULATION_TIMEOUT + 60))
+# Reverse proxy davanti all'app: l'indirizzo del client (e il suo limite di
+# simulazioni) viene da X-Forwarded-For, considerando solo gli hop fidati
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES,
+                            x_host=TRUSTED_PROXIES)
+
+SIMULATION_FIGURE_DIR = os.environ.get('SIMULATION_FIGURE_DIR', os.path.join('.cache', 'figures'))
+SIMULATION_FIGURE_MB = int(os.environ.get('SIMULATION_FIGURE_MB', 256))
+SIMULATION_FIGURE_FORMATS = parse_formats(os.environ.get('SIMULATION_FIGURE_FORMATS', 'png'))
+SIMULATION_FIGURE_DPI = int(os.environ.get('SIMULATION_FIGURE_DPI', 100))
+
+result_cache = ResultCache(SIMULATION_CACHE_DIR, max_bytes=SIMULATION_CACHE_MB * 1024 * 1024)
+figure_store = FigureStore(SIMULATION_FIGURE_DIR, max_bytes=SIMULATION_FIGURE_MB * 1024 * 1024)
+cell_cache = CellCache(SIMULATION_CELL_CACHE_DIR, max_bytes=SIMULATION_CELL_CACHE_MB * 1024 * 1024)
+startup_timer.mark('caches')
+
+# Metadati e HTML dei contenuti: niente scansioni né render a ogni richiesta
+content_index = ContentIndex({'project': PROJECTS_DIR, 'post': BLOG_DIR},
+                             refresh_interval=CONTENT_REFRESH_INTERVAL)
+startup_timer.mark('content_index')
+search_index = SearchIndex(SEARCH_INDEX_PATH, refresh_interval=CONTENT_REFRESH_INTERVAL)
+startup_timer.mark('search_index')
+response_cache = httpcache.ResponseCache(max_bytes=RESPONSE_CACHE_MB * 1024 * 1024)
+
+# Le figure sono indirizzate per contenuto: un URL non cambia mai significato
+FIGURE_MAX_AGE = 365 * 24 * 3600
+
+# Secondi tra due keep-alive sullo stream degli eventi
+SSE_KEEPALIVE = 15
+
+_executor = None
+_jobs = None
+_executor_lock = threading.Lock()
+
+# Metriche esposte da /metrics
+metrics_registry = Registry()
+simulation_metrics = SimulationMetrics(metrics_registry, trace_path=SIMULATION_TRACE_FILE)
+request_latency = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by route',
+    ('method', 'endpoint', 'status'))
+metrics_registry.counter('simulation_cache_hits_total', 'Simulation requests answered from the result cache',
+                         collect=lambda: _jobs.cache_hits if _jobs else 0)
+metrics_registry.counter('simulation_coalesced_total', 'Simulation requests attached to an identical running job',
+                         collect=lambda: _jobs.coalesced if _jobs else 0)
+metrics_registry.counter('simulation_rejected_total', 'Simulation requests rejected by admission control',
+                         collect=lambda: _jobs.rejected if _jobs else 0)
+metrics_registry.gauge('simulation_jobs_inflight', 'Simulation jobs running or queued',
+                       collect=lambda: _jobs.inflight if _jobs else 0)
+metrics_registry.counter('http_response_cache_total', 'Lookups in the compressed response cache', ('result',),
+                         collect=lambda: {('hit',): response_cache.hits, ('miss',): response_cache.misses})
+startup_timer.register(metrics_registry)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        request_latency.observe(time.perf_counter() - start, method=request.method,
+                                endpoint=request.endpoint or 'none', status=response.status_code)
+    return response
+
+def get_executor():
+    """Restituisce il pool di simulazione, avviandolo al primo utilizzo"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = SimulationExecutor(max_workers=SIMULATION_WORKERS,
+                                           timeout=SIMULATION_TIMEOUT,
+                                           memory_limit_mb=SIMULATION_MEMORY_MB,
+                                           figure_formats=SIMULATION_FIGURE_FORMATS,
+                                           figure_dpi=SIMULATION_FIGURE_DPI,
+                                           cell_cache=cell_cache)
+            _executor.start()
+            atexit.register(_executor.shutdown)
+        return _executor
+
+def get_jobs():
+    """Restituisce il gestore dei job di simulazione"""
+    global _jobs
+    executor = get_executor()
+    with _executor_lock:
+        if _jobs is None:
+            _jobs = JobManager(executor, figure_store, cache=result_cache,
+                               max_pending=SIMULATION_QUEUE_SIZE,
+                               max_per_client=SIMULATION_CLIENT_LIMIT,
+                               metrics=simulation_metrics)
+            atexit.register(_jobs.shutdown)
+        return _jobs
 
 def load_content_data(content_type, content_id):
-    """Carica i dati di un progetto o articolo"""
-    if content_type == 'project':
-        base_path = Path(PROJECTS_DIR) / content_id
+    """Carica i dati di un progetto o articolo dall'indice dei contenuti"""
+    entry = content_index.get(content_type, content_id)
+    if entry is None:
+        return {
+            'id': content_id,
+            'name': content_id.replace('_', ' ').title(),
+            'type': content_type,
+            'content': '',
+            'has_simulation': False,
+            'sim_file': None
+        }
+    return dict(entry.to_dict(), content=entry.html())
+
+def template_paths(name):
+    """File da cui dipende una pagina: il suo template e base.html"""
+    folder = os.path.join(app.root_path, app.template_folder)
+    return [os.path.join(folder, name), os.path.join(folder, 'base.html')]
+
+def conditional_response(sources, render, mimetype='text/html; charset=utf-8', extra=''):
+    """Risposta con ETag e Last-Modified derivati dai file sorgente
+
+    Se il client ha già la versione corrente risponde 304 senza generare
+    nulla; altrimenti il corpo, compresso con la codifica negoziata, viene
+    dalla cache delle risposte e ``render`` (che restituisce str o bytes) è
+    chiamata solo quando i sorgenti cambiano.
+    """
+    etag, last_modified = httpcache.validators(sources, extra=request.path + extra)
+    compress = httpcache.compressible(mimetype)
+    encoding = httpcache.negotiate(request.accept_encodings) if compress else None
+
+    # Ogni codifica è una variante diversa, con il suo ETag forte
+    def variant_etag(encoding):
+        return f'{etag}-{encoding}' if encoding else etag
+
+    response = Response(mimetype=mimetype)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if compress:
+        response.vary.add('Accept-Encoding')
+
+    # Un corpo piccolo viene inviato non compresso anche se il client accetta
+    # la codifica: vale quindi anche l'ETag della variante non compressa
+    if request.if_none_match:
+        matched = [tag for tag in {variant_etag(encoding), etag} if request.if_none_match.contains(tag)]
+        not_modified = bool(matched)
     else:
-        base_path = Path(BLOG_DIR) / content_id
-    
-    data = {
-        'id': content_id,
-        'name': content_id.replace('_', ' ').title(),
-        'type': content_type,
-        'content': '',
-        'has_simulation': False
-    }
-    
-    # Cerca file master.md
-    master_files = list(base_path.glob("*_master.md"))
-    if master_files:
-        master_path = master_files[0]
-        with open(master_path, 'r', encoding='utf-8') as f:
-            data['content'] = markdown.markdown(f.read(), extensions=['extra'])
-    
-    # Cerca file sim.py
-    sim_files = list(base_path.glob("*_sim.py"))
-    data['has_simulation'] = len(sim_files) > 0
-    data['sim_file'] = sim_files[0].name if sim_files else None
-    
-    return data
+        matched = []
+        not_modified = (last_modified is not None and request.if_modified_since is not None
+                        and request.if_modified_since >= last_modified)
+    if not_modified:
+        response.set_etag(matched[0] if matched else
+                          variant_etag(response_cache.encoding_for(etag, encoding)))
+        response.status_code = 304
+        return response
+
+    def render_bytes():
+        body = render()
+        return body.encode('utf-8') if isinstance(body, str) else body
+
+    encoding, body = response_cache.variant(etag, encoding, render_bytes)
+    response.set_etag(variant_etag(encoding))
+    response.set_data(body)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return conditional_response(template_paths('index.html'), lambda: render_template('index.html'))
+
+def listing_response(template, content_type, name):
+    """Elenco di progetti o articoli; cambia quando cambia l'insieme dei contenuti"""
+    entries = content_index.list(content_type)
+    items = [entry.to_dict() for entry in entries]
+    return conditional_response(template_paths(template) + [entry.path for entry in entries],
+                                lambda: render_template(template, **{name: items}),
+                                extra=json.dumps(items, sort_keys=True))
 
 @app.route('/portfolio')
 def portfolio():
-    projects = []
-    if os.path.exists(PROJECTS_DIR):
-        for project_dir in os.listdir(PROJECTS_DIR):
-            if os.path.isdir(os.path.join(PROJECTS_DIR, project_dir)):
-                projects.append(load_content_data('project', project_dir))
-    return render_template('portfolio.html', projects=projects)
+    return listing_response('portfolio.html', 'project', 'projects')
 
 @app.route('/blog')
 def blog():
-    posts = []
-    if os.path.exists(BLOG_DIR):
-        for post_dir in os.listdir(BLOG_DIR):
-            if os.path.isdir(os.path.join(BLOG_DIR, post_dir)):
-                posts.append(load_content_data('post', post_dir))
-    return render_template('blog.html', posts=posts)
+    return listing_response('blog.html', 'post', 'posts')
+
+def render_content(content_type, content_id, frozen=None):
+    """Pagina di un progetto o articolo; ``frozen`` è il risultato statico della simulazione"""
+    content_data = load_content_data(content_type, content_id)
+    return render_template('content_detail.html', content=content_data, frozen=frozen)
+
+def content_url(content_type, content_id):
+    """URL della pagina di un progetto o articolo"""
+    if content_type == 'project':
+        return url_for('project_detail', project_id=content_id)
+    return url_for('post_detail', post_id=content_id)
+
+def content_response(content_type, content_id):
+    """Pagina di un contenuto; cambia con il master, i template e i metadati dell'indice"""
+    entry = content_index.get(content_type, content_id)
+    sources = template_paths('content_detail.html')
+    extra = ''
+    if entry is not None:
+        if entry.master_path is not None:
+            sources.append(entry.master_path)
+        extra = json.dumps(entry.to_dict(), sort_keys=True)
+    return conditional_response(sources, lambda: render_content(content_type, content_id), extra=extra)
 
 @app.route('/project/<project_id>')
 def project_detail(project_id):
-    content_data = load_content_data('project', project_id)
-    return render_template('content_detail.html', content=content_data)
+    return content_response('project', project_id)
 
 @app.route('/post/<post_id>')
 def post_detail(post_id):
-    content_data = load_content_data('post', post_id)
-    return render_template('content_detail.html', content=content_data)
+    return content_response('post', post_id)
+
+def static_file(filename):
+    """File statico; CSS, JS e SVG con validatori e compressione negoziata
+
+    Gli altri file e quelli mancanti passano dalla vista di Flask, con le sue
+    risposte di errore.
+    """
+    path = safe_join(app.static_folder, filename)
+    mimetype = mimetypes.guess_type(path or filename)[0] or 'application/octet-stream'
+    if path is None or not os.path.isfile(path) or not httpcache.compressible(mimetype):
+        return app.send_static_file(filename)
+    return conditional_response([path], lambda: Path(path).read_bytes(), mimetype=mimetype)
+
+# Sostituisce la vista della route /static/ registrata da Flask
+app.view_functions['static'] = static_file
+
+@app.route('/search')
+def search():
+    """Ricerca full-text nei master, ordinata per rilevanza: ``?q=...&type=project|post&limit=N``"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    content_type = request.args.get('type')
+    if content_type not in (None, 'project', 'post'):
+        return jsonify({'error': f'Unknown content type: {content_type}'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    search_index.sync(content_index.list('project') + content_index.list('post'))
+    results = search_index.search(query, limit=limit, content_type=content_type)
+    for result in results:
+        result['url'] = content_url(result['type'], result['id'])
+    return jsonify({'query': query, 'results': results})
+
+def find_simulation(content_type, content_id):
+    """Restituisce il percorso dello script di simulazione o None"""
+    entry = content_index.get('project' if content_type == 'project' else 'post', content_id)
+    return entry.simulation_path if entry else None
+
+# Modalità di esecuzione: formati delle figure (None = quelli configurati)
+SIMULATION_MODES = {'figures': None, 'data': ()}
+
+def simulation_mode():
+    """Formati delle figure per la modalità richiesta con ``?mode=figures|data``"""
+    mode = request.args.get('mode', 'figures')
+    if mode not in SIMULATION_MODES:
+        raise ValueError(f"Unknown simulation mode: {mode!r}")
+    return SIMULATION_MODES[mode]
+
+def request_params(simulation_path):
+    """Modifiche ai parametri della richiesta, validate con lo schema dello script
+
+    Nei POST arrivano nel corpo JSON (``{"params": {...}}``), nei GET nella
+    query ``?params=`` in JSON. Restituisce None se non ci sono modifiche.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        overrides = body.get('params') if isinstance(body, dict) else None
+    else:
+        raw = request.args.get('params')
+        try:
+            overrides = json.loads(raw) if raw else None
+        except json.JSONDecodeError:
+            raise ValueError('params must be a JSON object')
+    if overrides is None:
+        return None
+    schema = read_schema(simulation_path)
+    if schema is None:
+        raise ValueError('This simulation does not accept parameters')
+    return validate(schema, overrides) or None
+
+def busy_response(error):
+    """Risposta 429 a una richiesta rifiutata dal controllo di ammissione"""
+    return jsonify({'error': str(error), 'retry_after': error.retry_after}), 429, \
+        {'Retry-After': str(error.retry_after)}
+
+def figure_urls(figure):
+    """URL di ciascun formato di una figura salvata"""
+    return {fmt: url_for('figure', name=name) for fmt, name in figure.items()}
+
+def encode_event(kind, data):
+    """Converte un evento del job nel payload JSON per il client"""
+    if kind == 'figure':
+        return {'plot': figure_urls(data)}
+    if kind == 'stdout':
+        return {'line': data}
+    return {'value': data}
+
+def job_response(job):
+    """Risultato di un job concluso nel formato di /run_simulation"""
+    if job.error:
+        return jsonify({'error': job.error}), 504 if job.timed_out else 500
+    return jsonify({
+        'success': True,
+        'plots': [figure_urls(figure) for figure in job.result['figures']],
+        'output': job.result['output'],
+        'solutions': sorted(job.result.get('solutions', {})),
+        'series': sorted(job.result.get('series', {})),
+        'animations': sorted(job.result.get('animations', {})),
+        'cached': job.cached
+    })
 
 @app.route('/run_simulation/<content_type>/<content_id>', methods=['POST'])
 def run_simulation(content_type, content_id):
     """Esegue la simulazione"""
     try:
-        if content_type == 'project':
-            base_path = Path(PROJECTS_DIR) / content_id
-        else:
-            base_path = Path(BLOG_DIR) / content_id
-        
-        # Cerca file sim.py
-        sim_files = list(base_path.glob("*_sim.py"))
-        if not sim_files:
+        simulation_path = find_simulation(content_type, content_id)
+        if simulation_path is None:
             return jsonify({'error': 'Simulation file not found'}), 404
+        try:
+            figure_formats = simulation_mode()
+            params = request_params(simulation_path)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        simulation_path = sim_files[0]
-        
-        # Esegue la simulazione
-        spec = importlib.util.spec_from_file_location("simulation", simulation_path)
-        simulation_module = importlib.util.module_from_spec(spec)
-        
-        # Cattura output e plots
-        output_capture = io.StringIO()
-        old_stdout = sys.stdout
-        sys.stdout = output_capture
-        
-        plot_images = []
+        # Esegue la simulazione in un worker isolato, riusando la cache e
+        # agganciandosi a un'esecuzione identica già in corso
         try:
-            spec.loader.exec_module(simulation_module)
-            
-            # Cattura i plot di matplotlib
-            for fig_num in plt.get_fignums():
-                img_buffer = io.BytesIO()
-                plt.figure(fig_num).savefig(img_buffer, format='png', bbox_inches='tight', dpi=100)
-                img_buffer.seek(0)
-                plot_images.append(base64.b64encode(img_buffer.getvalue()).decode('utf-8'))
-                plt.close(fig_num)
-            
-            output_text = output_capture.getvalue()
-            
-            return jsonify({
-                'success': True,
-                'plots': plot_images,
-                'output': output_text
-            })
-            
-        finally:
-            sys.stdout = old_stdout
-            plt.close('all')
+            job = get_jobs().submit(simulation_path, figure_formats, params,
+                                    client=request.remote_addr)
+        except AdmissionError as e:
+            return busy_response(e)
+        if not job.wait(SIMULATION_WAIT_TIMEOUT):
+            return jsonify({'error': 'Simulation still running, follow the job for its result',
+                            'job_id': job.id,
+                            'status_url': url_for('job_status', job_id=job.id)}), 504
+        return job_response(job)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<content_type>/<content_id>', methods=['POST'])
+def submit_job(content_type, content_id):
+    """Avvia una simulazione in background e restituisce subito l'id del job"""
+    simulation_path = find_simulation(content_type, content_id)
+    if simulation_path is None:
+        return jsonify({'error': 'Simulation file not found'}), 404
+    try:
+        figure_formats = simulation_mode()
+        params = request_params(simulation_path)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        job = get_jobs().submit(simulation_path, figure_formats, params, client=request.remote_addr)
+    except AdmissionError as e:
+        return busy_response(e)
+    data = job.to_dict()
+    data.update({
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id),
+        'events_url': url_for('job_events', job_id=job.id)
+    })
+    return jsonify(data), 202
+
+@app.route('/parameters/<content_type>/<content_id>')
+def simulation_parameters(content_type, content_id):
+    """Schema dei parametri di una simulazione parametrizzata"""
+    simulation_path = find_simulation(content_type, content_id)
+    if simulation_path is None:
+        return jsonify({'error': 'Simulation file not found'}), 404
+    schema = read_schema(simulation_path)
+    if schema is None:
+        return jsonify({'error': 'This simulation does not accept parameters'}), 404
+    return jsonify({'parameters': schema})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job.done:
+        return jsonify(job.to_dict()), 202
+    return job_response(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream Server-Sent Events con stdout, figure e stato del job"""
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Un id malformato o negativo riparte dal primo evento
+    try:
+        start = max(int(request.headers.get('Last-Event-ID', 0)), 0)
+    except ValueError:
+        start = 0
+    
+    def stream():
+        index = start
+        while True:
+            events = job.wait_events(index, timeout=SSE_KEEPALIVE)
+            if not events:
+                if job.done:
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            for kind, data in events:
+                index += 1
+                payload = json.dumps(encode_event(kind, data))
+                yield f'id: {index}\nevent: {kind}\ndata: {payload}\n\n'
+                if kind in ('done', 'error'):
+                    return
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def metrics():
+    """Metriche in formato testo Prometheus"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/figures/<name>')
+def figure(name):
+    """Figura salvata, con ETag uguale al suo hash e caching immutabile"""
+    path = figure_store.path(name)
+    if path is None:
+        return jsonify({'error': 'Figure not found'}), 404
+    response = send_file(path, mimetype=FigureStore.mimetype(name), etag=FigureStore.etag(name),
+                         max_age=FIGURE_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Modulo e classe che caricano ciascun tipo di oggetto pubblicato dagli script,
+# importati alla prima richiesta perché dipendono da numpy (e Pillow)
+ARTIFACT_LOADERS = {'solutions': ('simkit.dense', 'DenseSolution'),
+                    'series': ('simkit.series', 'SeriesSet'),
+                    'animations': ('simkit.animation', 'Animation')}
+
+@functools.lru_cache(maxsize=32)
+def load_artifact(kind, path, mtime_ns):
+    """Oggetto salvato in cache, tenuto in memoria per gli zoom successivi"""
+    module, name = ARTIFACT_LOADERS[kind]
+    return getattr(importlib.import_module(module), name).load(path)
+
+def find_artifact(simulation_path, kind, name, params=None):
+    """Oggetto pubblicato dall'ultima esecuzione dello script con i parametri dati, in qualunque modalità"""
+    for figure_formats in (SIMULATION_FIGURE_FORMATS, ()):
+        key = result_key(result_cache, simulation_path, figure_formats, SIMULATION_FIGURE_DPI, params)
+        path = result_cache.artifact_path(key, kind, name)
+        try:
+            if path is not None:
+                return load_artifact(kind, str(path), path.stat().st_mtime_ns)
+        except OSError:  # Voce rimossa da un'eviction concorrente
+            continue
+    return None
+
+def find_sheet(simulation_path, name, params=None):
+    """Nome nell'archivio delle figure della sprite sheet di un'animazione, salvata con il risultato"""
+    for figure_formats in (SIMULATION_FIGURE_FORMATS, ()):
+        key = result_key(result_cache, simulation_path, figure_formats, SIMULATION_FIGURE_DPI, params)
+        sheet = result_cache.sheet(key, name)
+        if sheet is not None and figure_store.exists([sheet]):
+            return sheet
+    return None
+
+@app.route('/solutions/<content_type>/<content_id>/<name>')
+def solution_samples(content_type, content_id, name):
+    """Ricampiona una soluzione densa pubblicata dall'ultima esecuzione
+
+    Parametri della query: ``start`` e ``stop`` (finestra temporale, default
+    l'intera simulazione), ``points`` (numero di campioni, default 1000) e
+    ``params`` (parametri dell'esecuzione, in JSON).
+    """
+    simulation_path = find_simulation(content_type, content_id)
+    if simulation_path is None:
+        return jsonify({'error': 'Simulation file not found'}), 404
+    
+    try:
+        solution = find_artifact(simulation_path, 'solutions', name, request_params(simulation_path))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if solution is None:
+        return jsonify({'error': 'Solution not available, run the simulation first'}), 404
+    
+    try:
+        start = request.args.get('start', type=float)
+        stop = request.args.get('stop', type=float)
+        points = request.args.get('points', 1000, type=int)
+        series = solution.resample(start, stop, points)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'name': name,
+        't_min': solution.t_min,
+        't_max': solution.t_max,
+        'series': {key: values.tolist() for key, values in series.items()}
+    })
+
+@app.route('/series/<content_type>/<content_id>/<name>')
+def series_data(content_type, content_id, name):
+    """Serie di un grafico, decimate sulla finestra richiesta, in formato binario
+
+    Parametri della query: ``start`` e ``stop`` (finestra temporale), ``points``
+    (punti per serie, default 1000), ``method`` (``lttb`` o ``minmax``) e
+    ``params`` (parametri dell'esecuzione, in JSON). Il formato della
+    risposta è descritto in ``simkit.series``.
+    """
+    simulation_path = find_simulation(content_type, content_id)
+    if simulation_path is None:
+        return jsonify({'error': 'Simulation file not found'}), 404
+    
+    try:
+        series = find_artifact(simulation_path, 'series', name, request_params(simulation_path))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if series is None:
+        return jsonify({'error': 'Series not available, run the simulation first'}), 404
+    
+    try:
+        data = series.frame(request.args.get('start', type=float),
+                            request.args.get('stop', type=float),
+                            request.args.get('points', 1000, type=int),
+                            request.args.get('method', 'lttb'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(data, mimetype='application/octet-stream')
+
+@app.route('/animations/<content_type>/<content_id>/<name>')
+def animation(content_type, content_id, name):
+    """Informazioni per riprodurre un'animazione pubblicata dall'ultima esecuzione
+
+    La sprite sheet è salvata nell'archivio delle figure insieme al risultato,
+    così è servita da /figures con caching immutabile.
+    """
+    simulation_path = find_simulation(content_type, content_id)
+    if simulation_path is None:
+        return jsonify({'error': 'Simulation file not found'}), 404
+    
+    try:
+        params = request_params(simulation_path)
+        animation = find_artifact(simulation_path, 'animations', name, params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    sheet = find_sheet(simulation_path, name, params) if animation is not None else None
+    if sheet is None:
+        return jsonify({'error': 'Animation not available, run the simulation first'}), 404
+    
+    return jsonify(dict(animation.meta, name=name, sheet_url=url_for('figure', name=sheet)))
+
+def freeze_simulation(simulation_path, output_dir):
+    """Esegue una volta la simulazione e copia le figure nell'esportazione"""
+    job = get_jobs().submit(simulation_path)
+    if not job.wait(SIMULATION_WAIT_TIMEOUT):
+        return {'error': 'Simulation did not finish in time'}
+    if job.error:
+        return {'error': job.error}
+    for figure in job.result['figures']:
+        for name in figure.values():
+            export.copy_file(figure_store.path(name), output_dir, url_for('figure', name=name))
+    return {
+        'output': job.result['output'],
+        'plots': [figure_urls(figure) for figure in job.result['figures']]
+    }
+
+def export_content(entry, output_dir, simulate=True):
+    """Pagina statica di un contenuto, con il risultato della simulazione incorporato"""
+    frozen = None
+    if entry.has_simulation and simulate:
+        click.echo(f'Running simulation {entry.simulation_path}')
+        frozen = freeze_simulation(entry.simulation_path, output_dir)
+    return render_content(entry.type, entry.id, frozen=frozen)
+
+@app.cli.command('export')
+@click.argument('output_dir', default='dist')
+@click.option('--no-simulations', is_flag=True, help='Non esegue le simulazioni.')
+def export_site(output_dir, no_simulations):
+    """Esporta il sito statico in OUTPUT_DIR, pronto per un CDN"""
+    try:
+        export.clean(output_dir)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    assets = export.hash_assets(app.static_folder, output_dir, app.static_url_path + '/')
+
+    with app.test_request_context():
+        pages = [(url_for('index'), index), (url_for('portfolio'), portfolio), (url_for('blog'), blog)]
+        for entry in content_index.list('project') + content_index.list('post'):
+            pages.append((content_url(entry.type, entry.id),
+                          functools.partial(export_content, entry, output_dir, not no_simulations)))
+
+    for path, view in pages:
+        with app.test_request_context(path):
+            html = app.make_response(view()).get_data(as_text=True)
+        export.write_page(output_dir, path, html, assets)
+        click.echo(f'Exported {path}')
+
+    sizes = export.compress_tree(output_dir)
+    original, compressed = sum(size[0] for size in sizes), sum(size[1] for size in sizes)
+    click.echo(f'{len(pages)} pages, {len(assets)} assets, {len(sizes)} files precompressed '
+               f'({original / 1024:.0f} KB -> {compressed / 1024:.0f} KB with gzip'
+               f'{"" if export.brotli else "; brotli not installed, .br files skipped"})')
+
+@app.cli.command('startup')
+def startup_report():
+    """Riepilogo dei tempi di avvio del processo web"""
+    report = startup_timer.report()
+    for phase, seconds in report['phases'].items():
+        click.echo(f'{phase:<16}{seconds * 1000:>9.1f} ms')
+    click.echo(f"{'total':<16}{report['total'] * 1000:>9.1f} ms")
+    memory = report['resident_memory']
+    click.echo(f"{report['modules']} modules loaded, "
+               f"resident memory {f'{memory / 2 ** 20:.1f} MB' if memory else 'n/a'}")
+    click.echo(f"Heavy modules: {', '.join(report['heavy_modules']) or 'none'}")
+
+startup_timer.mark('routes')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
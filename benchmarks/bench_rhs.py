@@ -0,0 +1,74 @@
+"""Microbenchmark della funzione del sistema US6758109
+
+Misura il costo per chiamata di ``system_dynamics`` (parametri letti dal
+dizionario a ogni chiamata) e della closure di ``compile_dynamics`` con la sua
+Jacobiana analitica, poi il tempo di una integrazione completa con metodi
+espliciti e impliciti.
+
+Uso:
+    python benchmarks/bench_rhs.py [--calls 100000] [--rtol 1e-6]
+"""
+import argparse
+import sys
+import time
+import timeit
+from pathlib import Path
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'projects' / 'US6758109')]
+
+import US6758109_model as model  # noqa: E402
+
+
+def per_call(fn, calls):
+    """Tempo per chiamata in microsecondi (migliore di 5 ripetizioni)"""
+    return min(timeit.repeat(fn, number=calls, repeat=5)) / calls * 1e6
+
+
+def timed_solve(label, **kwargs):
+    start = time.perf_counter()
+    sol = solve_ivp(**kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36}{elapsed * 1e3:>10.1f}{sol.nfev:>8}{sol.njev:>6}")
+    return sol
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    params = model.PARAMS
+    rhs, jac = model.compile_dynamics(params)
+    state = np.array([1.3, 25.0])
+
+    print(f"{'funzione':<36}{'µs/chiamata':>12}")
+    reference = per_call(lambda: model.system_dynamics(0.0, state, params), args.calls)
+    print(f"{'system_dynamics (dizionario)':<36}{reference:>12.2f}")
+    compiled = per_call(lambda: rhs(0.0, state), args.calls)
+    print(f"{'compile_dynamics: rhs':<36}{compiled:>12.2f}  ({reference / compiled:.1f}x)")
+    print(f"{'compile_dynamics: jac':<36}{per_call(lambda: jac(0.0, state), args.calls):>12.2f}")
+
+    common = {
+        't_span': (0, params['t_max']),
+        'y0': [params['theta_d0'], params['omega_d0']],
+        't_eval': model.time_grid(params),
+        'rtol': args.rtol,
+        'atol': args.rtol * 1e-3
+    }
+    print(f"\n{'integrazione':<36}{'ms':>10}{'nfev':>8}{'njev':>6}")
+    timed_solve('RK45, system_dynamics', fun=model.system_dynamics, args=(params,),
+                method='RK45', **common)
+    timed_solve('RK45, rhs compilata', fun=rhs, method='RK45', **common)
+    timed_solve('Radau, Jacobiana alle diff. finite', fun=rhs, method='Radau', **common)
+    timed_solve('Radau, Jacobiana analitica', fun=rhs, jac=jac, method='Radau', **common)
+    timed_solve('BDF, Jacobiana analitica', fun=rhs, jac=jac, method='BDF', **common)
+    timed_solve('LSODA, Jacobiana analitica', fun=rhs, jac=jac, method='LSODA', **common)
+
+
+if __name__ == '__main__':
+    main()
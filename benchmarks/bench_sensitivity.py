@@ -0,0 +1,82 @@
+"""Benchmark dell'analisi di sensibilità US6758109: ciclo di solve_ivp contro batch
+
+Confronta, sulla stessa griglia 4×10 della cella 7, le 40 chiamate sequenziali a
+solve_ivp con l'integrazione simultanea di solve_ivp_batch (un batch per
+parametro e un unico batch per l'intero studio), riportando tempi, speedup e
+scarto relativo massimo delle metriche.
+
+Lo schema è lo stesso di RK45, ma con le tolleranze di default la traiettoria
+non è convergente: differenze di arrotondamento nella sequenza dei passi si
+amplificano fino a qualche decina di punti percentuali sulla forza massima.
+Con tolleranze strette (ad esempio ``--rtol 1e-8 --atol 1e-10``) lo scarto
+scende al livello dell'arrotondamento.
+
+Uso:
+    python benchmarks/bench_sensitivity.py [--repeat 3] [--rtol 1e-3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'projects' / 'US6758109')]
+
+import US6758109_model as model  # noqa: E402
+
+
+def best_time(fn, repeat):
+    """Tempo minimo su ``repeat`` esecuzioni e risultato dell'ultima"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def max_relative_error(reference, results):
+    errors = []
+    for param, metrics in reference.items():
+        for name, values in metrics.items():
+            values = np.asarray(values)
+            errors.append(np.max(np.abs(values - np.asarray(results[param][name])) /
+                                 np.maximum(np.abs(values), 1e-12)))
+    return float(max(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--rtol', type=float, default=1e-3)
+    parser.add_argument('--atol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    params = model.PARAMS
+    ranges = model.SENSITIVITY_RANGES
+    tol = {'rtol': args.rtol, 'atol': args.atol}
+
+    loop_time, loop = best_time(lambda: {
+        name: model.sensitivity_analysis(name, values, params, **tol)
+        for name, values in ranges.items()}, args.repeat)
+    per_param_time, per_param = best_time(lambda: {
+        name: model.sensitivity_analysis_batch(name, values, params, **tol)
+        for name, values in ranges.items()}, args.repeat)
+    study_time, study = best_time(
+        lambda: model.sensitivity_study_batch(ranges, params, **tol), args.repeat)
+
+    n_runs = sum(len(values) for values in ranges.values())
+    print(f"Griglia: {len(ranges)} parametri × {n_runs // len(ranges)} valori "
+          f"(rtol={args.rtol:g}, atol={args.atol:g}, best of {args.repeat})")
+    print(f"{'variante':<28}{'tempo [s]':>12}{'speedup':>10}{'scarto max':>14}")
+    print(f"{'solve_ivp in ciclo':<28}{loop_time:>12.3f}{1:>10.1f}{0:>14.2e}")
+    print(f"{'solve_ivp_batch per param.':<28}{per_param_time:>12.3f}"
+          f"{loop_time / per_param_time:>10.1f}{max_relative_error(loop, per_param):>14.2e}")
+    print(f"{'solve_ivp_batch unico':<28}{study_time:>12.3f}"
+          f"{loop_time / study_time:>10.1f}{max_relative_error(loop, study):>14.2e}")
+
+
+if __name__ == '__main__':
+    main()
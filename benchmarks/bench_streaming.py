@@ -0,0 +1,78 @@
+"""Memoria della post-elaborazione: array completi contro pipeline a blocchi
+
+Confronta il picco di memoria (tracemalloc) e il tempo delle statistiche della
+cella 9 calcolate come nel notebook, con tutte le serie derivate sull'intera
+griglia, e con ``stream_postprocess``, che valuta la soluzione densa a blocchi.
+
+Uso:
+    python benchmarks/bench_streaming.py [--samples 1000000 4000000] [--chunk 65536]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'projects' / 'US6758109')]
+
+import US6758109_model as model  # noqa: E402
+
+
+def full_arrays(params, n_samples):
+    """Come il notebook: serie intere e np.gradient sulla velocità"""
+    rhs, _ = model.compile_dynamics(params)
+    t_eval = np.linspace(0, params['t_max'], n_samples)
+    sol = solve_ivp(rhs, (0, params['t_max']), [params['theta_d0'], params['omega_d0']],
+                    t_eval=t_eval)
+    theta_d, omega_d = sol.y
+    alpha_d = np.gradient(omega_d, t_eval)
+    q = model.derived_quantities(theta_d, omega_d, alpha_d, params)
+    steady = t_eval > params['t_max'] * 0.7
+    return {'max_force': np.max(q['F_N']), 'steady_force': np.mean(q['F_N'][steady])}
+
+
+def streamed(params, n_samples, chunk, spill_dir=None):
+    spill = ('F_N', 'omega_d') if spill_dir else ()
+    stats = model.stream_postprocess(params, n_samples, chunk, spill=spill,
+                                     spill_dir=spill_dir)['stats']
+    return {'max_force': stats['F_N']['all']['max'],
+            'steady_force': stats['F_N']['steady']['mean']}
+
+
+def measure(fn, *args):
+    """Tempo senza tracemalloc (che rallenta il codice Python), poi il picco di memoria"""
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, nargs='+', default=[100000, 1000000, 4000000])
+    parser.add_argument('--chunk', type=int, default=65536)
+    args = parser.parse_args()
+
+    params = model.PARAMS
+    print(f"{'campioni':>10}  {'variante':<20}{'s':>8}{'MiB picco':>12}{'F_N max':>12}{'F_N regime':>12}")
+    for n in args.samples:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            for label, fn, extra in (('array completi', full_arrays, ()),
+                                     ('a blocchi', streamed, (args.chunk,)),
+                                     ('a blocchi + .npy', streamed, (args.chunk, spill_dir))):
+                result, elapsed, peak = measure(fn, params, n, *extra)
+                print(f"{n:>10}  {label:<20}{elapsed:>8.2f}{peak:>12.1f}"
+                      f"{result['max_force']:>12.4f}{result['steady_force']:>12.4f}")
+
+
+if __name__ == '__main__':
+    main()
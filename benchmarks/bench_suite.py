@@ -0,0 +1,328 @@
+"""Suite di benchmark di PatentInsight con confronto rispetto a una baseline
+
+Misura le pagine (``load_content_data``, render markdown dei master, pagina di
+dettaglio dal test client), le simulazioni end-to-end (latenza di
+``/run_simulation`` a freddo e dalla cache, throughput con richieste
+concorrenti) e il codice del modello a camma eseguito dal sito e dal notebook:
+costo per chiamata dell'RHS compilato, la ``solve_ivp`` di
+``US6758109_sim.simulate``, l'intero ``simulate`` (integrazione, serie e
+animazione, senza il processo worker) e l'analisi di sensibilità a batch della
+cella 7.
+
+L'app gira con cache, figure e indice di ricerca in una cartella temporanea,
+per cui ogni esecuzione parte dallo stesso stato; le simulazioni a freddo usano
+parametri diversi a ogni richiesta per non colpire la cache. Per ogni caso
+viene salvata la mediana (più minimo, massimo e p95) in JSON insieme a
+versioni, CPU e commit; con una baseline vengono segnalati i casi la cui
+mediana peggiora oltre la soglia, e il comando termina con codice 1.
+
+Uso:
+    python benchmarks/bench_suite.py [--only simulation] [--output results.json]
+    python benchmarks/bench_suite.py --save-baseline     # aggiorna benchmarks/baseline.json
+    python benchmarks/bench_suite.py --threshold 0.25    # confronta con la baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'projects' / 'US6758109')]
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+SIMULATION = ('project', 'US6758109')
+
+
+def timed(fn, iterations, warmup=1):
+    """Tempi [s] di ``iterations`` chiamate dopo ``warmup`` chiamate di riscaldamento"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    data = {
+        'median': statistics.median(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'n': len(ordered)
+    }
+    if len(ordered) >= 20:
+        data['p95'] = ordered[int(0.95 * (len(ordered) - 1))]
+    return data
+
+
+class Context:
+    """App Flask e modello condivisi dai casi, con lo stato in una cartella temporanea"""
+
+    def __init__(self, workers):
+        self._tmp = tempfile.TemporaryDirectory(prefix='patentinsight-bench-')
+        tmp = Path(self._tmp.name)
+        os.environ.update({
+            'SIMULATION_WORKERS': str(workers),
+            'SIMULATION_CACHE_DIR': str(tmp / 'simulations'),
+            'SIMULATION_FIGURE_DIR': str(tmp / 'figures'),
+            'SIMULATION_CELL_CACHE_DIR': str(tmp / 'cells'),
+            'SEARCH_INDEX_PATH': str(tmp / 'search.sqlite3'),
+            'SIMULATION_QUEUE_SIZE': '1000',
+        })
+        self._cwd = os.getcwd()
+        os.chdir(ROOT)
+        import app
+        import US6758109_model as model
+        self.app = app
+        self.model = model
+        self.client = app.app.test_client()
+        self._tau = 0.5
+        self._tau_lock = threading.Lock()
+
+    def fresh_params(self):
+        """Parametri mai usati prima, per forzare un'esecuzione vera"""
+        with self._tau_lock:
+            self._tau += 0.001
+            return {'tau_m': round(self._tau, 6)}
+
+    def run(self, params=None, client=None, address='127.0.0.1'):
+        client = client or self.client
+        response = client.post(f'/run_simulation/{SIMULATION[0]}/{SIMULATION[1]}',
+                               json={'params': params} if params else None,
+                               environ_base={'REMOTE_ADDR': address})
+        if response.status_code != 200:
+            raise RuntimeError(f'run_simulation returned {response.status_code}: {response.get_data(as_text=True)}')
+        return response.get_json()
+
+    def close(self):
+        if self.app._jobs is not None:
+            self.app._jobs.shutdown()
+        if self.app._executor is not None:
+            self.app._executor.shutdown()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+
+# Casi: nome -> funzione(ctx, args) che restituisce i campioni [s] o un dict
+# con 'value', 'unit' e 'higher_is_better'
+
+def content_load(ctx, args):
+    return timed(lambda: ctx.app.load_content_data(*SIMULATION), args.iterations * 20)
+
+
+def content_markdown(ctx, args):
+    import markdown
+    texts = [entry.master_path.read_text(encoding='utf-8')
+             for content_type in ('project', 'post') for entry in ctx.app.content_index.list(content_type)
+             if entry.master_path is not None]
+    return timed(lambda: [markdown.markdown(text, extensions=['extra']) for text in texts], args.iterations)
+
+
+def page_detail(ctx, args):
+    url = f'/project/{SIMULATION[1]}'
+    return timed(lambda: ctx.client.get(url, headers={'Accept-Encoding': 'gzip'}), args.iterations * 20)
+
+
+def simulation_cold(ctx, args):
+    return timed(lambda: ctx.run(ctx.fresh_params()), args.iterations)
+
+
+def simulation_cached(ctx, args):
+    return timed(lambda: ctx.run(), args.iterations * 20)
+
+
+def simulation_throughput(ctx, args):
+    """Esecuzioni al secondo con ``--concurrency`` client che inviano parametri diversi"""
+    requests = args.concurrency * max(args.iterations // 2, 2)
+
+    def worker(index):
+        client = ctx.app.app.test_client()
+        latencies = []
+        for _ in range(requests // args.concurrency):
+            start = time.perf_counter()
+            ctx.run(ctx.fresh_params(), client=client, address=f'10.0.0.{index + 1}')
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    ctx.run(ctx.fresh_params())
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = [latency for result in pool.map(worker, range(args.concurrency)) for latency in result]
+    elapsed = time.perf_counter() - start
+    return {'value': len(latencies) / elapsed, 'unit': 'runs/s', 'higher_is_better': True,
+            'latency': summary(latencies), 'concurrency': args.concurrency}
+
+
+def model_rhs(ctx, args):
+    """RHS compilato integrato da ``model.simulate``, per chiamata"""
+    import numpy as np
+    rhs, _ = ctx.model.compile_dynamics(ctx.model.PARAMS)
+    state = np.array([1.3, 25.0])
+    calls = 20000
+    runs = timeit.repeat(lambda: rhs(0.0, state), number=calls, repeat=max(args.iterations, 5))
+    return [run / calls for run in runs]
+
+
+def model_solve(ctx, args):
+    """L'integrazione di ``US6758109_sim.simulate``"""
+    model = ctx.model
+    t_eval = model.time_grid(model.PARAMS)
+    return timed(lambda: model.simulate(model.PARAMS, t_eval=t_eval, dense_output=True), args.iterations)
+
+
+def model_simulate(ctx, args):
+    """``US6758109_sim.simulate`` in modalità dati, come nel worker ma senza processo"""
+    import contextlib
+    import io
+    import US6758109_sim as sim
+    from simkit import params, runtime
+    resolved = params.resolve(sim.PARAMETERS)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), runtime.collect(figures=False):
+            sim.simulate(resolved)
+    return timed(run, args.iterations)
+
+
+def model_sensitivity(ctx, args):
+    """Le analisi di sensibilità a batch della cella 7 del notebook"""
+    model = ctx.model
+    t_eval = model.time_grid(model.PARAMS)
+    return timed(lambda: {name: model.sensitivity_analysis_batch(name, values, model.PARAMS, t_eval=t_eval)
+                          for name, values in model.SENSITIVITY_RANGES.items()},
+                 max(args.iterations // 2, 1), warmup=0)
+
+
+CASES = {
+    'content.load_content_data': content_load,
+    'content.markdown_render': content_markdown,
+    'page.project_detail': page_detail,
+    'simulation.run_cold': simulation_cold,
+    'simulation.run_cached': simulation_cached,
+    'simulation.throughput': simulation_throughput,
+    'model.rhs_call': model_rhs,
+    'model.solve_ivp': model_solve,
+    'model.simulate': model_simulate,
+    'model.sensitivity_analysis_batch': model_sensitivity,
+}
+
+
+def environment():
+    import numpy
+    import scipy
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'scipy': scipy.__version__,
+    }
+
+
+def measure(names, args):
+    ctx = Context(args.workers)
+    results = {}
+    try:
+        for name in names:
+            print(f'{name} ...', end=' ', flush=True)
+            outcome = CASES[name](ctx, args)
+            if isinstance(outcome, dict):
+                results[name] = dict(outcome, median=outcome['value'])
+            else:
+                results[name] = dict(summary(outcome), unit='s', higher_is_better=False)
+            print(format_value(results[name]['median'], results[name]['unit']))
+    finally:
+        ctx.close()
+    return results
+
+
+def format_value(value, unit):
+    if unit != 's':
+        return f'{value:.2f} {unit}'
+    for scale, suffix in ((1, 's'), (1e-3, 'ms'), (1e-6, 'µs')):
+        if value >= scale:
+            return f'{value / scale:.2f} {suffix}'
+    return f'{value * 1e9:.0f} ns'
+
+
+def compare(results, baseline, threshold):
+    """Stampa il confronto con la baseline; restituisce i casi peggiorati"""
+    regressions = []
+    print(f"\n{'caso':<30}{'baseline':>14}{'attuale':>14}{'variazione':>12}")
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<30}{'-':>14}{format_value(current['median'], current['unit']):>14}")
+            continue
+        change = current['median'] / reference['median'] - 1
+        worse = -change if current.get('higher_is_better') else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSIONE'
+            regressions.append(name)
+        elif worse < -threshold:
+            flag = '  miglioramento'
+        print(f"{name:<30}{format_value(reference['median'], reference['unit']):>14}"
+              f"{format_value(current['median'], current['unit']):>14}{change:>+12.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', default=[],
+                        help='Esegue solo i casi il cui nome contiene una di queste stringhe')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--output', type=Path, help='File JSON dei risultati')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Salva i risultati come baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Peggioramento relativo della mediana oltre cui un caso è una regressione')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.only or any(part in name for part in args.only)]
+    if not names:
+        parser.error(f"no case matches {' '.join(args.only)}; available: {', '.join(CASES)}")
+    report = {'environment': environment(), 'results': measure(names, args)}
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        print(f'\nBaseline salvata in {args.baseline}')
+        return 0
+    if not args.baseline.exists():
+        print(f'\nNessuna baseline in {args.baseline}: eseguire con --save-baseline per crearla')
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    print(f"\nBaseline: commit {baseline['environment'].get('commit')} del {baseline['environment'].get('created')}")
+    regressions = compare(report['results'], baseline['results'], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressioni oltre il {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
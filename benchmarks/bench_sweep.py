@@ -0,0 +1,56 @@
+"""Throughput dello sweep multidimensionale sul modello US6758109
+
+Valuta un Latin hypercube su I_b, e, b_d, mu e tau_m con ``simkit.sweep`` e
+riporta i progetti valutati al minuto.
+
+Uso:
+    python benchmarks/bench_sweep.py [--designs 2000] [--chunk-size 256] [--workers N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'projects' / 'US6758109')]
+
+import US6758109_model as model  # noqa: E402
+from simkit.sweep import latin_hypercube, run_sweep  # noqa: E402
+
+BOUNDS = {
+    'I_b': (0.005, 0.02),
+    'e': (0.01, 0.05),
+    'b_d': (0.005, 0.02),
+    'mu': (0.05, 0.2),
+    'tau_m': (0.2, 1.0)
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--designs', type=int, default=2000)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', help='File .npz o .csv in cui salvare la tabella')
+    args = parser.parse_args()
+
+    design = latin_hypercube(BOUNDS, args.designs, seed=0)
+    start = time.perf_counter()
+    table = run_sweep(model.sweep_metrics, design, model.PARAMS,
+                      chunk_size=args.chunk_size, max_workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(table)} progetti in {elapsed:.2f} s ({len(table) / elapsed * 60:.0f} progetti/min)")
+    best = table['efficiency'].argmax()
+    print("Efficienza media massima: " + ", ".join(
+        f"{name}={table[name][best]:.4g}" for name in table.design_columns + table.metric_columns))
+
+    if args.output:
+        if args.output.endswith('.csv'):
+            table.save_csv(args.output)
+        else:
+            table.save_npz(args.output)
+
+
+if __name__ == '__main__':
+    main()
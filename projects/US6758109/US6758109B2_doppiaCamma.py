@@ -7,107 +7,38 @@ Script prodotto da DeepSeek alla [chat](https://chat.deepseek.com/a/chat/s/08e3b
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.integrate import solve_ivp           # scipy.integrate.solve_ivp per integrare le equazioni differenziali
-from matplotlib.animation import FuncAnimation  # per creare animazioni del sistema
-from IPython.display import HTML               # per mostrare le animazioni in un notebook
 import matplotlib.gridspec as gridspec         # per creare layout di grafici complessi
+import US6758109_model as model                 # parametri, equazioni e analisi del modello (unica definizione)
+from simkit.runtime import publish_solution     # soluzione densa ricampionabile dal sito
+from simkit.runtime import publish_series       # serie numeriche per i grafici interattivi
+from simkit.runtime import publish_animation    # animazione pre-renderizzata in una sprite sheet
 
 ## Cella 2: Definizione dei parametri del sistema
 
-# Parametri fisici del sistema (basati su stime ingegneristiche fatte da DeepSeek)
-params = {
-    # Momenti d'inerzia
-    'I_d': 0.1,      # Momento d'inerzia del tamburo [kg·m²]
-    'I_b': 0.01,     # Momento d'inerzia del blocco [kg·m²]
-
-    # Masse
-    'M_b': 0.5,      # Massa del blocco (include albero e follower) [kg]
-
-    # Dimensioni geometriche
-    'R_d': 0.1,      # Raggio del tamburo [m]
-    'e': 0.02,       # Eccentricità [m]
-    'r_f': 0.01,     # Raggio dei follower [m]
-
-    # Coefficienti di attrito
-    'b_d': 0.01,     # Coefficiente di attrito viscoso del tamburo [N·m·s/rad]
-    'b_b': 0.001,    # Coefficiente di attrito viscoso del blocco [N·m·s/rad]
-    'mu': 0.1,       # Coefficiente di attrito radente tra follower e camma
-
-    # Parametri della legge di moto cicloidale
-    'H': np.pi/2,    # Rotazione totale del blocco [rad]
-    'beta': np.pi,   # Rotazione del tamburo per completare la corsa [rad]
-
-    # Parametri di simulazione
-    't_max': 10,     # Tempo massimo di simulazione [s]
-    'theta_d0': 0,   # Posizione angolare iniziale del tamburo [rad]
-    'omega_d0': 0,   # Velocità angolare iniziale del tamburo [rad/s]
-
-    # Coppia motrice
-    'tau_m': 0.5     # Coppia motrice applicata [N·m] (costante per questa simulazione)
-}
+# Parametri fisici del sistema (basati su stime ingegneristiche fatte da DeepSeek), definiti
+# con le unità di misura in US6758109_model.PARAMS: momenti d'inerzia I_d e I_b, massa del
+# blocco M_b, geometria (R_d, e, r_f), attriti (b_d, b_b, mu), legge di moto cicloidale (H, β),
+# durata e condizioni iniziali della simulazione e coppia motrice tau_m
+params = dict(model.PARAMS)
 
 ## Cella 3: Definizione delle funzioni della legge di moto
 Queste funzioni definiscono il vincolo cinematico tra la rotazione del tamburo e la rotazione del blocco.
 
-# Funzioni del profilo cicloidale e derivate
-def f_cycloidal(theta_d, H, beta):
-    """Profilo cicloidale per la legge di moto"""
-    return H * (theta_d/beta - 1/(2*np.pi) * np.sin(2*np.pi*theta_d/beta))
-
-def f_prime(theta_d, H, beta):
-    """Derivata prima del profilo cicloidale"""
-    return H/beta * (1 - np.cos(2*np.pi*theta_d/beta))
-
-def f_double_prime(theta_d, H, beta):
-    """Derivata seconda del profilo cicloidale"""
-    return (2*np.pi*H)/(beta**2) * np.sin(2*np.pi*theta_d/beta)
+# Profilo cicloidale ψ = f(θ_d) = H·(θ_d/β − sin(2π·θ_d/β)/2π) e sue derivate f' e f''
+from US6758109_model import f_cycloidal, f_prime, f_double_prime
 
 ## Cella 4: Definizione del modello dinamico
 Questa funzione implementa le equazioni differenziali del sistema derivato dal formalismo Lagrangiano. Calcola le derivate dello stato (velocità e accelerazione angolare) in base allo stato corrente e ai parametri del sistema.
 
-def system_dynamics(t, state, params):
-    """
-    Calcola le derivate dello stato per il sistema a camma.
-
-    Args:
-        t: Tempo [s]
-        state: Vettore di stato [theta_d, omega_d]
-        params: Dizionario dei parametri del sistema
-
-    Returns:
-        dstate: Derivata del vettore di stato [dtheta_d/dt, domega_d/dt]
-    """
-    theta_d, omega_d = state
-
-    # Estrai i parametri
-    I_d = params['I_d']
-    I_b = params['I_b']
-    M_b = params['M_b']
-    R_d = params['R_d']
-    b_d = params['b_d']
-    tau_m = params['tau_m']
-    H = params['H']
-    beta = params['beta']
-
-    # Calcola le funzioni del profilo della camma e derivate
-    f_val = f_cycloidal(theta_d, H, beta)
-    f_p = f_prime(theta_d, H, beta)
-    f_pp = f_double_prime(theta_d, H, beta)
-
-    # Calcola l'inerzia efficace
-    J_eff = I_d + M_b * R_d**2 + I_b * f_p**2
-
-    # Calcola la coppia inerziale interna
-    C_inertial = I_b * f_p * f_pp * omega_d**2
-
-    # Calcola l'accelerazione angolare
-    alpha_d = (tau_m - C_inertial - b_d * omega_d) / J_eff
-
-    return [omega_d, alpha_d]
+# Con l'inerzia efficace J_eff = I_d + M_b·R_d² + I_b·f'² e la coppia inerziale interna
+# C = I_b·f'·f''·ω_d², l'accelerazione del tamburo è α_d = (tau_m − C − b_d·ω_d) / J_eff
+from US6758109_model import system_dynamics
 
 ## Cella 5: Simulazione del sistema
 In questa cella eseguiamo la simulazione numerica del sistema:
 1. Impostiamo le condizioni iniziali e il tempo di simulazione
-2. Risolviamo le equazioni differenziali con solve_ivp
+2. Risolviamo le equazioni differenziali con solve_ivp, conservando l'interpolante denso
+   che viene pubblicato per ricampionare la soluzione su qualunque finestra temporale
 3. Calcoliamo le variabili dipendenti (posizione, velocità e accelerazione del blocco)
 4. Calcoliamo la forza di contatto tra follower e camma
 5. Calcoliamo le potenze in gioco e l'efficienza del sistema
@@ -118,32 +49,23 @@ t_span = (0, params['t_max'])
 t_eval = np.linspace(0, params['t_max'], 1000)
 
 # Risolvi le equazioni differenziali
-sol = solve_ivp(system_dynamics, t_span, initial_state, args=(params,), t_eval=t_eval, method='RK45')
+sol = solve_ivp(system_dynamics, t_span, initial_state, args=(params,), t_eval=t_eval, method='RK45',
+                dense_output=True)
+publish_solution('state', sol, ['theta_d', 'omega_d'])
 
 # Estrai i risultati
 theta_d_sol = sol.y[0]
 omega_d_sol = sol.y[1]
 alpha_d_sol = np.gradient(omega_d_sol, t_eval)  # Calcola l'accelerazione per differenziazione numerica
 
-# Calcola le variabili dipendenti
-psi_sol = f_cycloidal(theta_d_sol, params['H'], params['beta'])
-omega_b_sol = f_prime(theta_d_sol, params['H'], params['beta']) * omega_d_sol
-alpha_b_sol = f_double_prime(theta_d_sol, params['H'], params['beta']) * omega_d_sol**2 + f_prime(theta_d_sol, params['H'], params['beta']) * alpha_d_sol
-
-# Calcola la forza di contatto
-F_N_sol = (params['I_b'] * alpha_b_sol + params['b_b'] * omega_b_sol) / params['e']
-
-# Calcola le potenze
-P_in_sol = params['tau_m'] * omega_d_sol
-P_diss_drum_sol = params['b_d'] * omega_d_sol**2
-P_diss_block_sol = params['b_b'] * omega_b_sol**2
-P_diss_friction_sol = params['mu'] * F_N_sol * params['r_f'] * np.abs(omega_b_sol)
-P_total_diss_sol = P_diss_drum_sol + P_diss_block_sol + P_diss_friction_sol
-P_eff_sol = P_in_sol - P_total_diss_sol
-
-# Calcola l'efficienza evitando divisioni per zero
-efficiency_sol = np.divide(P_eff_sol, P_in_sol, out=np.zeros_like(P_eff_sol),
-                          where=(P_in_sol > 1e-10) & (np.abs(P_eff_sol) > 1e-10))
+# Calcola le variabili dipendenti, la forza di contatto, le potenze e l'efficienza
+# (quest'ultima evitando divisioni per zero)
+q = model.derived_quantities(theta_d_sol, omega_d_sol, alpha_d_sol, params)
+psi_sol, omega_b_sol, alpha_b_sol = q['psi'], q['omega_b'], q['alpha_b']
+F_N_sol = q['F_N']
+P_in_sol, P_total_diss_sol, P_eff_sol = q['P_in'], q['P_total_diss'], q['P_eff']
+P_diss_drum_sol, P_diss_block_sol, P_diss_friction_sol = q['P_diss_drum'], q['P_diss_block'], q['P_diss_friction']
+efficiency_sol = q['efficiency']
 
 ## Cella 6: Visualizzazione dei risultati
 Questa cella crea una visualizzazione completa dei risultati della simulazione con sei grafici che mostrano:
@@ -154,6 +76,12 @@ Questa cella crea una visualizzazione completa dei risultati della simulazione c
 5. Il bilancio energetico del sistema
 6. L'efficienza del sistema
 
+Le stesse serie vengono pubblicate anche come dati, per i grafici interattivi del sito.
+
+# Serie dei sei grafici, disegnate dal browser nella modalità dati
+for name, chart in model.chart_series(t_eval, theta_d_sol, omega_d_sol, alpha_d_sol, q).items():
+    publish_series(name, **chart)
+
 # Configura il plotting
 plt.style.use('seaborn-v0_8')
 fig = plt.figure(figsize=(10, 6))   #15,12
@@ -227,62 +155,18 @@ Questa cella esegue un'analisi di sensibilità per comprendere come la variazion
 - Coefficiente di attrito del tamburo (b_d)
 - Coefficiente di attrito radente (mu)
 
-Per ogni parametro, visualizziamo come cambiano la forza di contatto massima e l'efficienza del sistema.
-
-# Funzione per eseguire l'analisi di sensibilità
-def sensitivity_analysis(param_name, param_values, params):
-    """Esegue l'analisi di sensibilità variando un parametro"""
-    results = {
-        'max_force': [],
-        'avg_power': [],
-        'max_power': [],
-        'efficiency': []
-    }
-
-    for value in param_values:
-        # Aggiorna il parametro
-        modified_params = params.copy()
-        modified_params[param_name] = value
-
-        # Esegui la simulazione
-        sol = solve_ivp(system_dynamics, t_span, initial_state, args=(modified_params,),
-                       t_eval=t_eval, method='RK45')
-
-        # Calcola le quantità di interesse
-        theta_d = sol.y[0]
-        omega_d = sol.y[1]
-        alpha_d = np.gradient(omega_d, t_eval)
-
-        psi = f_cycloidal(theta_d, modified_params['H'], modified_params['beta'])
-        omega_b = f_prime(theta_d, modified_params['H'], modified_params['beta']) * omega_d
-        alpha_b = f_double_prime(theta_d, modified_params['H'], modified_params['beta']) * omega_d**2 + f_prime(theta_d, modified_params['H'], modified_params['beta']) * alpha_d
-
-        F_N = (modified_params['I_b'] * alpha_b + modified_params['b_b'] * omega_b) / modified_params['e']
-        P_in = modified_params['tau_m'] * omega_d
-        P_diss = modified_params['b_d'] * omega_d**2 + modified_params['b_b'] * omega_b**2 + modified_params['mu'] * F_N * modified_params['r_f'] * np.abs(omega_b)
-        efficiency = np.mean(np.where(P_in > 0, (P_in - P_diss) / P_in, 0))
-
-        # Salva i risultati
-        results['max_force'].append(np.max(F_N))
-        results['avg_power'].append(np.mean(P_in))
-        results['max_power'].append(np.max(P_in))
-        results['efficiency'].append(efficiency)
-
-    return results
-
-# Esegui l'analisi di sensibilità per alcuni parametri chiave
+Per ogni parametro, visualizziamo come cambiano la forza di contatto massima e l'efficienza del sistema. Le dieci varianti di ciascun parametro vengono integrate in un'unica chiamata a solve_ivp_batch invece che con dieci solve_ivp in sequenza (model.sensitivity_analysis_batch).
+
+# Esegui l'analisi di sensibilità per alcuni parametri chiave: momento d'inerzia del
+# blocco, eccentricità, attrito del tamburo e attrito radente
 param_names = ['I_b', 'e', 'b_d', 'mu']
-param_ranges = {
-    'I_b': np.linspace(0.005, 0.02, 10),      # Momento d'inerzia del blocco
-    'e': np.linspace(0.01, 0.05, 10),         # Eccentricità
-    'b_d': np.linspace(0.005, 0.02, 10),      # Attrito del tamburo
-    'mu': np.linspace(0.05, 0.2, 10)          # Attrito radente
-}
+param_ranges = model.SENSITIVITY_RANGES
 
 # Esegui tutte le analisi di sensibilità
 sensitivity_results = {}
 for param in param_names:
-    sensitivity_results[param] = sensitivity_analysis(param, param_ranges[param], params)
+    sensitivity_results[param] = model.sensitivity_analysis_batch(param, param_ranges[param], params,
+                                                                  t_eval=t_eval)
 
 # Visualizza i risultati dell'analisi di sensibilità
 fig, axes = plt.subplots(2, 2, figsize=(10, 6))   # 12, 10
@@ -316,76 +200,14 @@ Questa cella crea un'animazione che mostra il movimento del sistema nel tempo. V
 - I due follower (punti verdi che seguono il profilo della camma)
 - La traiettoria del follower (linea verde tratteggiata)
 
-# Creazione di un'animazione semplice del sistema
-fig, ax = plt.subplots(figsize=(6, 6))   # 8,8
-ax.set_xlim(-0.15, 0.15)
-ax.set_ylim(-0.15, 0.15)
-ax.set_aspect('equal')
-ax.grid(True)
-
-# Disegna la camma fissa (cerchio)
-camma_circle = plt.Circle((0, 0), params['R_d'], fill=False, color='black', linestyle='--')
-ax.add_patch(camma_circle)
-
-# Inizializza gli elementi dell'animazione
-drum, = ax.plot([], [], 'bo-', markersize=10)  # Tamburo
-block, = ax.plot([], [], 'ro-', markersize=8)  # Blocco
-follower1, = ax.plot([], [], 'go', markersize=6)  # Follower 1
-follower2, = ax.plot([], [], 'go', markersize=6)  # Follower 2
-trajectory, = ax.plot([], [], 'g:', alpha=0.5)  # Traiettoria del blocco
-
-# Inizializza la traiettoria
-traj_x, traj_y = [], []
-
-def init():
-    drum.set_data([], [])
-    block.set_data([], [])
-    follower1.set_data([], [])
-    follower2.set_data([], [])
-    trajectory.set_data([], [])
-    return drum, block, follower1, follower2, trajectory
-
-def animate(i):
-    # Indice per l'animazione (usa solo una parte dei dati per velocizzare)
-    idx = i * 10
-
-    # Posizione del tamburo (semplificata come rotazione attorno all'origine)
-    drum_angle = theta_d_sol[idx]
-    drum_x = 0
-    drum_y = 0
-
-    # Posizione del centro del blocco
-    block_angle = theta_d_sol[idx]
-    block_x = params['R_d'] * np.cos(block_angle)
-    block_y = params['R_d'] * np.sin(block_angle)
-
-    # Posizione dei follower
-    psi_angle = psi_sol[idx]
-    follower1_x = block_x + params['e'] * np.cos(block_angle + psi_angle)
-    follower1_y = block_y + params['e'] * np.sin(block_angle + psi_angle)
-
-    follower2_x = block_x + params['e'] * np.cos(block_angle + psi_angle + np.pi)
-    follower2_y = block_y + params['e'] * np.sin(block_angle + psi_angle + np.pi)
-
-    # Aggiorna i dati di plot
-    drum.set_data([drum_x], [drum_y])
-    block.set_data([block_x], [block_y])
-    follower1.set_data([follower1_x], [follower1_y])
-    follower2.set_data([follower2_x], [follower2_y])
-
-    # Aggiorna la traiettoria
-    if i > 0:
-        traj_x.append(follower1_x)
-        traj_y.append(follower1_y)
-        trajectory.set_data(traj_x, traj_y)
-
-    return drum, block, follower1, follower2, trajectory
-
-# Crea l'animazione (limitata ai primi 100 frame per efficienza)
-ani = FuncAnimation(fig, animate, frames=100, init_func=init, blit=True, interval=50)
-
-# Per visualizzare l'animazione in Jupyter Notebook
-HTML(ani.to_jshtml())
+# Posizioni di tutti i fotogrammi calcolate in un colpo solo (vettoriale), usando un
+# campione ogni 10 per i primi 100 fotogrammi: camma fissa (cerchio tratteggiato),
+# tamburo, blocco, follower e traiettoria del follower 1
+scene = model.animation_scene(theta_d_sol, psi_sol, params)
+
+# I fotogrammi sono renderizzati una sola volta e salvati con il risultato:
+# la pagina li riproduce a 20 fotogrammi al secondo (50 ms ciascuno)
+publish_animation('sistema', scene, fps=20, title='Animazione del sistema')
 
 ## Cella 9: Conclusioni e osservazioni
 
@@ -421,6 +243,16 @@ print(f"Forza di contatto massima: {np.max(F_N_sol):.2f} N")
 print(f"Potenza media in ingresso: {np.mean(P_in_sol[steady_state_mask]):.3f} W")
 print(f"Efficienza media: {np.mean(efficiency_sol[steady_state_mask]):.2%}")
 
+# Il regime vero si può calcolare direttamente su un solo periodo di camma β, cercando
+# l'orbita periodica con lo shooting sulla mappa di Poincaré: con la costante di tempo
+# (I_d + M_b·R_d²)/b_d ≈ 10 s il transitorio di t_max secondi non è ancora esaurito.
+# Senza attrito viscoso del tamburo (b_d = 0) la velocità cresce senza limite e non c'è regime.
+if params['b_d'] > 0:
+    regime = model.steady_state(params)
+    print(f"Velocità angolare media sull'orbita periodica: {regime['omega_d_mean']:.3f} rad/s")
+else:
+    print("Orbita periodica: nessun regime senza attrito viscoso del tamburo (b_d = 0)")
+
 ### 2. Dati transitori iniziali
 
 startup_mask = t_eval < params['t_max'] * 0.3  # Primo 30% della simulazione
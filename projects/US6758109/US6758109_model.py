@@ -0,0 +1,622 @@
+"""Modello dinamico del dispositivo a camma US6758109B2
+
+Unica definizione di parametri, equazioni, grafici e analisi delle celle 2-8 di
+US6758109B2_doppiaCamma.py: il notebook le importa da qui, come la simulazione
+del sito e gli strumenti di analisi (benchmark, sweep, ottimizzazione). Le
+funzioni accettano parametri scalari oppure array con una variante per elemento.
+"""
+import math
+
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import minimize
+
+from simkit.animation import Scene
+from simkit.ode_batch import solve_ivp_batch
+from simkit.sensitivity import complex_step, solve_forward_sensitivity
+from simkit.shooting import periodic_orbit
+
+# Parametri fisici del sistema (cella 2)
+PARAMS = {
+    'I_d': 0.1,      # Momento d'inerzia del tamburo [kg·m²]
+    'I_b': 0.01,     # Momento d'inerzia del blocco [kg·m²]
+    'M_b': 0.5,      # Massa del blocco (include albero e follower) [kg]
+    'R_d': 0.1,      # Raggio del tamburo [m]
+    'e': 0.02,       # Eccentricità [m]
+    'r_f': 0.01,     # Raggio dei follower [m]
+    'b_d': 0.01,     # Coefficiente di attrito viscoso del tamburo [N·m·s/rad]
+    'b_b': 0.001,    # Coefficiente di attrito viscoso del blocco [N·m·s/rad]
+    'mu': 0.1,       # Coefficiente di attrito radente tra follower e camma
+    'H': np.pi/2,    # Rotazione totale del blocco [rad]
+    'beta': np.pi,   # Rotazione del tamburo per completare la corsa [rad]
+    't_max': 10,     # Tempo massimo di simulazione [s]
+    'theta_d0': 0,   # Posizione angolare iniziale del tamburo [rad]
+    'omega_d0': 0,   # Velocità angolare iniziale del tamburo [rad/s]
+    'tau_m': 0.5     # Coppia motrice applicata [N·m]
+}
+
+# Metodi di solve_ivp che usano la Jacobiana
+IMPLICIT_METHODS = ('Radau', 'BDF', 'LSODA')
+
+# Parametri di progetto supportati dall'ottimizzazione con sensitività
+DESIGN_PARAMS = ('I_b', 'e', 'b_d', 'mu', 'tau_m')
+
+# Intervalli dell'analisi di sensibilità (cella 7)
+SENSITIVITY_RANGES = {
+    'I_b': np.linspace(0.005, 0.02, 10),
+    'e': np.linspace(0.01, 0.05, 10),
+    'b_d': np.linspace(0.005, 0.02, 10),
+    'mu': np.linspace(0.05, 0.2, 10)
+}
+
+
+def f_cycloidal(theta_d, H, beta):
+    """Profilo cicloidale per la legge di moto"""
+    return H * (theta_d/beta - 1/(2*np.pi) * np.sin(2*np.pi*theta_d/beta))
+
+
+def f_prime(theta_d, H, beta):
+    """Derivata prima del profilo cicloidale"""
+    return H/beta * (1 - np.cos(2*np.pi*theta_d/beta))
+
+
+def f_double_prime(theta_d, H, beta):
+    """Derivata seconda del profilo cicloidale"""
+    return (2*np.pi*H)/(beta**2) * np.sin(2*np.pi*theta_d/beta)
+
+
+def system_dynamics(t, state, params):
+    """
+    Calcola le derivate dello stato per il sistema a camma.
+
+    Con ``state`` di shape (2, n) e parametri array di shape (n,) valuta
+    l'intero batch in una chiamata.
+
+    Args:
+        t: Tempo [s]
+        state: Vettore di stato [theta_d, omega_d]
+        params: Dizionario dei parametri del sistema
+
+    Returns:
+        dstate: Derivata del vettore di stato [dtheta_d/dt, domega_d/dt]
+    """
+    theta_d, omega_d = state
+
+    I_d = params['I_d']
+    I_b = params['I_b']
+    M_b = params['M_b']
+    R_d = params['R_d']
+    b_d = params['b_d']
+    tau_m = params['tau_m']
+    H = params['H']
+    beta = params['beta']
+
+    f_p = f_prime(theta_d, H, beta)
+    f_pp = f_double_prime(theta_d, H, beta)
+
+    J_eff = I_d + M_b * R_d**2 + I_b * f_p**2
+    C_inertial = I_b * f_p * f_pp * omega_d**2
+    alpha_d = (tau_m - C_inertial - b_d * omega_d) / J_eff
+
+    return [omega_d, alpha_d]
+
+
+def compile_dynamics(params):
+    """Compila ``system_dynamics`` per un insieme fisso di parametri
+
+    I parametri vengono letti una sola volta e le costanti (2π/β, H/β, 2πH/β²
+    e l'inerzia costante I_d + M_b·R_d²) precalcolate nella closure; il
+    profilo cicloidale è valutato con un solo seno e coseno per chiamata.
+
+    Returns:
+        (rhs, jac): derivate dello stato e Jacobiana analitica, entrambe con
+        firma ``f(t, state)`` come richiesto da ``solve_ivp``
+    """
+    k = 2*math.pi / params['beta']
+    h1 = params['H'] / params['beta']
+    h2 = 2*math.pi * params['H'] / params['beta']**2
+    h3 = h2 * k
+    J0 = params['I_d'] + params['M_b'] * params['R_d']**2
+    I_b = params['I_b']
+    b_d = params['b_d']
+    tau_m = params['tau_m']
+    sin, cos = math.sin, math.cos
+
+    def rhs(t, state):
+        theta_d, omega_d = state.tolist()  # float Python: più veloci degli scalari NumPy
+        f_p = h1 * (1 - cos(k * theta_d))
+        f_pp = h2 * sin(k * theta_d)
+        J_eff = J0 + I_b * f_p * f_p
+        return [omega_d, (tau_m - I_b * f_p * f_pp * omega_d * omega_d - b_d * omega_d) / J_eff]
+
+    def jac(t, state):
+        theta_d, omega_d = state.tolist()
+        c = cos(k * theta_d)
+        f_p = h1 * (1 - c)
+        f_pp = h2 * sin(k * theta_d)
+        f_ppp = h3 * c
+        J_eff = J0 + I_b * f_p * f_p
+        alpha_d = (tau_m - I_b * f_p * f_pp * omega_d * omega_d - b_d * omega_d) / J_eff
+        # d(alpha)/d(theta) = (dN/dtheta - alpha * dJ/dtheta) / J
+        dN_dtheta = -I_b * omega_d * omega_d * (f_pp * f_pp + f_p * f_ppp)
+        dJ_dtheta = 2 * I_b * f_p * f_pp
+        return np.array([
+            [0.0, 1.0],
+            [(dN_dtheta - alpha_d * dJ_dtheta) / J_eff,
+             -(2 * I_b * f_p * f_pp * omega_d + b_d) / J_eff]
+        ])
+
+    return rhs, jac
+
+
+def simulate(params, method='RK45', t_eval=None, rtol=1e-3, atol=1e-6, **kwargs):
+    """Integra il modello compilato con il metodo richiesto
+
+    I metodi impliciti (``Radau``, ``BDF``, ``LSODA``) ricevono la Jacobiana
+    analitica invece di stimarla per differenze finite.
+    """
+    rhs, jac = compile_dynamics(params)
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    if method in IMPLICIT_METHODS:
+        kwargs.setdefault('jac', jac)
+    return solve_ivp(rhs, (0, params['t_max']), [params['theta_d0'], params['omega_d0']],
+                     method=method, t_eval=t_eval, rtol=rtol, atol=atol, **kwargs)
+
+
+def time_grid(params, n_points=1000):
+    """Griglia temporale della cella 5"""
+    return np.linspace(0, params['t_max'], n_points)
+
+
+def _as_columns(params):
+    """Porta i parametri array a colonne per il broadcasting con (n, n_points)"""
+    return {name: np.asarray(value)[:, None] if np.ndim(value) else value
+            for name, value in params.items()}
+
+
+def derived_quantities(theta_d, omega_d, alpha_d, params):
+    """Variabili dipendenti, forza di contatto e potenze della cella 5
+
+    Gli array di stato possono avere shape (n_points,) oppure (n, n_points)
+    con parametri array di shape (n,).
+    """
+    p = _as_columns(params) if np.ndim(theta_d) == 2 else params
+    f_p = f_prime(theta_d, p['H'], p['beta'])
+
+    psi = f_cycloidal(theta_d, p['H'], p['beta'])
+    omega_b = f_p * omega_d
+    alpha_b = f_double_prime(theta_d, p['H'], p['beta']) * omega_d**2 + f_p * alpha_d
+
+    F_N = (p['I_b'] * alpha_b + p['b_b'] * omega_b) / p['e']
+
+    P_in = p['tau_m'] * omega_d
+    P_diss_drum = p['b_d'] * omega_d**2
+    P_diss_block = p['b_b'] * omega_b**2
+    P_diss_friction = p['mu'] * F_N * p['r_f'] * np.abs(omega_b)
+    P_total_diss = P_diss_drum + P_diss_block + P_diss_friction
+    P_eff = P_in - P_total_diss
+
+    efficiency = np.divide(P_eff, P_in, out=np.zeros_like(P_eff),
+                           where=(P_in > 1e-10) & (np.abs(P_eff) > 1e-10))
+
+    return {
+        'psi': psi,
+        'omega_b': omega_b,
+        'alpha_b': alpha_b,
+        'F_N': F_N,
+        'P_in': P_in,
+        'P_diss_drum': P_diss_drum,
+        'P_diss_block': P_diss_block,
+        'P_diss_friction': P_diss_friction,
+        'P_total_diss': P_total_diss,
+        'P_eff': P_eff,
+        'efficiency': efficiency
+    }
+
+
+def chart_series(t, theta_d, omega_d, alpha_d, q):
+    """Serie dei sei grafici della cella 6, come argomenti di ``publish_series``
+
+    Args:
+        q: Risultato di ``derived_quantities``
+
+    Returns:
+        ``{nome: {'t', 'series', 'title', 'ylabel', 'labels'}}``
+    """
+    return {
+        'posizioni': dict(t=t, series={'theta_d': np.degrees(theta_d), 'psi': np.degrees(q['psi'])},
+                          title='Posizioni Angolari nel Tempo', ylabel='Posizione angolare [°]',
+                          labels={'theta_d': 'Tamburo (θ_d)', 'psi': 'Blocco (ψ)'}),
+        'velocita': dict(t=t, series={'omega_d': np.degrees(omega_d), 'omega_b': np.degrees(q['omega_b'])},
+                         title='Velocità Angolari nel Tempo', ylabel='Velocità angolare [°/s]',
+                         labels={'omega_d': 'Tamburo (ω_d)', 'omega_b': 'Blocco (ω_b)'}),
+        'accelerazioni': dict(t=t, series={'alpha_d': np.degrees(alpha_d), 'alpha_b': np.degrees(q['alpha_b'])},
+                              title='Accelerazioni Angolari nel Tempo', ylabel='Accelerazione angolare [°/s²]',
+                              labels={'alpha_d': 'Tamburo (α_d)', 'alpha_b': 'Blocco (α_b)'}),
+        'forza': dict(t=t, series={'F_N': q['F_N']},
+                      title='Forza di Contatto tra Follower e Camma', ylabel='Forza di contatto [N]',
+                      labels={'F_N': 'Forza di contatto'}),
+        'potenze': dict(t=t, series={'P_in': q['P_in'], 'P_eff': q['P_eff'], 'P_diss': q['P_total_diss']},
+                        title='Bilancio Energetico del Sistema', ylabel='Potenza [W]',
+                        labels={'P_in': 'Potenza in ingresso', 'P_eff': 'Potenza efficace',
+                                'P_diss': 'Potenza dissipata'}),
+        'efficienza': dict(t=t, series={'efficiency': q['efficiency']},
+                           title='Efficienza del Sistema', ylabel='Efficienza',
+                           labels={'efficiency': 'Efficienza'})
+    }
+
+
+def animation_scene(theta_d, psi, params, n_frames=100, step=10):
+    """Scena dell'animazione della cella 8
+
+    Le posizioni di tutti i fotogrammi sono calcolate in un colpo solo, usando
+    un campione ogni ``step`` per i primi ``n_frames`` fotogrammi: camma fissa
+    (cerchio tratteggiato), tamburo, blocco, i due follower opposti rispetto
+    al blocco e la traiettoria del primo follower.
+
+    Returns:
+        ``simkit.animation.Scene``
+    """
+    idx = np.arange(0, len(theta_d), step)[:n_frames]
+    block_angle = theta_d[idx]
+    follower_angle = block_angle + psi[idx]
+
+    block_x = params['R_d'] * np.cos(block_angle)
+    block_y = params['R_d'] * np.sin(block_angle)
+    follower_dx = params['e'] * np.cos(follower_angle)
+    follower_dy = params['e'] * np.sin(follower_angle)
+
+    scene = Scene(xlim=(-0.15, 0.15), ylim=(-0.15, 0.15))
+    scene.circle((0, 0), params['R_d'], color='black', dashed=True)
+    scene.marker('drum', np.zeros_like(block_x), np.zeros_like(block_y), color='blue', radius=5)
+    scene.marker('block', block_x, block_y, color='red', radius=4)
+    scene.marker('follower1', block_x + follower_dx, block_y + follower_dy, color='green', radius=3)
+    scene.marker('follower2', block_x - follower_dx, block_y - follower_dy, color='green', radius=3)
+    scene.trail('follower1')
+    return scene
+
+
+def sensitivity_metrics(t_eval, theta_d, omega_d, params):
+    """Forza massima, potenze ed efficienza media della cella 7
+
+    ``theta_d`` e ``omega_d`` hanno shape (n_points,) oppure (n, n_points) con
+    parametri array di shape (n,).
+    """
+    alpha_d = np.gradient(omega_d, t_eval, axis=-1)
+    q = derived_quantities(theta_d, omega_d, alpha_d, params)
+    P_in, P_diss = q['P_in'], q['P_total_diss']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency = np.mean(np.where(P_in > 0, (P_in - P_diss) / P_in, 0), axis=-1)
+
+    return {
+        'max_force': np.max(q['F_N'], axis=-1),
+        'avg_power': np.mean(P_in, axis=-1),
+        'max_power': np.max(P_in, axis=-1),
+        'efficiency': efficiency
+    }
+
+
+def steady_state(params, n_samples=512, tol=1e-10):
+    """Regime periodico del tamburo calcolato su un solo periodo di camma
+
+    Invece di integrare un lungo transitorio, cerca con lo shooting l'orbita
+    periodica per cui, dopo una rotazione β del tamburo, la velocità torna
+    uguale a quella iniziale; le medie sono medie temporali su quel periodo.
+
+    Returns:
+        dict con periodo, velocità media/min/max, forza di contatto massima e
+        media, potenza media in ingresso ed efficienza (media istantanea e
+        rapporto tra le energie nel ciclo)
+    """
+    if params['b_d'] <= 0:
+        raise ValueError("b_d must be positive for a periodic steady state to exist")
+    rhs, jac = compile_dynamics(params)
+    # Stima iniziale: velocità per cui la coppia motrice bilancia l'attrito viscoso
+    orbit = periodic_orbit(rhs, [params['theta_d0'], params['tau_m'] / params['b_d']],
+                           phase_index=0, period=params['beta'], jac=jac, tol=tol)
+
+    t = np.linspace(0, orbit.period, n_samples)
+    theta_d, omega_d = orbit(t)
+    alpha_d = system_dynamics(t, (theta_d, omega_d), params)[1]
+    q = derived_quantities(theta_d, omega_d, alpha_d, params)
+
+    def cycle_mean(x):
+        return np.trapz(x, t) / orbit.period
+
+    return {
+        'period': orbit.period,
+        'converged': orbit.converged,
+        'omega_d_mean': params['beta'] / orbit.period,
+        'omega_d_min': float(np.min(omega_d)),
+        'omega_d_max': float(np.max(omega_d)),
+        'max_force': float(np.max(q['F_N'])),
+        'mean_force': cycle_mean(q['F_N']),
+        'mean_power_in': cycle_mean(q['P_in']),
+        'efficiency': cycle_mean(q['efficiency']),
+        'energy_efficiency': cycle_mean(q['P_eff']) / cycle_mean(q['P_in'])
+    }
+
+
+def _stream_derive(params):
+    """Serie derivate di un blocco per ``StreamingPipeline``"""
+    def derive(t, y):
+        theta_d, omega_d = y
+        alpha_d = system_dynamics(t, y, params)[1]
+        q = derived_quantities(theta_d, omega_d, alpha_d, params)
+        q.update({
+            'theta_d': theta_d,
+            'omega_d': omega_d,
+            'alpha_d': alpha_d,
+            'drive_torque': params['I_d'] * alpha_d + params['b_d'] * omega_d
+        })
+        return q
+    return derive
+
+
+def stream_postprocess(params, n_samples, chunk_size=65536, spill=(), spill_dir=None,
+                       method='RK45', rtol=1e-3, atol=1e-6):
+    """Statistiche delle celle 5 e 9 su ``n_samples`` istanti, a blocchi
+
+    La soluzione è integrata una volta con uscita densa e poi valutata a
+    blocchi di ``chunk_size`` campioni: la memoria non cresce con
+    ``n_samples`` (salvo le serie richieste in ``spill``, scritte su file .npy
+    mappati in memoria in ``spill_dir``). L'accelerazione del tamburo è quella
+    del modello invece di ``np.gradient``, che richiederebbe la serie intera.
+
+    Returns:
+        dict con 'stats' (``{serie: {'all'|'steady'|'startup': {count, min, max,
+        mean}}}``, regime = ultimo 30%, avvio = primo 30% della simulazione),
+        'rise_time' (primo istante con velocità oltre il 90% della massima) e
+        'spilled' (``{serie: percorso .npy}``)
+    """
+    from simkit.streaming import StreamingPipeline, linspace_chunks
+
+    rhs, jac = compile_dynamics(params)
+    kwargs = {'jac': jac} if method in IMPLICIT_METHODS else {}
+    t_max = params['t_max']
+    sol = solve_ivp(rhs, (0, t_max), [params['theta_d0'], params['omega_d0']],
+                    method=method, dense_output=True, rtol=rtol, atol=atol, **kwargs)
+    if not sol.success:
+        raise RuntimeError(sol.message)
+
+    pipeline = StreamingPipeline(
+        _stream_derive(params),
+        masks={'steady': lambda t: t > t_max * 0.7, 'startup': lambda t: t < t_max * 0.3},
+        spill=spill, spill_dir=spill_dir, n_total=n_samples)
+    stats = pipeline.run((start, t, sol.sol(t))
+                         for start, t in linspace_chunks(0, t_max, n_samples, chunk_size))
+
+    # Seconda passata, interrotta al primo superamento della soglia
+    threshold = 0.9 * stats['omega_d']['all']['max']
+    rise_time = None
+    for _, t in linspace_chunks(0, t_max, n_samples, chunk_size):
+        above = np.flatnonzero(sol.sol(t)[1] > threshold)
+        if above.size:
+            rise_time = float(t[above[0]])
+            break
+
+    return {'stats': stats, 'rise_time': rise_time, 'spilled': pipeline.spill_paths()}
+
+
+def sensitivity_analysis(param_name, param_values, params, t_eval=None, rtol=1e-3, atol=1e-6):
+    """Analisi di sensibilità della cella 7: una solve_ivp per valore"""
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    initial_state = [params['theta_d0'], params['omega_d0']]
+    results = {'max_force': [], 'avg_power': [], 'max_power': [], 'efficiency': []}
+
+    for value in param_values:
+        modified_params = params.copy()
+        modified_params[param_name] = value
+        sol = solve_ivp(system_dynamics, (0, params['t_max']), initial_state,
+                        args=(modified_params,), t_eval=t_eval, method='RK45',
+                        rtol=rtol, atol=atol)
+        metrics = sensitivity_metrics(t_eval, sol.y[0], sol.y[1], modified_params)
+        for name in results:
+            results[name].append(float(metrics[name]))
+
+    return results
+
+
+def sensitivity_analysis_batch(param_name, param_values, params, t_eval=None,
+                               rtol=1e-3, atol=1e-6):
+    """Analisi di sensibilità con tutte le varianti integrate insieme
+
+    Restituisce gli stessi risultati di ``sensitivity_analysis``.
+    """
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    batch_params = dict(params)
+    batch_params[param_name] = np.asarray(param_values, dtype=float)
+
+    sol = solve_ivp_batch(system_dynamics, (0, params['t_max']),
+                          [params['theta_d0'], params['omega_d0']],
+                          t_eval=t_eval, params=batch_params, rtol=rtol, atol=atol)
+    metrics = sensitivity_metrics(t_eval, sol.y[0], sol.y[1], batch_params)
+    return {name: values.tolist() for name, values in metrics.items()}
+
+
+def sensitivity_study_batch(param_ranges, params, t_eval=None, rtol=1e-3, atol=1e-6):
+    """Tutte le analisi di sensibilità della cella 7 in un unico batch
+
+    Ogni membro del batch è il caso nominale con un solo parametro modificato;
+    il risultato ha la struttura di ``sensitivity_results`` del notebook.
+    """
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    sizes = [len(values) for values in param_ranges.values()]
+    batch_params = {name: np.full(sum(sizes), value, dtype=float) if np.isscalar(value) else value
+                    for name, value in params.items()}
+    offsets = np.cumsum([0] + sizes)
+    for (name, values), start, stop in zip(param_ranges.items(), offsets[:-1], offsets[1:]):
+        batch_params[name][start:stop] = values
+
+    sol = solve_ivp_batch(system_dynamics, (0, params['t_max']),
+                          [params['theta_d0'], params['omega_d0']],
+                          t_eval=t_eval, params=batch_params, rtol=rtol, atol=atol)
+    metrics = sensitivity_metrics(t_eval, sol.y[0], sol.y[1], batch_params)
+    return {name: {metric: values[start:stop].tolist() for metric, values in metrics.items()}
+            for name, start, stop in zip(param_ranges, offsets[:-1], offsets[1:])}
+
+
+def sweep_metrics(params, t_eval=None, rtol=1e-3, atol=1e-6):
+    """Metriche ridotte di un blocco di progetti, per ``simkit.sweep``
+
+    I parametri array (uno per progetto) vengono integrati in un unico batch;
+    ``t_max`` deve restare scalare.
+
+    Returns:
+        dict con forza di contatto massima, efficienza media e potenza media in ingresso
+    """
+    if np.ndim(params['t_max']):
+        raise ValueError("t_max cannot vary within a sweep")
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    sol = solve_ivp_batch(system_dynamics, (0, params['t_max']),
+                          [params['theta_d0'], params['omega_d0']],
+                          t_eval=t_eval, params=params, rtol=rtol, atol=atol)
+    metrics = sensitivity_metrics(t_eval, sol.y[0], sol.y[1], params)
+    return {
+        'max_force': metrics['max_force'],
+        'efficiency': metrics['efficiency'],
+        'avg_power': metrics['avg_power']
+    }
+
+
+def parameter_jacobian(params, names):
+    """Jacobiana analitica di ``system_dynamics`` rispetto ai parametri ``names``
+
+    e e mu non entrano nella dinamica del tamburo (solo nella forza di contatto
+    e nelle potenze), quindi le loro colonne sono nulle.
+    """
+    unknown = set(names) - set(DESIGN_PARAMS)
+    if unknown:
+        raise ValueError(f"Unsupported design parameters: {', '.join(sorted(unknown))}")
+    k = 2*math.pi / params['beta']
+    h1 = params['H'] / params['beta']
+    h2 = 2*math.pi * params['H'] / params['beta']**2
+    J0 = params['I_d'] + params['M_b'] * params['R_d']**2
+    I_b, b_d, tau_m = params['I_b'], params['b_d'], params['tau_m']
+    columns = [DESIGN_PARAMS.index(name) for name in names]
+
+    def jac_p(t, state):
+        theta_d, omega_d = state.tolist()
+        f_p = h1 * (1 - math.cos(k * theta_d))
+        f_pp = h2 * math.sin(k * theta_d)
+        J_eff = J0 + I_b * f_p * f_p
+        alpha_d = (tau_m - I_b * f_p * f_pp * omega_d * omega_d - b_d * omega_d) / J_eff
+        # Colonne nell'ordine di DESIGN_PARAMS: I_b, e, b_d, mu, tau_m
+        d_alpha = [-(f_p * f_pp * omega_d * omega_d + alpha_d * f_p * f_p) / J_eff,
+                   0.0, -omega_d / J_eff, 0.0, 1 / J_eff]
+        return np.array([[0.0] * len(columns), [d_alpha[i] for i in columns]])
+
+    return jac_p
+
+
+def _metric_series(theta_d, omega_d, params):
+    """Forza di contatto ed efficienza istantanea (cella 7) da stato e parametri
+
+    Usa l'accelerazione analitica invece di np.gradient ed è valida anche per
+    argomenti complessi, così da poterla derivare con il passo complesso.
+    """
+    alpha_d = system_dynamics(None, (theta_d, omega_d), params)[1]
+    f_p = f_prime(theta_d, params['H'], params['beta'])
+    omega_b = f_p * omega_d
+    alpha_b = f_double_prime(theta_d, params['H'], params['beta']) * omega_d**2 + f_p * alpha_d
+    abs_omega_b = np.where(np.real(omega_b) >= 0, omega_b, -omega_b)
+
+    F_N = (params['I_b'] * alpha_b + params['b_b'] * omega_b) / params['e']
+    P_in = params['tau_m'] * omega_d
+    P_diss = (params['b_d'] * omega_d**2 + params['b_b'] * omega_b**2
+              + params['mu'] * F_N * params['r_f'] * abs_omega_b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency = (P_in - P_diss) / P_in
+    return F_N, efficiency, np.real(P_in) > 0
+
+
+def metrics_with_gradient(params, names=DESIGN_PARAMS, t_eval=None, rtol=1e-6, atol=1e-9):
+    """Efficienza media e forza massima con i gradienti, da una sola integrazione
+
+    Lo stato viene integrato insieme alle sensitività dy/dp; il gradiente delle
+    metriche combina le sensitività con le derivate esplicite rispetto ai
+    parametri, calcolate con il passo complesso. Il gradiente della forza
+    massima è quello della forza nell'istante del massimo.
+
+    Returns:
+        dict con 'efficiency', 'max_force' e i rispettivi gradienti
+        ('efficiency_grad', 'max_force_grad', nell'ordine di ``names``)
+    """
+    names = list(names)
+    t_eval = time_grid(params) if t_eval is None else t_eval
+    rhs, jac = compile_dynamics(params)
+    _, y, S, _ = solve_forward_sensitivity(
+        rhs, jac, parameter_jacobian(params, names), (0, params['t_max']),
+        [params['theta_d0'], params['omega_d0']], t_eval=t_eval, rtol=rtol, atol=atol)
+
+    F_N, efficiency, valid = _metric_series(y[0], y[1], params)
+    peak = np.argmax(F_N)
+    efficiency_grad = np.empty(len(names))
+    max_force_grad = np.empty(len(names))
+    for k, name in enumerate(names):
+        def perturbed(h, k=k, name=name):
+            p = dict(params)
+            p[name] = params[name] + h
+            return _metric_series(y[0] + h * S[0, k], y[1] + h * S[1, k], p)[:2]
+        dF = complex_step(lambda h: perturbed(h)[0])
+        d_eff = complex_step(lambda h: perturbed(h)[1])
+        efficiency_grad[k] = np.mean(np.where(valid, d_eff, 0))
+        max_force_grad[k] = dF[peak]
+
+    return {
+        'efficiency': float(np.mean(np.where(valid, efficiency, 0))),
+        'max_force': float(F_N[peak]),
+        'efficiency_grad': efficiency_grad,
+        'max_force_grad': max_force_grad
+    }
+
+
+def optimize_design(params, bounds, max_force, rtol=1e-6, atol=1e-9, **options):
+    """Massimizza l'efficienza media rispetto ai parametri di ``bounds``
+
+    Usa SLSQP con i gradienti di ``metrics_with_gradient`` e il vincolo che la
+    forza di contatto massima non superi ``max_force``. Le variabili sono
+    normalizzate in [0, 1] sui rispettivi intervalli.
+
+    Args:
+        params: Parametri nominali (punto di partenza)
+        bounds: ``{nome: (minimo, massimo)}`` per i parametri di DESIGN_PARAMS
+        max_force: Limite sulla forza di contatto massima [N]
+
+    Returns:
+        dict con parametri ottimi, metriche, numero di integrazioni e risultato di scipy
+    """
+    names = list(bounds)
+    lower = np.array([bounds[name][0] for name in names], dtype=float)
+    span = np.array([bounds[name][1] for name in names], dtype=float) - lower
+    evaluations = {}
+
+    def evaluate(x):
+        key = tuple(np.round(x, 15))
+        if key not in evaluations:
+            p = dict(params)
+            p.update(zip(names, lower + x * span))
+            evaluations[key] = metrics_with_gradient(p, names, rtol=rtol, atol=atol)
+        return evaluations[key]
+
+    x0 = np.clip((np.array([params[name] for name in names]) - lower) / span, 0, 1)
+    result = minimize(
+        lambda x: -evaluate(x)['efficiency'], x0,
+        jac=lambda x: -evaluate(x)['efficiency_grad'] * span,
+        method='SLSQP', bounds=[(0, 1)] * len(names),
+        constraints=[{
+            'type': 'ineq',
+            'fun': lambda x: (max_force - evaluate(x)['max_force']) / max_force,
+            'jac': lambda x: -evaluate(x)['max_force_grad'] * span / max_force
+        }],
+        options=options)
+
+    optimum = dict(zip(names, (lower + result.x * span).tolist()))
+    metrics = evaluate(result.x)
+    return {
+        'params': optimum,
+        'efficiency': metrics['efficiency'],
+        'max_force': metrics['max_force'],
+        'solves': len(evaluations),
+        'result': result
+    }
@@ -0,0 +1,72 @@
+"""Simulazione parametrizzata del dispositivo a camma US6758109B2
+
+Le celle 5, 6 e 8 di US6758109B2_doppiaCamma.py come punto d'ingresso
+``simulate(params)``: il sito può rieseguirle con coppia, eccentricità,
+attriti, inerzia e durata modificati dalla pagina, al costo di una sola
+integrazione. Soluzione densa, serie e animazione sono le stesse del notebook
+(vedi ``US6758109_model``); le analisi più costose (sensibilità e regime
+periodico) restano nel notebook.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+
+import US6758109_model as model
+from simkit.runtime import figures_enabled, publish_animation, publish_series, publish_solution
+
+# Parametri modificabili dalla pagina (gli altri restano quelli di model.PARAMS)
+PARAMETERS = {
+    'tau_m': {'default': 0.5, 'min': 0.05, 'max': 5.0, 'unit': 'N·m', 'label': 'Coppia motrice'},
+    'e': {'default': 0.02, 'min': 0.005, 'max': 0.08, 'unit': 'm', 'label': 'Eccentricità'},
+    'mu': {'default': 0.1, 'min': 0.0, 'max': 0.5, 'unit': '', 'label': 'Attrito radente'},
+    'I_b': {'default': 0.01, 'min': 0.001, 'max': 0.1, 'unit': 'kg·m²', 'label': 'Inerzia del blocco'},
+    'b_d': {'default': 0.01, 'min': 0.001, 'max': 0.1, 'unit': 'N·m·s/rad', 'label': 'Attrito viscoso del tamburo'},
+    't_max': {'default': 10.0, 'min': 1.0, 'max': 60.0, 'unit': 's', 'label': 'Durata della simulazione'},
+}
+
+
+def simulate(params):
+    """Integra il modello, stampa le metriche principali e pubblica risultati e grafici"""
+    p = dict(model.PARAMS, **params)
+    t_eval = model.time_grid(p)
+    sol = model.simulate(p, t_eval=t_eval, dense_output=True)
+    if not sol.success:
+        raise RuntimeError(sol.message)
+
+    theta_d, omega_d = sol.y
+    alpha_d = model.system_dynamics(t_eval, sol.y, p)[1]
+    q = model.derived_quantities(theta_d, omega_d, alpha_d, p)
+    steady = t_eval > p['t_max'] * 0.7
+
+    print('=== PARAMETRI ===')
+    for name in PARAMETERS:
+        print(f"{name} = {p[name]:g} {PARAMETERS[name]['unit']}".rstrip())
+    print('=== RISULTATI ===')
+    print(f"Velocità media di regime del tamburo: {np.mean(omega_d[steady]):.3f} rad/s")
+    print(f"Forza di contatto massima: {np.max(q['F_N']):.2f} N")
+    print(f"Potenza media in ingresso: {np.mean(q['P_in']):.3f} W")
+    print(f"Efficienza media di regime: {np.mean(q['efficiency'][steady]):.2%}")
+
+    publish_solution('state', sol, ['theta_d', 'omega_d'])
+    for name, chart in model.chart_series(t_eval, theta_d, omega_d, alpha_d, q).items():
+        publish_series(name, **chart)
+    publish_animation('sistema', model.animation_scene(theta_d, q['psi'], p), fps=20,
+                      title='Animazione del sistema')
+
+    if not figures_enabled():
+        return
+
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 9), sharex=True)
+    ax1.plot(t_eval, np.degrees(omega_d), 'b-', label='Tamburo ($ω_d$)')
+    ax1.plot(t_eval, np.degrees(q['omega_b']), 'r-', label='Blocco ($ω_b$)')
+    ax1.set_ylabel('Velocità angolare [°/s]')
+    ax1.legend()
+    ax2.plot(t_eval, q['F_N'], 'g-')
+    ax2.set_ylabel('Forza [N]')
+    ax3.plot(t_eval, q['efficiency'] * 100, 'k-')
+    ax3.set_ylabel('Efficienza [%]')
+    ax3.set_xlabel('Tempo [s]')
+    for ax in (ax1, ax2, ax3):
+        ax.grid(True)
+    fig.suptitle(f"τ_m = {p['tau_m']:g} N·m, e = {p['e']:g} m, μ = {p['mu']:g}")
+    plt.tight_layout()
+    plt.show()
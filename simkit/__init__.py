@@ -0,0 +1 @@
+"""Infrastruttura per l'esecuzione delle simulazioni di PatentInsight"""
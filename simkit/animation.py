@@ -0,0 +1,187 @@
+"""Animazioni pre-renderizzate in un'unica sprite sheet
+
+Una scena 2D è descritta in modo dichiarativo: forme fisse (disegnate una
+volta sullo sfondo), marcatori con una posizione per fotogramma (array
+calcolati in modo vettoriale dallo script) e scie che accumulano il percorso
+di un marcatore. I fotogrammi vengono disegnati con Pillow, senza passare da
+matplotlib, e affiancati in una griglia salvata come PNG a palette: il
+browser la riproduce ritagliando un fotogramma alla volta.
+
+Esempio::
+
+    scene = Scene(xlim=(-1, 1), ylim=(-1, 1))
+    scene.circle((0, 0), 0.5, dashed=True)
+    scene.marker('p', np.cos(t), np.sin(t), color='red')
+    scene.trail('p')
+    publish_animation('orbita', scene, fps=20)
+"""
+import io
+import json
+import math
+
+import numpy as np
+
+# Colori con nome accettati oltre a '#rrggbb'
+COLORS = {
+    'black': '#000000', 'white': '#ffffff', 'grid': '#e5e5e5',
+    'blue': '#1f77b4', 'red': '#d62728', 'green': '#2ca02c',
+    'orange': '#ff7f0e', 'purple': '#9467bd', 'gray': '#7f7f7f'
+}
+
+# Fattore di sovracampionamento per l'antialiasing
+SUPERSAMPLE = 2
+
+
+def _color(value):
+    return COLORS.get(value, value)
+
+
+def _nice_ticks(low, high, count=5):
+    step = 10 ** math.floor(math.log10((high - low) / count))
+    step = next(s * step for s in (1, 2, 5, 10) if (high - low) / (s * step) <= count)
+    return np.arange(math.ceil(low / step) * step, high + step * 1e-9, step)
+
+
+class Scene:
+    """Scena 2D da animare
+
+    Args:
+        xlim, ylim: Limiti degli assi in unità del modello
+        size: Lato del fotogramma in pixel (l'altezza segue il rapporto degli assi)
+        grid: Disegna la griglia sui valori principali degli assi
+    """
+
+    def __init__(self, xlim, ylim, size=240, grid=True):
+        self.xlim = tuple(map(float, xlim))
+        self.ylim = tuple(map(float, ylim))
+        self.width = int(size)
+        self.height = int(round(size * (self.ylim[1] - self.ylim[0]) / (self.xlim[1] - self.xlim[0])))
+        self.grid = grid
+        self.circles = []
+        self.markers = {}
+        self.trails = []
+
+    def circle(self, center, radius, color='black', dashed=False):
+        """Cerchio fisso, disegnato sullo sfondo"""
+        self.circles.append((center, radius, _color(color), dashed))
+        return self
+
+    def marker(self, name, x, y, color='blue', radius=5):
+        """Marcatore con una posizione per fotogramma (``radius`` in pixel)"""
+        x, y = np.atleast_1d(np.asarray(x, dtype=float)), np.atleast_1d(np.asarray(y, dtype=float))
+        if self.markers and x.size != self.n_frames:
+            raise ValueError('All markers must have the same number of frames')
+        if x.shape != y.shape:
+            raise ValueError(f'Marker {name!r} has x and y of different lengths')
+        self.markers[name] = (x, y, _color(color), radius)
+        return self
+
+    def trail(self, name, color=None, radius=1):
+        """Percorso accumulato di un marcatore, a punti"""
+        if name not in self.markers:
+            raise ValueError(f'Unknown marker: {name!r}')
+        self.trails.append((name, _color(color) if color else self.markers[name][2], radius))
+        return self
+
+    @property
+    def n_frames(self):
+        return next(iter(self.markers.values()))[0].size if self.markers else 0
+
+    def _pixels(self, x, y, scale):
+        """Coordinate del modello in pixel (vettoriale)"""
+        px = (np.asarray(x) - self.xlim[0]) / (self.xlim[1] - self.xlim[0]) * self.width * scale
+        py = (self.ylim[1] - np.asarray(y)) / (self.ylim[1] - self.ylim[0]) * self.height * scale
+        return px, py
+
+    def _background(self, scale):
+        from PIL import Image, ImageDraw
+
+        image = Image.new('RGB', (self.width * scale, self.height * scale), 'white')
+        draw = ImageDraw.Draw(image)
+        if self.grid:
+            for tick in _nice_ticks(*self.xlim):
+                px, _ = self._pixels(tick, 0, scale)
+                draw.line([(px, 0), (px, image.height)], fill=COLORS['grid'], width=scale)
+            for tick in _nice_ticks(*self.ylim):
+                _, py = self._pixels(0, tick, scale)
+                draw.line([(0, py), (image.width, py)], fill=COLORS['grid'], width=scale)
+        for (cx, cy), radius, color, dashed in self.circles:
+            px, py = self._pixels(cx, cy, scale)
+            r = radius / (self.xlim[1] - self.xlim[0]) * self.width * scale
+            box = [px - r, py - r, px + r, py + r]
+            if dashed:
+                for start in range(0, 360, 10):
+                    draw.arc(box, start, start + 6, fill=color, width=scale)
+            else:
+                draw.ellipse(box, outline=color, width=scale)
+        return image
+
+    def render(self, columns=None):
+        """Disegna tutti i fotogrammi in una sprite sheet
+
+        Returns:
+            (png in bytes, dict con numero di fotogrammi, colonne e dimensioni)
+        """
+        from PIL import Image, ImageDraw
+
+        n = self.n_frames
+        if n == 0:
+            raise ValueError('The scene has no markers')
+        columns = columns or math.ceil(math.sqrt(n))
+        rows = math.ceil(n / columns)
+        scale = SUPERSAMPLE
+        background = self._background(scale)
+        positions = {name: self._pixels(x, y, scale) for name, (x, y, _, _) in self.markers.items()}
+        sheet = Image.new('RGB', (columns * self.width, rows * self.height), 'white')
+
+        # Le scie si accumulano sullo sfondo: un punto nuovo per fotogramma
+        trail_draw = ImageDraw.Draw(background)
+        for i in range(n):
+            for name, color, radius in self.trails:
+                px, py = positions[name]
+                r = radius * scale
+                if i > 0:
+                    trail_draw.ellipse([px[i] - r, py[i] - r, px[i] + r, py[i] + r], fill=color)
+            frame = background.copy()
+            draw = ImageDraw.Draw(frame)
+            for name, (_, _, color, radius) in self.markers.items():
+                px, py = positions[name]
+                r = radius * scale
+                draw.ellipse([px[i] - r, py[i] - r, px[i] + r, py[i] + r], fill=color)
+            frame = frame.resize((self.width, self.height), Image.LANCZOS)
+            sheet.paste(frame, ((i % columns) * self.width, (i // columns) * self.height))
+
+        buffer = io.BytesIO()
+        sheet.quantize(colors=64).save(buffer, format='PNG', optimize=True)
+        meta = {'frames': n, 'columns': columns, 'frame_width': self.width,
+                'frame_height': self.height}
+        return buffer.getvalue(), meta
+
+
+class Animation:
+    """Sprite sheet renderizzata con le informazioni per riprodurla"""
+
+    def __init__(self, sheet, meta):
+        self.sheet = sheet
+        self.meta = meta
+
+    @classmethod
+    def from_scene(cls, scene, fps=20, title=None, columns=None):
+        sheet, meta = scene.render(columns)
+        meta.update(fps=fps, title=title)
+        return cls(sheet, meta)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, sheet=np.frombuffer(self.sheet, dtype=np.uint8),
+                 meta=np.array(json.dumps(self.meta)))
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, source):
+        with np.load(source, allow_pickle=False) as data:
+            return cls(data['sheet'].tobytes(), json.loads(str(data['meta'])))
+
+    def _repr_png_(self):
+        """Anteprima della sprite sheet nei notebook"""
+        return self.sheet
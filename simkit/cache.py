@@ -0,0 +1,209 @@
+"""Cache su disco dei risultati di simulazione, indirizzata per contenuto
+
+La chiave è l'hash dei sorgenti Python della simulazione, di quelli di simkit
+e dei parametri: se uno script o simkit cambiano la chiave cambia, e le voci ottenute dalla versione
+precedente vengono rimosse al primo salvataggio successivo. Lo spazio occupato
+è limitato a ``max_bytes`` con eviction LRU.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+META_FILE = 'meta.json'
+
+# Oggetti pubblicati dagli script (vedi simkit.runtime), con il prefisso dei file
+ARTIFACT_PREFIXES = {'solutions': 'solution', 'series': 'series', 'animations': 'animation'}
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def simkit_digest():
+    """Hash dei sorgenti di simkit caricati dal processo
+
+    I risultati dipendono anche dal runtime (formati degli oggetti pubblicati,
+    rendering delle figure): una nuova versione di simkit invalida le voci.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(_file_digest(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).iterdir() if f.is_file())
+
+
+class ResultCache:
+    """Cache LRU dei risultati con limite di dimensione
+
+    Una voce contiene stdout, i riferimenti alle figure (``{formato: nome}``
+    nel ``FigureStore``) e alle sprite sheet delle animazioni (``{animazione:
+    nome}``) e gli oggetti pubblicati dallo script (soluzioni dense, serie e
+    animazioni), salvati come file .npz.
+
+    Args:
+        directory: Cartella in cui salvare le voci
+        max_bytes: Dimensione massima complessiva della cache
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._digests = {}
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def source_digest(self, simulation_path):
+        """Hash dello script e dei moduli Python nella sua cartella"""
+        simulation_path = Path(simulation_path).resolve()
+        sources = [simulation_path] + sorted(
+            p for p in simulation_path.parent.glob('*.py') if p != simulation_path)
+        stamp = tuple((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in sources)
+
+        with self._lock:
+            cached = self._digests.get(simulation_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        for path in sources:
+            digest.update(path.name.encode('utf-8'))
+            digest.update(_file_digest(path).encode('ascii'))
+        value = digest.hexdigest()
+        with self._lock:
+            self._digests[simulation_path] = (stamp, value)
+        return value
+
+    def key(self, simulation_path, params=None):
+        """Chiave della voce per uno script e un insieme di parametri"""
+        digest = hashlib.sha256(self.source_digest(simulation_path).encode('ascii'))
+        digest.update(simkit_digest().encode('ascii'))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        """Restituisce il risultato salvato o None"""
+        entry = self._entry_path(key)
+        try:
+            with open(entry / META_FILE, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            figures = meta['figures']
+            if not all(isinstance(figure, dict) for figure in figures):
+                return None  # Voce salvata prima dell'archivio delle figure
+            result = {'output': meta['output'], 'figures': figures, 'sheets': meta['sheets']}
+            for kind in ARTIFACT_PREFIXES:
+                result[kind] = {name: (entry / filename).read_bytes()
+                                for name, filename in meta.get(kind, {}).items()}
+            os.utime(entry / META_FILE)  # Aggiorna l'ordine LRU
+        except (OSError, ValueError, KeyError):
+            return None
+        return result
+
+    def artifact_path(self, key, kind, name):
+        """Percorso del file .npz di un oggetto pubblicato, o None"""
+        entry = self._entry_path(key)
+        try:
+            with open(entry / META_FILE, 'r', encoding='utf-8') as f:
+                filename = json.load(f).get(kind, {}).get(name)
+        except (OSError, ValueError):
+            return None
+        return entry / filename if filename else None
+
+    def sheet(self, key, name):
+        """Nome nel ``FigureStore`` della sprite sheet di un'animazione, o None"""
+        try:
+            with open(self._entry_path(key) / META_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f).get('sheets', {}).get(name)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result, simulation_path=None):
+        """Salva un risultato e applica il limite di dimensione"""
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        source = str(Path(simulation_path).resolve()) if simulation_path else None
+        source_digest = self.source_digest(simulation_path) if simulation_path else None
+        staging = Path(tempfile.mkdtemp(prefix='.tmp-', dir=self.directory))
+        try:
+            meta = {
+                'output': result['output'],
+                'figures': result['figures'],
+                'sheets': result.get('sheets', {}),
+                'source': source,
+                'source_digest': source_digest,
+                'created': time.time()
+            }
+            for kind, prefix in ARTIFACT_PREFIXES.items():
+                meta[kind] = {}
+                for name, data in result.get(kind, {}).items():
+                    meta[kind][name] = f'{prefix}_{name}.npz'
+                    (staging / meta[kind][name]).write_bytes(data)
+            with open(staging / META_FILE, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.rename(staging, entry)
+        except OSError:
+            # Un altro thread ha già salvato la stessa voce
+            shutil.rmtree(staging, ignore_errors=True)
+
+        if source:
+            self._drop_stale(source, source_digest)
+        self._evict()
+
+    def _entries(self):
+        for bucket in self.directory.iterdir():
+            if not bucket.is_dir() or bucket.name.startswith('.'):
+                continue
+            try:
+                entries = list(bucket.iterdir())
+            except OSError:  # Cartella rimossa da un'eviction concorrente
+                continue
+            for entry in entries:
+                if (entry / META_FILE).exists():
+                    yield entry
+
+    def _drop_stale(self, source, source_digest):
+        """Rimuove le voci calcolate con una versione precedente dello script"""
+        for entry in self._entries():
+            try:
+                with open(entry / META_FILE, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if meta.get('source') == source and meta.get('source_digest') != source_digest:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def _evict(self):
+        """Elimina le voci usate meno di recente oltre ``max_bytes``"""
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append(((entry / META_FILE).stat().st_mtime, _dir_size(entry), entry))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for entry in list(self._entries()):
+            shutil.rmtree(entry, ignore_errors=True)
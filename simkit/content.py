@@ -0,0 +1,126 @@
+"""Indice in memoria di progetti e articoli
+
+L'indice viene costruito all'avvio con i metadati di ogni cartella di
+contenuto (nome, file master, script di simulazione) e mantenuto aggiornato
+confrontando gli mtime: al più una volta ogni ``refresh_interval`` secondi
+controlla le cartelle radice e quelle dei contenuti, che cambiano quando un
+file viene aggiunto, rimosso o rinominato. L'HTML del master viene
+renderizzato al primo accesso e memorizzato finché mtime e dimensione del
+file non cambiano.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import markdown
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ContentEntry:
+    """Un progetto o articolo con il suo master renderizzato in cache"""
+
+    def __init__(self, content_type, content_id, path):
+        self.type = content_type
+        self.id = content_id
+        self.path = Path(path)
+        self.name = content_id.replace('_', ' ').title()
+        master_files = sorted(self.path.glob('*_master.md'))
+        sim_files = sorted(self.path.glob('*_sim.py'))
+        self.master_path = master_files[0] if master_files else None
+        self.simulation_path = sim_files[0] if sim_files else None
+        self._html = None
+        self._html_stamp = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_simulation(self):
+        return self.simulation_path is not None
+
+    def html(self):
+        """Master renderizzato in HTML, ricalcolato solo se il file è cambiato"""
+        if self.master_path is None:
+            return ''
+        try:
+            stamp = _stamp(self.master_path)
+        except OSError:
+            return ''
+        with self._lock:
+            if stamp != self._html_stamp:
+                text = self.master_path.read_text(encoding='utf-8')
+                self._html = markdown.markdown(text, extensions=['extra'])
+                self._html_stamp = stamp
+            return self._html
+
+    def to_dict(self):
+        """Dati per i template, senza l'HTML del master"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'type': self.type,
+            'has_simulation': self.has_simulation,
+            'sim_file': self.simulation_path.name if self.simulation_path else None
+        }
+
+
+class ContentIndex:
+    """Indice dei contenuti per tipo
+
+    Args:
+        directories: ``{tipo: cartella}``, ad esempio ``{'project': 'projects'}``
+        refresh_interval: Secondi tra due controlli degli mtime
+    """
+
+    def __init__(self, directories, refresh_interval=2.0):
+        self.directories = {content_type: Path(path) for content_type, path in directories.items()}
+        self.refresh_interval = refresh_interval
+        self._entries = {content_type: {} for content_type in directories}
+        self._stamps = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def _scan(self, content_type, root):
+        """Aggiorna le voci di un tipo; ricrea solo quelle con cartella cambiata"""
+        entries = {}
+        try:
+            names = sorted(os.listdir(root))
+        except OSError:
+            names = []
+        for name in names:
+            path = root / name
+            if not path.is_dir():
+                continue
+            stamp = _stamp(path)
+            previous = self._entries[content_type].get(name)
+            if previous is not None and self._stamps.get(path) == stamp:
+                entries[name] = previous
+            else:
+                entries[name] = ContentEntry(content_type, name, path)
+                self._stamps[path] = stamp
+        self._entries[content_type] = entries
+
+    def refresh(self, force=False):
+        """Ricontrolla le cartelle se è passato ``refresh_interval`` dall'ultima volta"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked < self.refresh_interval:
+                return
+            for content_type, root in self.directories.items():
+                self._scan(content_type, root)
+            self._checked = now
+
+    def list(self, content_type):
+        """Voci di un tipo, ordinate per identificativo"""
+        self.refresh()
+        return list(self._entries[content_type].values())
+
+    def get(self, content_type, content_id):
+        self.refresh()
+        return self._entries.get(content_type, {}).get(content_id)
@@ -0,0 +1,115 @@
+"""Soluzioni dense salvabili e ricampionabili
+
+L'interpolante di ``solve_ivp(..., dense_output=True)`` è convertito in un
+polinomio a tratti (``scipy.interpolate.PPoly``) con un tratto per passo del
+solutore: bastano i coefficienti per ricostruire lo stato in qualunque
+istante, con la precisione dell'integratore, senza integrare di nuovo. La
+rappresentazione occupa (grado + 1) · n_stati valori per passo e si salva in
+un file .npz.
+"""
+import io
+
+import numpy as np
+
+# Grado usato per gli interpolanti che non dichiarano il proprio ordine
+DEFAULT_DEGREE = 7
+
+# Numero massimo di punti restituiti da un ricampionamento
+MAX_RESAMPLE_POINTS = 100000
+
+
+def _chebyshev_nodes(count):
+    """Nodi di Chebyshev interni a (0, 1)"""
+    k = np.arange(count)
+    return 0.5 - 0.5 * np.cos((2 * k + 1) * np.pi / (2 * count))
+
+
+class DenseSolution:
+    """Stato di una simulazione come polinomio a tratti nel tempo
+
+    Args:
+        breakpoints: Estremi dei passi, crescenti, shape (n_steps + 1,)
+        coefficients: Coefficienti di ``PPoly``, shape (grado + 1, n_steps, n_stati)
+        names: Nome di ciascuna variabile di stato
+    """
+
+    def __init__(self, breakpoints, coefficients, names=None):
+        from scipy.interpolate import PPoly
+
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        n_state = self.coefficients.shape[2]
+        self.names = list(names) if names is not None else [f'y{i}' for i in range(n_state)]
+        if len(self.names) != n_state:
+            raise ValueError('One name per state variable is required')
+        self._ppoly = PPoly(self.coefficients, self.breakpoints, extrapolate=False)
+
+    @classmethod
+    def from_ode_solution(cls, sol, names=None):
+        """Converte l'uscita densa di ``solve_ivp``
+
+        Args:
+            sol: Risultato di ``solve_ivp(..., dense_output=True)`` oppure il
+                suo attributo ``sol`` (``OdeSolution``)
+        """
+        sol = getattr(sol, 'sol', sol)
+        if sol is None:
+            raise ValueError('The solution has no dense output; use dense_output=True')
+        ts = np.asarray(sol.ts, dtype=float)
+        if ts[-1] < ts[0]:
+            raise ValueError('Only forward-in-time solutions are supported')
+
+        degree = max(getattr(interpolant, 'order', DEFAULT_DEGREE - 1) + 1
+                     for interpolant in sol.interpolants)
+        nodes = _chebyshev_nodes(degree + 1)
+        h = np.diff(ts)
+        # Lo stesso insieme di nodi normalizzati per tutti i passi: i nodi sono
+        # interni, quindi ogni istante cade in un solo passo
+        samples = sol((ts[:-1, None] + h[:, None] * nodes).ravel())
+        samples = samples.reshape(-1, h.size, nodes.size)          # (n_stati, passi, nodi)
+        vandermonde = np.vander(nodes, degree + 1, increasing=True)
+        local = np.linalg.solve(vandermonde, samples.transpose(2, 1, 0).reshape(nodes.size, -1))
+        local = local.reshape(degree + 1, h.size, -1)              # potenze di x = (t - t_i) / h
+        scale = h[None, :, None] ** np.arange(degree + 1)[:, None, None]
+        return cls(ts, (local / scale)[::-1], names)
+
+    @property
+    def t_min(self):
+        return float(self.breakpoints[0])
+
+    @property
+    def t_max(self):
+        return float(self.breakpoints[-1])
+
+    def __call__(self, t):
+        """Stato agli istanti ``t``, shape (n_stati, len(t))"""
+        return np.moveaxis(self._ppoly(np.asarray(t, dtype=float)), -1, 0)
+
+    def resample(self, start=None, stop=None, num=1000):
+        """Campiona ``num`` istanti equispaziati in [start, stop]
+
+        Returns:
+            dict con 't' e una serie per ogni variabile di stato
+        """
+        start = self.t_min if start is None else float(start)
+        stop = self.t_max if stop is None else float(stop)
+        if not self.t_min <= start < stop <= self.t_max:
+            raise ValueError(f'The time window must lie within [{self.t_min}, {self.t_max}]')
+        if not 2 <= num <= MAX_RESAMPLE_POINTS:
+            raise ValueError(f'The number of points must be between 2 and {MAX_RESAMPLE_POINTS}')
+        t = np.linspace(start, stop, int(num))
+        series = {'t': t}
+        series.update(zip(self.names, self(t)))
+        return series
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, breakpoints=self.breakpoints, coefficients=self.coefficients,
+                 names=np.array(self.names))
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, source):
+        """Carica da un percorso o da un oggetto file ``.npz``"""
+        with np.load(source, allow_pickle=False) as data:
+            return cls(data['breakpoints'], data['coefficients'], data['names'].tolist())
@@ -0,0 +1,548 @@
+"""Esecuzione isolata delle simulazioni in un pool di processi pre-riscaldati
+
+Ogni simulazione gira in un processo worker separato: stdout, registro delle
+figure di pyplot e rcParams sono quindi privati del singolo job, e una
+simulazione lenta non blocca il worker Flask. I worker importano numpy, scipy
+e matplotlib una sola volta all'avvio.
+"""
+import contextlib
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - piattaforme senza limiti POSIX
+    resource = None
+
+# Moduli importati una volta sola da ogni worker (o dal forkserver)
+PRELOAD_MODULES = ['numpy', 'scipy.integrate', 'matplotlib', 'matplotlib.pyplot']
+
+# Secondi concessi al worker per chiudere il job dopo lo scadere del timeout
+TIMEOUT_GRACE = 5
+
+
+class SimulationError(Exception):
+    """Errore sollevato dallo script di simulazione"""
+
+
+class SimulationTimeout(SimulationError):
+    """La simulazione ha superato il tempo massimo consentito"""
+
+
+def _raise_timeout(signum, frame):
+    raise SimulationTimeout('Simulation exceeded the time limit')
+
+
+def _init_worker(memory_limit_mb):
+    """Pre-riscalda il worker e applica il limite di memoria"""
+    import matplotlib
+    matplotlib.use('Agg')
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+
+    if resource is not None and memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Ciclo di un worker: riceve ``(funzione, argomenti)`` e risponde con l'esito"""
+    _init_worker(memory_limit_mb)
+    conn.send(('ready', os.getpid()))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = ('ok', fn(*args))
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Risultato o eccezione non serializzabile
+            conn.send(('error', SimulationError(f'{type(e).__name__}: {e}')))
+
+
+class _Worker:
+    """Processo worker dedicato, con una pipe privata verso il processo web"""
+
+    def __init__(self, context, memory_limit_mb):
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_limit_mb),
+                                       name='simulation-worker')
+        self.process.start()
+        child.close()
+        # Il riscaldamento non conta nel tempo dei job
+        try:
+            self._conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise SimulationError('Simulation worker failed to start')
+
+    def call(self, fn, args, timeout):
+        """Esegue ``fn(*args)`` nel worker; il tempo parte dall'invio del task
+
+        Raises:
+            SimulationTimeout: Nessuna risposta entro ``timeout``; il worker va terminato
+            SimulationError: Il worker è terminato durante il job
+        """
+        try:
+            self._conn.send((fn, args))
+            if not self._conn.poll(timeout):
+                # Bloccato in codice che SIGALRM non interrompe: si termina solo questo worker
+                self.kill()
+                raise SimulationTimeout('Simulation exceeded the time limit')
+            status, value = self._conn.recv()
+        except (EOFError, OSError):
+            raise SimulationError('Simulation worker terminated unexpectedly')
+        if status == 'error':
+            raise value
+        return value
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self._conn.close()
+
+    def stop(self):
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=TIMEOUT_GRACE)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self._conn.close()
+
+
+class _WorkerPool:
+    """Pool di worker in cui un job bloccato termina solo il proprio processo
+
+    Ogni worker è servito da un thread del processo web che gli passa un job
+    alla volta: il timeout di un job parte quando il worker lo riceve, non
+    quando entra in coda, e un worker terminato viene sostituito senza
+    toccare gli altri (a differenza di ``ProcessPoolExecutor``, in cui la
+    morte di un processo rende inutilizzabile l'intero pool).
+    """
+
+    def __init__(self, context, max_workers, memory_limit_mb):
+        self._context = context
+        self._memory_limit_mb = memory_limit_mb
+        self._tasks = queue.Queue()
+        self._workers = [_Worker(context, memory_limit_mb) for _ in range(max_workers)]
+        self._threads = [threading.Thread(target=self._serve, args=(index,), daemon=True,
+                                          name=f'simulation-worker-{index}')
+                         for index in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, args, timeout=None):
+        future = Future()
+        self._tasks.put((future, fn, args, timeout))
+        return future
+
+    def _serve(self, index):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, fn, args, timeout = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self._workers[index] is None:
+                    self._workers[index] = _Worker(self._context, self._memory_limit_mb)
+                future.set_result(self._workers[index].call(fn, args, timeout))
+            except BaseException as e:
+                future.set_exception(e)
+            # Un worker terminato (o ucciso per timeout) viene sostituito al job successivo
+            worker = self._workers[index]
+            if worker is not None and not worker.process.is_alive():
+                worker.kill()
+                self._workers[index] = None
+        worker = self._workers[index]
+        if worker is not None:
+            worker.stop()
+
+    def shutdown(self):
+        """Ferma i worker dopo i job in corso; i job ancora in coda vengono annullati"""
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[0].cancel()
+        for _ in self._threads:
+            self._tasks.put(None)
+
+
+class EventChannel:
+    """Canale verso il processo web per gli eventi di avanzamento di un job
+
+    Viene serializzato insieme al task: ``queue`` deve essere un proxy di
+    ``multiprocessing.Manager().Queue()``.
+    """
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+
+    def emit(self, kind, data=None):
+        self.queue.put((self.job_id, kind, data))
+
+
+class _StreamingOutput(io.StringIO):
+    """Buffer di stdout che inoltra ogni riga completa sul canale"""
+
+    def __init__(self, channel):
+        super().__init__()
+        self.channel = channel
+        self._pending = ''
+
+    def write(self, s):
+        self._pending += s
+        *lines, self._pending = self._pending.split('\n')
+        for line in lines:
+            self.channel.emit('stdout', line)
+        return super().write(s)
+
+    def flush_pending(self):
+        if self._pending:
+            self.channel.emit('stdout', self._pending)
+            self._pending = ''
+
+
+def _collect_figures(plt, figures, channel=None, formats=('png',), dpi=100):
+    """Salva nei formati richiesti e chiude tutte le figure aperte
+
+    Senza formati le figure vengono chiuse senza essere rasterizzate.
+    """
+    from simkit.figures import render_figure
+
+    for fig_num in plt.get_fignums():
+        if formats:
+            figures.append(render_figure(plt.figure(fig_num), formats, dpi))
+        plt.close(fig_num)
+        if formats and channel is not None:
+            channel.emit('figure', figures[-1])
+    return figures
+
+
+class _CellSession:
+    """Cattura e riproduce stdout, figure e oggetti pubblicati da una cella"""
+
+    def __init__(self, output, figures, artifacts, collect, channel=None):
+        self.output = output
+        self.figures = figures
+        self.artifacts = artifacts
+        self.collect = collect
+        self.channel = channel
+
+    def checkpoint(self):
+        return (len(self.output.getvalue()), len(self.figures),
+                {kind: dict(published) for kind, published in self.artifacts.items()})
+
+    def since(self, checkpoint):
+        # Come in un notebook, le figure rimaste aperte appartengono alla cella
+        self.collect()
+        output, figures, artifacts = checkpoint
+        return {
+            'output': self.output.getvalue()[output:],
+            'figures': self.figures[figures:],
+            'artifacts': {kind: {name: data for name, data in published.items()
+                                 if artifacts[kind].get(name) is not data}
+                          for kind, published in self.artifacts.items()}
+        }
+
+    def replay(self, record):
+        self.output.write(record['output'])
+        for figure in record['figures']:
+            self.figures.append(figure)
+            if self.channel is not None:
+                self.channel.emit('figure', figure)
+        for kind, published in record['artifacts'].items():
+            self.artifacts[kind].update(published)
+
+
+def _exec_notebook(simulation_path, cells, session, cell_cache, salt):
+    """Esegue uno script in stile notebook cella per cella (vedi ``simkit.notebook``)"""
+    import types
+    from simkit import notebook
+
+    module = types.ModuleType('simulation')
+    module.__file__ = str(simulation_path)
+    # I moduli locali importati dalle celle fanno parte della chiave
+    digest = hashlib.sha256(salt.encode('utf-8'))
+    for path in sorted(simulation_path.parent.glob('*.py')):
+        if path != simulation_path:
+            digest.update(path.name.encode('utf-8') + b'\0' + path.read_bytes())
+    notebook.run_cells(cells, module.__dict__, session, cell_cache, digest.hexdigest())
+
+
+def _reset_peak_memory():
+    """Azzera il picco di memoria residente del processo (VmHWM, solo Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_memory():
+    """Picco di memoria residente [byte] dall'ultimo azzeramento, o dall'avvio del processo"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss è in kB su Linux e in byte su macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+# Moduli parametrizzati già importati da questo worker: {percorso: (stamp, modulo)}
+_warm_modules = {}
+
+
+def _warm_module(simulation_path):
+    """Modulo di una simulazione parametrizzata, importato una volta per worker
+
+    Viene reimportato se cambia uno dei sorgenti Python della sua cartella.
+    """
+    stamp = tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size)
+                  for p in sorted(simulation_path.parent.glob('*.py')))
+    cached = _warm_modules.get(simulation_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    spec = importlib.util.spec_from_file_location("simulation", simulation_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _warm_modules[simulation_path] = (stamp, module)
+    return module
+
+
+def run_script(simulation_path, timeout=None, channel=None, figure_formats=('png',), figure_dpi=100,
+               cell_cache=None, params=None):
+    """Esegue uno script di simulazione nel processo corrente
+
+    Con un ``channel`` le righe di stdout e le figure vengono inoltrate man
+    mano che sono prodotte: ``plt.show()`` salva subito le figure aperte.
+
+    Con ``figure_formats`` vuoto lo script gira in modalità dati: le figure
+    non vengono rasterizzate e contano solo le serie pubblicate.
+
+    Gli script in stile notebook vengono eseguiti cella per cella; con una
+    ``cell_cache`` (``simkit.notebook.CellCache``) le celle invariate sono
+    ripristinate senza rieseguirle.
+
+    Gli script parametrizzati (vedi ``simkit.params``) sono importati una
+    volta per worker; ogni esecuzione chiama solo ``simulate`` con i default
+    dello schema aggiornati da ``params``.
+
+    Returns:
+        dict con 'output' (stdout catturato), 'figures' (``{formato: bytes}``
+        per figura, nei formati ``figure_formats`` a ``figure_dpi``), per
+        ogni tipo in ``runtime.ARTIFACT_KINDS`` gli oggetti pubblicati
+        (``{nome: npz in bytes}``), 'sheets' (``{nome: png}``, le sprite sheet
+        delle animazioni) e 'trace': inizio, durata delle fasi
+        'load' (lettura e import), 'execute' (codice dello script) e 'render'
+        (salvataggio delle figure) e picco di memoria del worker
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+    from simkit import cache as simkit_cache
+    from simkit import notebook, runtime
+    from simkit import params as simkit_params
+    from simkit.animation import Animation
+
+    simulation_path = Path(simulation_path).resolve()
+    sim_dir = str(simulation_path.parent)
+    modules_before = set(sys.modules)
+
+    spec = importlib.util.spec_from_file_location("simulation", simulation_path)
+    simulation_module = importlib.util.module_from_spec(spec)
+    output_capture = io.StringIO() if channel is None else _StreamingOutput(channel)
+    figures = []
+    original_show = plt.show
+    trace = {'started': time.time(), 'pid': os.getpid()}
+    rendering = [0.0]
+    _reset_peak_memory()
+    start = time.perf_counter()
+
+    def collect():
+        render_start = time.perf_counter()
+        try:
+            return _collect_figures(plt, figures, channel, figure_formats, figure_dpi)
+        finally:
+            rendering[0] += time.perf_counter() - render_start
+    plt.show = lambda *args, **kwargs: collect()
+    if channel is not None:
+        channel.emit('status', 'running')
+
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    sys.path.insert(0, sim_dir)
+    try:
+        with matplotlib.rc_context(), contextlib.redirect_stdout(output_capture), \
+                runtime.collect(figures=bool(figure_formats)) as artifacts:
+            schema = simkit_params.read_schema(simulation_path)
+            source = simulation_path.read_text(encoding='utf-8')
+            if schema is not None:
+                entry_point = getattr(_warm_module(simulation_path), simkit_params.ENTRY_POINT)
+                loaded = time.perf_counter()
+                entry_point(simkit_params.resolve(schema, params))
+            elif params:
+                raise SimulationError('This simulation does not accept parameters')
+            elif notebook.is_notebook(source):
+                cells = notebook.parse_notebook(source, str(simulation_path))
+                session = _CellSession(output_capture, figures, artifacts, collect, channel)
+                salt = repr((tuple(figure_formats), figure_dpi, simkit_cache.simkit_digest()))
+                loaded = time.perf_counter()
+                _exec_notebook(simulation_path, cells, session, cell_cache, salt)
+            else:
+                # Uno script semplice si carica eseguendolo: tutto il tempo è 'execute'
+                loaded = time.perf_counter()
+                spec.loader.exec_module(simulation_module)
+            collect()
+        if channel is not None:
+            output_capture.flush_pending()
+        finished = time.perf_counter()
+        trace['phases'] = {
+            'load': loaded - start,
+            'execute': max(finished - loaded - rendering[0], 0.0),
+            'render': rendering[0]
+        }
+        trace['peak_memory'] = _peak_memory()
+        # Le sprite sheet a parte, per salvarle nell'archivio delle figure senza decodificare gli npz
+        sheets = {name: Animation.load(io.BytesIO(data)).sheet
+                  for name, data in artifacts['animations'].items()}
+        return dict(artifacts, output=output_capture.getvalue(), figures=figures, sheets=sheets,
+                    trace=trace)
+    except SimulationError:
+        raise
+    except MemoryError:
+        raise SimulationError('Simulation exceeded the memory limit')
+    except Exception as e:
+        # Le note indicano la cella in cui è avvenuto l'errore
+        notes = ''.join(f' ({note})' for note in getattr(e, '__notes__', ()))
+        raise SimulationError(f'{type(e).__name__}: {e}{notes}')
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        plt.show = original_show
+        plt.close('all')
+        if sim_dir in sys.path:
+            sys.path.remove(sim_dir)
+        # I moduli locali del progetto vanno ricaricati al job successivo
+        for name in set(sys.modules) - modules_before:
+            module_file = getattr(sys.modules[name], '__file__', None) or ''
+            if module_file.startswith(sim_dir):
+                del sys.modules[name]
+
+
+class SimulationExecutor:
+    """Pool di processi che esegue le simulazioni in isolamento
+
+    Args:
+        max_workers: Numero di processi (default: numero di CPU)
+        timeout: Tempo massimo per simulazione [s]
+        memory_limit_mb: Limite dello spazio di indirizzamento di ogni worker [MB]
+        figure_formats: Formati in cui salvare le figure (png, svg, webp)
+        figure_dpi: Risoluzione delle figure raster
+        cell_cache: ``simkit.notebook.CellCache`` per gli script in stile notebook
+    """
+
+    def __init__(self, max_workers=None, timeout=120, memory_limit_mb=2048,
+                 figure_formats=('png',), figure_dpi=100, cell_cache=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.figure_formats = tuple(figure_formats)
+        self.figure_dpi = figure_dpi
+        self.cell_cache = cell_cache
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def mp_context(self):
+        """Contesto multiprocessing usato per i worker"""
+        methods = multiprocessing.get_all_start_methods()
+        if 'forkserver' in methods:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(PRELOAD_MODULES)
+            return context
+        return multiprocessing.get_context('spawn')
+
+    def start(self):
+        """Avvia il pool e attende che tutti i worker siano pronti"""
+        self._get_pool()
+        return self
+
+    def _create_pool(self):
+        # Backend non interattivo e BLAS a thread singolo: il parallelismo è tra i job
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+        for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+            os.environ.setdefault(var, '1')
+        return _WorkerPool(self.mp_context(), self.max_workers, self.memory_limit_mb)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+
+    def run(self, simulation_path, channel=None, figure_formats=None, params=None):
+        """Esegue una simulazione e ne restituisce il risultato
+
+        Args:
+            simulation_path: Percorso dello script
+            channel: ``EventChannel`` opzionale per gli eventi di avanzamento
+            figure_formats: Formati delle figure per questo job (default quelli
+                del pool; vuoto per la modalità dati)
+            params: Modifiche validate ai parametri di uno script parametrizzato
+
+        Raises:
+            SimulationTimeout: Il job ha superato il timeout
+            SimulationError: Lo script è fallito o il worker è terminato
+        """
+        pool = self._get_pool()
+        if figure_formats is None:
+            figure_formats = self.figure_formats
+        # Il timeout vale dall'inizio dell'esecuzione: l'attesa in coda non conta.
+        # Entro il timeout il worker si interrompe da solo (SIGALRM); oltre il
+        # margine di grazia il worker viene terminato e sostituito.
+        future = pool.submit(run_script, (str(simulation_path), self.timeout, channel,
+                                          tuple(figure_formats), self.figure_dpi, self.cell_cache, params),
+                             timeout=self.timeout + TIMEOUT_GRACE if self.timeout else None)
+        return future.result()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
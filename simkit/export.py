@@ -0,0 +1,118 @@
+"""Esportazione statica del sito per un CDN
+
+Le pagine renderizzate vengono scritte come ``<percorso>/index.html``, gli
+asset di ``static/`` con l'hash del contenuto nel nome (cacheabili senza
+scadenza) e i riferimenti nell'HTML aggiornati di conseguenza. Accanto a ogni
+file testuale vengono scritte le versioni precompresse ``.gz`` e, se il modulo
+``brotli`` è installato, ``.br``.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    brotli = None
+
+# Estensioni dei file da precomprimere
+COMPRESSIBLE = {'.html', '.css', '.js', '.svg', '.json', '.txt'}
+
+# File che identifica una cartella prodotta da un'esportazione
+EXPORT_MARKER = '.patentinsight-export'
+
+# Caratteri esadecimali dell'hash nei nomi degli asset
+ASSET_HASH_CHARS = 12
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def hash_assets(static_dir, output_dir, url_prefix='/static/'):
+    """Copia gli asset con l'hash del contenuto nel nome
+
+    Returns:
+        dict ``{URL originale: URL con hash}``
+    """
+    static_dir = Path(static_dir)
+    mapping = {}
+    for path in sorted(p for p in static_dir.rglob('*') if p.is_file()):
+        relative = path.relative_to(static_dir)
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:ASSET_HASH_CHARS]
+        hashed = relative.with_name(f'{path.stem}.{digest}{path.suffix}')
+        _write(Path(output_dir) / url_prefix.strip('/') / hashed, data)
+        mapping[url_prefix + relative.as_posix()] = url_prefix + hashed.as_posix()
+    return mapping
+
+
+def rewrite_urls(html, mapping):
+    """Sostituisce nell'HTML gli URL degli asset con quelli con hash"""
+    # I più lunghi per primi, così un URL non ne tocca un altro che lo contiene
+    for original in sorted(mapping, key=len, reverse=True):
+        html = html.replace(f'"{original}"', f'"{mapping[original]}"')
+    return html
+
+
+def page_path(output_dir, url_path):
+    """File di una pagina: ``/`` -> ``index.html``, ``/blog`` -> ``blog/index.html``"""
+    return Path(output_dir) / url_path.strip('/') / 'index.html'
+
+
+def write_page(output_dir, url_path, html, mapping):
+    path = page_path(output_dir, url_path)
+    _write(path, rewrite_urls(html, mapping).encode('utf-8'))
+    return path
+
+
+def copy_file(source, output_dir, url_path):
+    """Copia un file (ad esempio una figura) all'URL indicato"""
+    target = Path(output_dir) / url_path.lstrip('/')
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, target)
+    return target
+
+
+def compress_tree(output_dir):
+    """Scrive ``.gz`` (e ``.br``) accanto a ogni file comprimibile
+
+    La compressione è deterministica (nessun timestamp nell'header gzip), per
+    cui due esportazioni dello stesso sito producono gli stessi byte.
+
+    Returns:
+        Coppie ``(byte originali, byte gzip)`` per il riepilogo
+    """
+    sizes = []
+    for path in sorted(Path(output_dir).rglob('*')):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        data = path.read_bytes()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        path.with_name(path.name + '.gz').write_bytes(compressed)
+        if brotli is not None:
+            path.with_name(path.name + '.br').write_bytes(brotli.compress(data, quality=11))
+        sizes.append((len(data), len(compressed)))
+    return sizes
+
+
+def clean(output_dir):
+    """Svuota la cartella di destinazione di un'esportazione precedente
+
+    Raises:
+        ValueError: La cartella non è vuota e non contiene un'esportazione
+    """
+    output_dir = Path(output_dir)
+    if output_dir.exists() and any(output_dir.iterdir()):
+        if not (output_dir / EXPORT_MARKER).exists():
+            raise ValueError(f'{output_dir} is not empty and does not contain a previous export')
+        for path in output_dir.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / EXPORT_MARKER).touch()
@@ -0,0 +1,134 @@
+"""Archivio su disco delle figure, indirizzato per contenuto
+
+Ogni figura è salvata una sola volta con il nome ``<sha256>.<formato>``: lo
+stesso nome identifica sempre gli stessi byte, quindi può essere servita con
+caching immutabile e con l'hash come ETag. Le figure sono rasterizzate nei
+worker in uno o più formati (PNG, SVG, WebP) alla risoluzione configurata.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+# Formati supportati e relativi MIME type
+FIGURE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp'
+}
+
+_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.([a-z]+)$')
+
+
+def parse_formats(value):
+    """Converte una lista separata da virgole in formati validati"""
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FIGURE_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Unsupported figure formats: {value!r} "
+                         f"(choose from {', '.join(FIGURE_FORMATS)})")
+    return formats
+
+
+def render_figure(fig, formats=('png',), dpi=100):
+    """Salva una figura matplotlib in ciascun formato; restituisce ``{formato: bytes}``"""
+    import matplotlib
+
+    rendered = {}
+    # Id SVG deterministici e nessuna data nei metadati: figure uguali hanno
+    # byte, e quindi nomi, uguali
+    with matplotlib.rc_context({'svg.hashsalt': 'patentinsight'}):
+        for fmt in formats:
+            buffer = io.BytesIO()
+            extra = {'metadata': {'Date': None}} if fmt == 'svg' else {}
+            fig.savefig(buffer, format=fmt, bbox_inches='tight', dpi=dpi, **extra)
+            rendered[fmt] = buffer.getvalue()
+    return rendered
+
+
+class FigureStore:
+    """Figure salvate per contenuto, con limite di dimensione ed eviction LRU
+
+    Args:
+        directory: Cartella delle figure
+        max_bytes: Dimensione massima complessiva
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, name):
+        return self.directory / name[:2] / name
+
+    def put(self, data, fmt):
+        """Salva i byte di una figura e restituisce il suo nome"""
+        name = f'{hashlib.sha256(data).hexdigest()}.{fmt}'
+        path = self._path(name)
+        if path.exists():
+            os.utime(path)
+            return name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(staging, path)
+        self._evict()
+        return name
+
+    def put_all(self, rendered):
+        """Salva tutti i formati di una figura; restituisce ``{formato: nome}``"""
+        return {fmt: self.put(data, fmt) for fmt, data in rendered.items()}
+
+    def path(self, name):
+        """Percorso di una figura salvata, o None se il nome non è valido o manca"""
+        match = _NAME_PATTERN.match(name)
+        if not match or match.group(2) not in FIGURE_FORMATS:
+            return None
+        path = self._path(name)
+        return path if path.is_file() else None
+
+    def exists(self, names):
+        return all(self.path(name) is not None for name in names)
+
+    def touch(self, name):
+        """Segna la figura come usata di recente"""
+        try:
+            os.utime(self._path(name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def etag(name):
+        return _NAME_PATTERN.match(name).group(1)
+
+    @staticmethod
+    def mimetype(name):
+        return FIGURE_FORMATS[_NAME_PATTERN.match(name).group(2)]
+
+    def _evict(self):
+        """Elimina le figure usate meno di recente oltre ``max_bytes``"""
+        with self._lock:
+            files = []
+            for path in self.directory.glob('*/*'):
+                if path.name.startswith('.'):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files, key=lambda f: f[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
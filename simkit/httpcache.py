@@ -0,0 +1,148 @@
+"""Validatori HTTP e compressione delle risposte con cache in memoria
+
+L'ETag di una risposta è l'hash degli stamp (mtime e dimensione) dei file da
+cui è generata, più eventuali metadati; Last-Modified è il più recente degli
+mtime. Il corpo di ogni variante (identità, gzip, brotli) viene memorizzato
+per ETag e codifica, così una pagina che non è cambiata non viene né
+ri-renderizzata né ricompressa.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    brotli = None
+
+# Codifiche supportate, in ordine di preferenza a parità di qualità
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Sotto questa dimensione la compressione non conviene
+MIN_COMPRESS_BYTES = 512
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+def validators(paths, extra=''):
+    """ETag e Last-Modified per una risposta generata dai file indicati
+
+    I file mancanti contribuiscono all'ETag con il solo nome.
+
+    Returns:
+        ``(etag, last_modified)``; ``last_modified`` è None se nessun file esiste
+    """
+    digest = hashlib.sha256(extra.encode('utf-8'))
+    latest = None
+    for path in paths:
+        digest.update(os.fsencode(path))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f'{stat.st_mtime_ns}:{stat.st_size}'.encode('ascii'))
+        latest = stat.st_mtime if latest is None else max(latest, stat.st_mtime)
+    last_modified = None
+    if latest is not None:
+        last_modified = datetime.fromtimestamp(int(latest), tz=timezone.utc)
+    return digest.hexdigest()[:32], last_modified
+
+
+def compressible(mimetype):
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encodings):
+    """Codifica da usare per un ``Accept-Encoding`` (oggetto Accept di Werkzeug), o None"""
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class ResponseCache:
+    """Cache LRU in memoria dei corpi delle risposte, per ETag e codifica
+
+    Args:
+        max_bytes: Dimensione massima complessiva dei corpi memorizzati
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding):
+        with self._lock:
+            body = self._entries.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return body
+
+    def put(self, etag, encoding, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((etag, encoding), None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[(etag, encoding)] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def body(self, etag, encoding, render):
+        """Corpo della variante richiesta, renderizzando o comprimendo solo se manca
+
+        Args:
+            render: Funzione senza argomenti che restituisce il corpo in byte
+        """
+        body = self.get(etag, encoding)
+        if body is not None:
+            return body
+        if encoding is None:
+            body = render()
+        else:
+            body = compress(self.body(etag, None, render), encoding)
+        self.put(etag, encoding, body)
+        return body
+
+    def encoding_for(self, etag, encoding):
+        """Codifica che userebbe ``variant``, senza renderizzare né contare l'accesso
+
+        Se il corpo non è in cache restituisce ``encoding``.
+        """
+        with self._lock:
+            body = self._entries.get((etag, None))
+        if encoding is not None and body is not None and len(body) < MIN_COMPRESS_BYTES:
+            return None
+        return encoding
+
+    def variant(self, etag, encoding, render):
+        """Codifica effettivamente usata e corpo della risposta
+
+        Sotto ``MIN_COMPRESS_BYTES`` il corpo viene inviato senza compressione,
+        che su pochi byte non fa risparmiare nulla (e a volte li aumenta).
+        """
+        body = self.body(etag, None, render)
+        if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+            return None, body
+        return encoding, self.body(etag, encoding, render)
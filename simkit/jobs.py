@@ -0,0 +1,353 @@
+"""Job di simulazione asincroni con eventi di avanzamento
+
+Un job viene creato subito e restituisce un identificativo; la simulazione
+gira in background sul ``SimulationExecutor`` e pubblica righe di stdout e
+figure man mano che sono prodotte. I client possono consultare lo stato,
+attendere il risultato o seguire gli eventi (ad esempio via Server-Sent Events).
+Le figure vengono salvate nel ``FigureStore`` appena arrivano: job ed eventi
+ne riportano solo i nomi.
+
+Richieste identiche (stesso script, modalità e parametri) mentre una è in
+corso si agganciano allo stesso job invece di avviare un'altra esecuzione.
+Le esecuzioni nuove passano da un controllo di ammissione: un limite ai job in
+corso o in coda e uno per client, oltre i quali ``submit`` solleva
+``AdmissionError`` con il tempo stimato dopo cui riprovare.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+
+from simkit.cache import ARTIFACT_PREFIXES
+from simkit.executor import EventChannel, SimulationError, SimulationTimeout
+
+# Secondi per cui un job concluso resta consultabile
+JOB_TTL = 600
+
+
+class AdmissionError(Exception):
+    """Troppi job in corso: la richiesta va ripetuta dopo ``retry_after`` secondi"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def result_key(cache, simulation_path, figure_formats, figure_dpi, params=None):
+    """Chiave in cache del risultato di uno script con le opzioni di rendering e i parametri dati"""
+    options = {'formats': list(figure_formats), 'dpi': figure_dpi}
+    if params:
+        options['params'] = params
+    return cache.key(simulation_path, options)
+
+
+class Job:
+    """Stato e registro degli eventi di una singola simulazione"""
+
+    def __init__(self, job_id, cache_key, flight_key=None):
+        self.id = job_id
+        self.cache_key = cache_key
+        self.flight_key = flight_key
+        self.status = 'queued'
+        self.events = []
+        self.result = None
+        self.error = None
+        self.timed_out = False
+        self.cached = False
+        self.created = time.time()
+        self.finished = None
+        self.outcome = None
+        self.trace = None
+        self.event_error = None
+        self._condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def publish(self, kind, data=None):
+        """Aggiunge un evento e risveglia i client in attesa"""
+        with self._condition:
+            if kind == 'status':
+                self.status = data
+            self.events.append((kind, data))
+            self._condition.notify_all()
+
+    def finish(self, result=None, error=None, timed_out=False):
+        with self._condition:
+            self.result = result
+            self.error = error
+            self.timed_out = timed_out
+            self.status = 'failed' if error else 'done'
+            self.finished = time.time()
+            if error:
+                self.events.append(('error', error))
+            else:
+                self.events.append(('done', None))
+            self._condition.notify_all()
+
+    def wait_events(self, start, timeout=None):
+        """Restituisce gli eventi a partire da ``start``, attendendo se non ce ne sono"""
+        with self._condition:
+            if len(self.events) <= start and not self.done:
+                self._condition.wait(timeout)
+            return self.events[start:]
+
+    def wait(self, timeout=None):
+        """Attende la conclusione del job"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.done, timeout)
+        return self.done
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'cached': self.cached,
+            'events': len(self.events),
+            'created': self.created,
+            'finished': self.finished,
+            'error': self.error,
+            'trace': self.trace
+        }
+
+
+class JobManager:
+    """Crea ed esegue i job di simulazione
+
+    Args:
+        executor: ``SimulationExecutor`` su cui eseguire le simulazioni
+        figures: ``FigureStore`` in cui salvare le figure prodotte
+        cache: ``ResultCache`` opzionale consultata prima di ogni esecuzione
+        max_pending: Job in corso o in coda oltre i quali le nuove esecuzioni
+            vengono rifiutate (default quattro per worker)
+        max_per_client: Job in corso o in coda per singolo client
+        metrics: ``simkit.metrics.SimulationMetrics`` opzionale a cui inviare
+            la trace di ogni esecuzione
+    """
+
+    def __init__(self, executor, figures, cache=None, max_pending=None, max_per_client=2, metrics=None):
+        self.executor = executor
+        self.figures = figures
+        self.cache = cache
+        self.max_pending = max_pending or 4 * executor.max_workers
+        self.max_per_client = max_per_client
+        self.metrics = metrics
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._inflight = {}
+        self._clients = {}
+        self._avg_duration = 5.0
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._manager = None
+        self._queue = None
+
+    @property
+    def inflight(self):
+        """Numero di job in corso o in coda"""
+        with self._lock:
+            return len(self._inflight)
+
+    def _event_queue(self):
+        """Coda condivisa con i worker, avviata al primo job"""
+        with self._lock:
+            if self._queue is None:
+                self._manager = self.executor.mp_context().Manager()
+                self._queue = self._manager.Queue()
+                threading.Thread(target=self._dispatch, args=(self._queue,),
+                                 name='simulation-events', daemon=True).start()
+            return self._queue
+
+    def _dispatch(self, queue):
+        """Instrada gli eventi dei worker verso i rispettivi job"""
+        while True:
+            try:
+                job_id, kind, data = queue.get()
+            except (EOFError, OSError):
+                return
+            job = self.get(job_id)
+            if job is None or job.done:
+                continue
+            try:
+                if kind == '_finish':
+                    outcome = job.outcome
+                    if job.event_error and not outcome.get('error'):
+                        outcome = {'error': job.event_error}
+                    job.finish(**outcome)
+                elif kind == 'figure':
+                    job.publish(kind, self.figures.put_all(data))
+                else:
+                    job.publish(kind, data)
+            except Exception as e:
+                # Ad esempio disco pieno: l'errore chiude il job, il dispatcher continua
+                job.event_error = f'{type(e).__name__}: {e}'
+                if kind == '_finish':
+                    job.finish(error=job.event_error)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished > JOB_TTL]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _retry_after(self, queued):
+        """Secondi stimati prima che si liberi un posto"""
+        waves = max(queued, 1) / self.executor.max_workers
+        return min(max(math.ceil(self._avg_duration * waves), 1), 300)
+
+    def _admit(self, job, client):
+        """Registra un job nuovo, o restituisce quello identico già in corso"""
+        with self._lock:
+            running = self._inflight.get(job.flight_key)
+            if running is not None:
+                self.coalesced += 1
+                return running
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                raise AdmissionError('Too many simulations in progress, retry later',
+                                     self._retry_after(len(self._inflight)))
+            if client is not None:
+                owned = sum(1 for owner in self._clients.values() if owner == client)
+                if owned >= self.max_per_client:
+                    self.rejected += 1
+                    raise AdmissionError('Too many simulations in progress for this client',
+                                         self._retry_after(owned))
+                self._clients[job.id] = client
+            self._inflight[job.flight_key] = job
+            self._jobs[job.id] = job
+            return job
+
+    def _release(self, job):
+        with self._lock:
+            if self._inflight.get(job.flight_key) is job:
+                del self._inflight[job.flight_key]
+            self._clients.pop(job.id, None)
+            # Media mobile della durata, per stimare Retry-After
+            self._avg_duration += 0.2 * (time.time() - job.created - self._avg_duration)
+
+    def submit(self, simulation_path, figure_formats=None, params=None, client=None):
+        """Crea un job per lo script e lo avvia in background
+
+        Se un job identico è già in corso restituisce quello.
+
+        Args:
+            figure_formats: Formati delle figure (default quelli dell'executor);
+                una sequenza vuota esegue lo script in modalità dati
+            params: Modifiche validate ai parametri (vedi ``simkit.params``)
+            client: Identificativo del richiedente per il limite per client
+
+        Raises:
+            AdmissionError: Troppi job in corso, in totale o per ``client``
+        """
+        self._purge()
+        if figure_formats is None:
+            figure_formats = self.executor.figure_formats
+        cache_key = (result_key(self.cache, simulation_path, figure_formats,
+                                self.executor.figure_dpi, params)
+                     if self.cache else None)
+        flight_key = cache_key or json.dumps([str(simulation_path), list(figure_formats), params],
+                                             sort_keys=True)
+        with self._lock:
+            running = self._inflight.get(flight_key)
+            if running is not None:
+                self.coalesced += 1
+                return running
+
+        job = Job(uuid.uuid4().hex, cache_key, flight_key)
+        result = self.cache.get(cache_key) if self.cache else None
+        names = [] if result is None else [
+            name for figure in result['figures'] for name in figure.values()] + list(result['sheets'].values())
+        # Una voce le cui figure o sprite sheet sono state rimosse dall'archivio va ricalcolata
+        if result is not None and self.figures.exists(names):
+            # Risultato già disponibile: si riproducono gli eventi registrati
+            with self._lock:
+                self._jobs[job.id] = job
+                self.cache_hits += 1
+            job.cached = True
+            for line in result['output'].splitlines():
+                job.publish('stdout', line)
+            for name in names:
+                self.figures.touch(name)
+            for figure in result['figures']:
+                job.publish('figure', figure)
+            job.finish(result=result)
+            return job
+
+        admitted = self._admit(job, client)
+        if admitted is not job:
+            return admitted
+        threading.Thread(target=self._run, args=(job, simulation_path, figure_formats, params),
+                         name=f'simulation-{job.id}', daemon=True).start()
+        return job
+
+    def _run(self, job, simulation_path, figure_formats, params):
+        trace = {'job_id': job.id, 'simulation': str(simulation_path), 'formats': list(figure_formats),
+                 'params': params}
+        queue = None
+        try:
+            queue = self._event_queue()
+            result = self.executor.run(simulation_path, channel=EventChannel(queue, job.id),
+                                       figure_formats=figure_formats, params=params)
+            trace.update(result.pop('trace', {}), outcome='ok')
+            stored = time.perf_counter()
+            trace['figures'] = len(result['figures'])
+            trace['payload'] = {
+                'output': len(result['output'].encode('utf-8')),
+                'figures': sum(len(data) for figure in result['figures'] for data in figure.values())
+            }
+            for kind in ARTIFACT_PREFIXES:
+                trace['payload'][kind] = sum(len(data) for data in result.get(kind, {}).values())
+            result['figures'] = [self.figures.put_all(figure) for figure in result['figures']]
+            result['sheets'] = {name: self.figures.put(sheet, 'png')
+                                for name, sheet in result.get('sheets', {}).items()}
+            if self.cache is not None:
+                self.cache.put(job.cache_key, result, simulation_path)
+            trace['phases']['queue'] = max(trace['started'] - job.created, 0.0)
+            trace['phases']['store'] = time.perf_counter() - stored
+            job.outcome = {'result': result}
+        except SimulationTimeout as e:
+            job.outcome = {'error': str(e), 'timed_out': True}
+            trace['outcome'] = 'timeout'
+        except SimulationError as e:
+            job.outcome = {'error': str(e)}
+            trace['outcome'] = 'error'
+        except Exception as e:
+            # Anche un errore del gestore (coda degli eventi, archivio, cache) chiude il job
+            job.outcome = {'error': f'{type(e).__name__}: {e}'}
+            trace['outcome'] = 'error'
+        finally:
+            trace['duration'] = time.time() - job.created
+            job.trace = trace
+            # Dopo il salvataggio in cache: una richiesta identica successiva la trova
+            self._release(job)
+            try:
+                if self.metrics is not None:
+                    self.metrics.record(trace)
+            finally:
+                self._close(job, queue)
+
+    def _close(self, job, queue):
+        """Chiude il job dopo gli eventi del worker, o subito se la coda non è disponibile"""
+        if queue is not None:
+            try:
+                # Accodato dopo gli eventi del worker, così il job si chiude per ultimo
+                queue.put((job.id, '_finish', None))
+                return
+            except (EOFError, OSError):
+                pass
+        job.finish(**job.outcome)
+
+    def shutdown(self):
+        with self._lock:
+            manager, self._manager, self._queue = self._manager, None, None
+        if manager is not None:
+            manager.shutdown()
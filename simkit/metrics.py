@@ -0,0 +1,249 @@
+"""Metriche in formato testo Prometheus e trace delle esecuzioni
+
+``Registry`` raccoglie contatori, gauge e istogrammi con etichette e li
+espone nel formato di esposizione testuale (``text/plain; version=0.0.4``).
+``SimulationMetrics`` registra per ogni esecuzione i tempi delle fasi, il
+numero di figure, i byte prodotti e il picco di memoria del worker e, se
+configurato, aggiunge una riga JSON per esecuzione a un file di trace.
+``StartupTimer`` misura le fasi di avvio del processo web.
+"""
+import bisect
+import json
+import math
+import sys
+import threading
+import time
+
+# Limiti superiori dei bucket [s]
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Limiti superiori dei bucket [byte]
+SIZE_BUCKETS = tuple(2 ** n for n in range(10, 31, 2))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Moduli scientifici che il processo web importa solo quando serve un artifact
+HEAVY_MODULES = ('numpy', 'scipy', 'matplotlib', 'PIL')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def samples(self):
+        if self.collect is not None:
+            value = self.collect()
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for name, key, value in self.samples():
+            lines.append(f'{name}{_labels(self.labels, key)} {_number(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        samples = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', key + (_number(bound),), cumulative))
+            samples.append((f'{self.name}_sum', key, total))
+            samples.append((f'{self.name}_count', key, cumulative))
+        return samples
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for name, key, value in self.samples():
+            labels = self.labels + ('le',) if name.endswith('_bucket') else self.labels
+            lines.append(f'{name}{_labels(labels, key)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    """Insieme delle metriche esposte da ``/metrics``"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=(), collect=None):
+        """Contatore; con ``collect`` il valore viene letto a ogni esposizione"""
+        return self._add(Counter(name, help, labels, collect))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._add(Gauge(name, help, labels, collect))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class SimulationMetrics:
+    """Metriche e trace delle esecuzioni delle simulazioni
+
+    Args:
+        registry: ``Registry`` in cui registrare le metriche
+        trace_path: File a cui aggiungere una riga JSON per esecuzione (opzionale)
+    """
+
+    def __init__(self, registry, trace_path=None):
+        self.trace_path = trace_path
+        self._trace_lock = threading.Lock()
+        self.runs = registry.counter(
+            'simulation_runs_total', 'Simulation executions by outcome', ('outcome',))
+        self.phases = registry.histogram(
+            'simulation_phase_seconds', 'Time spent in each phase of a simulation run', ('phase',),
+            PHASE_BUCKETS)
+        self.duration = registry.histogram(
+            'simulation_duration_seconds', 'Total time of a simulation run, queue included', (),
+            PHASE_BUCKETS)
+        self.figures = registry.counter(
+            'simulation_figures_total', 'Figures produced by simulation runs')
+        self.payload = registry.histogram(
+            'simulation_payload_bytes', 'Bytes produced by a simulation run', ('kind',), SIZE_BUCKETS)
+        self.memory = registry.histogram(
+            'simulation_peak_memory_bytes', 'Peak resident memory of the worker during a run', (),
+            SIZE_BUCKETS)
+
+    def record(self, trace):
+        """Registra la trace di un'esecuzione (vedi ``JobManager``)"""
+        self.runs.inc(outcome=trace['outcome'])
+        for phase, seconds in trace.get('phases', {}).items():
+            self.phases.observe(seconds, phase=phase)
+        if 'duration' in trace:
+            self.duration.observe(trace['duration'])
+        self.figures.inc(trace.get('figures', 0))
+        for kind, size in trace.get('payload', {}).items():
+            self.payload.observe(size, kind=kind)
+        if trace.get('peak_memory'):
+            self.memory.observe(trace['peak_memory'])
+        if self.trace_path:
+            line = json.dumps(trace, sort_keys=True, default=str)
+            with self._trace_lock, open(self.trace_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def resident_memory():
+    """Memoria residente attuale del processo [byte], o None se non disponibile"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class StartupTimer:
+    """Tempi delle fasi di avvio del processo web
+
+    Args:
+        start: ``time.perf_counter()`` preso all'inizio dell'import dell'app
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.phases = {}
+        self._last = start
+
+    def mark(self, phase):
+        """Chiude la fase in corso, dall'ultimo ``mark`` a ora"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.start
+
+    def report(self):
+        """Fasi [s], totale, moduli caricati e memoria residente al momento della chiamata"""
+        return {
+            'phases': dict(self.phases),
+            'total': self.total,
+            'modules': len(sys.modules),
+            'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+            'resident_memory': resident_memory(),
+        }
+
+    def register(self, registry):
+        """Espone le fasi, la memoria e i moduli pesanti caricati in ``registry``"""
+        registry.gauge('app_startup_seconds', 'Time spent in each phase of the web process startup', ('phase',),
+                       collect=lambda: {(phase,): seconds for phase, seconds in self.phases.items()})
+        registry.gauge('process_resident_memory_bytes', 'Resident memory of the web process',
+                       collect=lambda: resident_memory() or 0)
+        registry.gauge('app_heavy_module_loaded', 'Whether a heavy scientific module is imported in the web process',
+                       ('module',), collect=lambda: {(name,): int(name in sys.modules) for name in HEAVY_MODULES})
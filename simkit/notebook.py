@@ -0,0 +1,446 @@
+"""Esecuzione incrementale degli script in stile notebook
+
+Alcuni script di simulazione sono esportazioni di notebook: titoli
+``## Cella N`` e testo in prosa alternati al codice, quindi non sono
+importabili così come sono. Il file viene diviso in celle a ogni titolo
+(``##`` o più, a inizio riga); dentro una cella sono codice i paragrafi che
+Python riesce a interpretare, il resto è prosa e viene ignorato.
+
+Per ogni cella un'analisi statica ricava i nomi globali che definisce (anche
+modificandoli con ``x[...] = ...`` o con metodi come ``append``) e quelli che
+legge. La chiave di una cella è l'hash del suo codice e delle chiavi delle
+celle che hanno prodotto i nomi letti: modificare una cella invalida solo le
+celle a valle che ne dipendono. Per ogni chiave ``CellCache`` conserva i
+valori definiti (serializzati con pickle), lo stdout, le figure e gli oggetti
+pubblicati, che vengono ripristinati senza rieseguire la cella.
+
+Funzioni, classi e import definiti al livello principale di una cella non
+vengono serializzati ma ricreati rieseguendo le sole istruzioni ``def``,
+``class`` e ``import``. I valori che non si possono serializzare (figure
+matplotlib, lambda, ...) non vengono salvati: se una cella da rieseguire li
+legge, viene rieseguita anche la cella che li produce.
+"""
+import ast
+import hashlib
+import io
+import os
+import pickle
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# Titoli che separano le celle
+_HEADING = re.compile(r'^#{2,}\s+(.*\S)\s*$')
+
+# Metodi che modificano l'oggetto su cui sono chiamati
+MUTATING_METHODS = frozenset({
+    'append', 'extend', 'insert', 'update', 'pop', 'popitem', 'clear', 'remove',
+    'setdefault', 'add', 'discard', 'sort', 'reverse', 'fill', 'resize', 'put'
+})
+
+# Nodi che aprono uno scope: i nomi assegnati al loro interno non sono globali
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+           ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+# Istruzioni rieseguite per ripristinare una cella dalla cache
+_REPLAYED = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom)
+
+
+def is_notebook(source):
+    """True se il sorgente non è Python valido ma contiene titoli di cella"""
+    try:
+        compile(source, '<simulation>', 'exec', dont_inherit=True)
+    except SyntaxError:
+        return any(_HEADING.match(line) for line in source.splitlines())
+    return False
+
+
+def _is_prose(tree):
+    """Paragrafi interpretabili come Python ma fatti solo di parole o costanti"""
+    return all(isinstance(node, ast.Expr) and isinstance(node.value, (ast.Name, ast.Constant))
+               for node in tree.body)
+
+
+def _paragraphs(lines, start):
+    """Divide le righe di una cella dove una riga vuota precede una riga non indentata"""
+    block, first = [], start
+    for offset, line in enumerate(lines):
+        if block and line and not line[0].isspace() and not block[-1].strip():
+            yield first, block
+            block, first = [], start + offset
+        block.append(line)
+    if block:
+        yield first, block
+
+
+def _code_chunks(lines, start):
+    """Blocchi di codice di una cella, come ``(prima riga, albero)``
+
+    Un paragrafo che non si interpreta da solo viene unito ai successivi
+    (ad esempio un ``else:`` dopo una riga vuota); se non si interpreta in
+    nessun modo è prosa.
+    """
+    paragraphs = list(_paragraphs(lines, start))
+    i = 0
+    while i < len(paragraphs):
+        first = paragraphs[i][0]
+        for j in range(i + 1, len(paragraphs) + 1):
+            text = '\n'.join(line for _, block in paragraphs[i:j] for line in block)
+            try:
+                tree = ast.parse(text)
+            except SyntaxError:
+                continue
+            if tree.body and not _is_prose(tree):
+                ast.increment_lineno(tree, first - 1)
+                yield first, text, tree
+                i = j
+            else:
+                i += 1
+            break
+        else:
+            i += 1
+
+
+def _stores(node, names):
+    """Nomi assegnati nello scope globale da ``node``"""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in child.names)
+        elif isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            names.add(child.id)
+        if not isinstance(child, _SCOPES):
+            _stores(child, names)
+    return names
+
+
+def _base_name(node):
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _scope_locals(node):
+    """Nomi locali di una funzione, lambda, classe o comprehension"""
+    if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+        return {n.id for generator in node.generators for n in ast.walk(generator.target)
+                if isinstance(n, ast.Name)}
+    names = _stores(node, set())
+    if not isinstance(node, ast.ClassDef):
+        args = node.args
+        names.update(arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs)
+        names.update(arg.arg for arg in (args.vararg, args.kwarg) if arg)
+    return names - {name for n in ast.walk(node) if isinstance(n, ast.Global) for name in n.names}
+
+
+class _Reads(ast.NodeVisitor):
+    """Nomi letti da una cella prima di essere assegnati al suo interno
+
+    I valori vengono visitati prima dei bersagli delle assegnazioni; i corpi
+    di funzioni e comprehension leggono i nomi globali che non sono locali.
+    """
+
+    def __init__(self):
+        self.bound = set()
+        self.reads = set()
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            if node.id not in self.bound:
+                self.reads.add(node.id)
+        else:
+            self.bound.add(node.id)
+
+    def visit_Assign(self, node):
+        self.visit(node.value)
+        for target in node.targets:
+            self.visit(target)
+
+    def visit_AnnAssign(self, node):
+        if node.value:
+            self.visit(node.value)
+        self.visit(node.target)
+
+    def visit_AugAssign(self, node):
+        name = _base_name(node.target)
+        if name and name not in self.bound:
+            self.reads.add(name)
+        self.visit(node.value)
+        self.visit(node.target)
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self.visit(node.target)
+        for child in node.body + node.orelse:
+            self.visit(child)
+
+    def _scope(self, node):
+        local = _scope_locals(node)
+        self.reads.update(n.id for n in ast.walk(node)
+                          if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)
+                          and n.id not in local and n.id not in self.bound)
+
+    def visit_FunctionDef(self, node):
+        for child in node.decorator_list + node.args.defaults + node.args.kw_defaults:
+            if child is not None:
+                self.visit(child)
+        self._scope(node)
+        self.bound.add(node.name)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._scope(node)
+        self.bound.add(node.name)
+
+    def visit_Lambda(self, node):
+        self._scope(node)
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = visit_Lambda
+
+    def visit_alias(self, node):
+        self.bound.add((node.asname or node.name).split('.')[0])
+
+
+class Cell:
+    """Cella di codice di uno script in stile notebook
+
+    Args:
+        title: Titolo della cella
+        chunks: Blocchi di codice come ``(prima riga, testo, albero)``
+        filename: File da cui proviene (per i traceback)
+    """
+
+    def __init__(self, title, chunks, filename):
+        self.title = title
+        self.source = '\n\n'.join(text for _, text, _ in chunks)
+        self.lineno = chunks[0][0]
+        tree = ast.Module(body=[node for _, _, chunk in chunks for node in chunk.body],
+                          type_ignores=[])
+        self.code = compile(tree, filename, 'exec', dont_inherit=True)
+        replayed = ast.Module(body=[node for node in tree.body if isinstance(node, _REPLAYED)],
+                              type_ignores=[])
+        self.replay = compile(replayed, filename, 'exec', dont_inherit=True)
+        self.replayed_names = _stores(replayed, set())
+        self.defines, self.reads = self._analyze(tree)
+
+    @staticmethod
+    def _analyze(tree):
+        defines = _stores(tree, set())
+        modules = {(alias.asname or alias.name).split('.')[0]
+                   for node in ast.walk(tree) if isinstance(node, (ast.Import, ast.ImportFrom))
+                   for alias in node.names}
+        visitor = _Reads()
+        visitor.visit(tree)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Global):
+                defines.update(node.names)
+            elif isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Delete)):
+                # x[...] = ... e x.attr = ... modificano x
+                targets = getattr(node, 'targets', None) or [node.target]
+                for target in targets:
+                    if isinstance(target, (ast.Attribute, ast.Subscript)):
+                        name = _base_name(target)
+                        if name:
+                            defines.add(name)
+            elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                  and node.func.attr in MUTATING_METHODS):
+                name = _base_name(node.func.value)
+                if name and name not in modules:
+                    defines.add(name)
+        return defines, visitor.reads
+
+    def __repr__(self):
+        return f'Cell({self.title!r}, line {self.lineno})'
+
+
+def parse_notebook(source, filename='<simulation>'):
+    """Divide uno script in stile notebook in celle di codice"""
+    cells = []
+    title, start, lines = 'Preambolo', 1, []
+
+    def close():
+        chunks = list(_code_chunks(lines, start))
+        if chunks:
+            cells.append(Cell(title, chunks, filename))
+
+    for lineno, line in enumerate(source.splitlines(), 1):
+        match = _HEADING.match(line)
+        if match:
+            close()
+            title, start, lines = match.group(1), lineno + 1, []
+        else:
+            lines.append(line)
+    close()
+    return cells
+
+
+def cell_keys(cells, salt=''):
+    """Chiave di ogni cella, dal suo codice e dalle chiavi delle celle da cui legge
+
+    Returns:
+        (lista di chiavi, lista di ``{nome: indice della cella produttrice}``)
+    """
+    keys, producers, last = [], [], {}
+    for index, cell in enumerate(cells):
+        inputs = {name: last[name] for name in cell.reads if name in last}
+        digest = hashlib.sha256(salt.encode('utf-8'))
+        digest.update(cell.source.encode('utf-8'))
+        for name in sorted(inputs):
+            digest.update(f'\0{name}={keys[inputs[name]]}'.encode('utf-8'))
+        keys.append(digest.hexdigest())
+        producers.append(inputs)
+        last.update(dict.fromkeys(cell.defines, index))
+    return keys, producers
+
+
+class _Volatile(Exception):
+    pass
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler che rifiuta moduli e oggetti matplotlib (figure, assi, ...)"""
+
+    def persistent_id(self, obj):
+        artist = sys.modules.get('matplotlib.artist')
+        if artist is not None and isinstance(obj, artist.Artist):
+            raise _Volatile
+        return None
+
+
+def _dumps(value):
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+    return buffer.getvalue()
+
+
+class CellCache:
+    """Risultati delle celle su disco, con limite di dimensione ed eviction LRU
+
+    Non usa lock: può essere passata ai worker, e le scritture sono atomiche.
+
+    Args:
+        directory: Cartella delle voci
+        max_bytes: Dimensione massima complessiva
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / key[:2] / f'{key}.pkl'
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)  # Aggiorna l'ordine LRU
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix='.tmp-', dir=path.parent)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, path)
+        self._evict()
+
+    def _evict(self):
+        """Elimina le voci usate meno di recente oltre ``max_bytes``"""
+        files = []
+        for path in self.directory.glob('*/*.pkl'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+
+def _capture(cell, namespace):
+    """Valori definiti da una cella: ``({nome: pickle}, nomi non serializzabili)``"""
+    values, volatile = {}, []
+    for name in sorted(cell.defines - cell.replayed_names):
+        if name not in namespace:
+            continue  # Nome locale a una funzione, o eliminato
+        try:
+            values[name] = _dumps(namespace[name])
+        except Exception:
+            volatile.append(name)
+    return values, volatile
+
+
+def _add_note(exception, note):
+    """``exception.add_note`` anche prima di Python 3.11, dove le note non esistono"""
+    if hasattr(exception, 'add_note'):
+        exception.add_note(note)
+    else:
+        exception.__notes__ = list(getattr(exception, '__notes__', ())) + [note]
+
+
+def run_cells(cells, namespace, session, cache=None, salt=''):
+    """Esegue le celle nel namespace, ripristinando dalla cache quelle invariate
+
+    Args:
+        cells: Celle da ``parse_notebook``
+        namespace: Dizionario globale in cui eseguire il codice
+        session: Oggetto con ``checkpoint()``, ``since(checkpoint)`` e
+            ``replay(record)`` che cattura e riproduce stdout, figure e
+            oggetti pubblicati da una cella
+        cache: ``CellCache`` opzionale
+        salt: Stringa inclusa in tutte le chiavi (opzioni che cambiano i risultati)
+
+    Returns:
+        Lista dei titoli delle celle eseguite
+    """
+    keys, producers = cell_keys(cells, salt)
+    entries = [cache.get(key) if cache else None for key in keys]
+    run = {index for index, entry in enumerate(entries) if entry is None}
+
+    # Una cella da eseguire che legge un valore non salvato richiede la sua produttrice
+    changed = True
+    while changed:
+        changed = False
+        for index in sorted(run):
+            for name, producer in producers[index].items():
+                if producer not in run and name in entries[producer]['volatile']:
+                    run.add(producer)
+                    changed = True
+
+    executed = []
+    for index, cell in enumerate(cells):
+        entry = entries[index]
+        if index not in run:
+            exec(cell.replay, namespace)
+            namespace.update({name: pickle.loads(data) for name, data in entry['values'].items()})
+            session.replay(entry['record'])
+            continue
+
+        checkpoint = session.checkpoint()
+        try:
+            exec(cell.code, namespace)
+        except BaseException as e:
+            _add_note(e, f'in {cell.title!r} (line {cell.lineno})')
+            raise
+        record = session.since(checkpoint)
+        executed.append(cell.title)
+        if cache is not None and entry is None:
+            values, volatile = _capture(cell, namespace)
+            cache.put(keys[index], {'values': values, 'volatile': volatile, 'record': record})
+    return executed
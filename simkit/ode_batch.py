@@ -0,0 +1,211 @@
+"""Integrazione simultanea di un batch di problemi ai valori iniziali
+
+Lo schema è il Dormand-Prince 5(4) di ``scipy.integrate.solve_ivp(method='RK45')``
+con gli stessi coefficienti, la stessa stima dell'errore e la stessa uscita
+densa, ma applicato a tutte le varianti di parametri insieme: lo stato è un
+array ``(n_state, n_batch)`` e la funzione del sistema viene valutata una sola
+volta per stadio sull'intero batch. Ogni membro ha il proprio tempo e il
+proprio passo, quindi il controllo dell'errore resta individuale; i membri che
+hanno raggiunto ``t_span[1]`` escono dal calcolo.
+"""
+import numpy as np
+
+# Coefficienti di Dormand-Prince (scipy.integrate._ivp.rk.RK45)
+C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+A = np.array([
+    [0, 0, 0, 0, 0],
+    [1/5, 0, 0, 0, 0],
+    [3/40, 9/40, 0, 0, 0],
+    [44/45, -56/15, 32/9, 0, 0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]
+])
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]
+])
+
+ERROR_EXPONENT = -1 / 5
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+
+
+class BatchResult:
+    """Soluzione di ``solve_ivp_batch``
+
+    Attributes:
+        t: Istanti di uscita, shape (n_points,)
+        y: Stati, shape (n_state, n_batch, n_points); NaN negli istanti non
+            raggiunti dai membri con status -1
+        status: Per membro, 0 se ha raggiunto la fine, -1 se il passo è collassato
+        nfev: Numero di valutazioni (vettoriali) della funzione del sistema
+        nsteps: Passi accettati per membro
+    """
+
+    def __init__(self, t, y, status, nfev, nsteps):
+        self.t = t
+        self.y = y
+        self.status = status
+        self.nfev = nfev
+        self.nsteps = nsteps
+
+    @property
+    def success(self):
+        return bool(np.all(self.status == 0))
+
+
+def _rms(x):
+    return np.sqrt(np.mean(x**2, axis=0))
+
+
+def _subset(params, idx, n_batch):
+    """Seleziona i parametri dei membri attivi (gli scalari sono condivisi)"""
+    if params is None:
+        return None
+    return {name: value[idx] if np.ndim(value) and np.shape(value)[0] == n_batch else value
+            for name, value in params.items()}
+
+
+def _initial_step(fun, t0, y0, f0, params, rtol, atol, direction):
+    """Passo iniziale per membro (scipy.integrate._ivp.common.select_initial_step)"""
+    scale = atol + np.abs(y0) * rtol
+    d0 = _rms(y0 / scale)
+    d1 = _rms(f0 / scale)
+    h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / np.maximum(d1, 1e-300))
+
+    y1 = y0 + h0 * direction * f0
+    f1 = np.asarray(fun(t0 + h0 * direction, y1, params), dtype=float)
+    d2 = _rms((f1 - f0) / scale) / h0
+
+    dmax = np.maximum(d1, d2)
+    h1 = np.where(dmax <= 1e-15, np.maximum(1e-6, h0 * 1e-3),
+                  (0.01 / np.maximum(dmax, 1e-300)) ** (1 / 5))
+    return np.minimum(100 * h0, h1)
+
+
+def solve_ivp_batch(fun, t_span, y0, t_eval=None, params=None,
+                    rtol=1e-3, atol=1e-6, max_step=np.inf):
+    """Integra un batch di sistemi con lo schema RK45 e passo adattivo per membro
+
+    Args:
+        fun: Funzione ``fun(t, y, params)`` con ``t`` shape (k,), ``y`` shape
+            (n_state, k); restituisce le derivate con shape (n_state, k)
+        t_span: Intervallo di integrazione (t0, t1)
+        y0: Stato iniziale, shape (n_state,) condiviso o (n_state, n_batch)
+        t_eval: Istanti comuni in cui restituire la soluzione (default: t0 e t1)
+        params: Dizionario di parametri; i valori con shape (n_batch,) sono
+            per membro, gli scalari sono comuni a tutto il batch
+        rtol, atol, max_step: Come in ``scipy.integrate.solve_ivp``
+
+    Returns:
+        BatchResult
+    """
+    t0, t1 = map(float, t_span)
+    direction = np.sign(t1 - t0) if t1 != t0 else 1.0
+
+    n_batch = 1
+    if params is not None:
+        for value in params.values():
+            if np.ndim(value):
+                n_batch = max(n_batch, np.shape(value)[0])
+    y0 = np.asarray(y0, dtype=float)
+    if y0.ndim == 1:
+        y0 = np.repeat(y0[:, None], n_batch, axis=1)
+    n_state, n_batch = y0.shape
+
+    t_eval = np.array([t0, t1]) if t_eval is None else np.asarray(t_eval, dtype=float)
+    # I membri interrotti (status -1) restano NaN negli istanti non raggiunti
+    out = np.full((n_state, n_batch, t_eval.size), np.nan)
+    # Indici di t_eval nel verso di integrazione
+    order = np.arange(t_eval.size) if direction > 0 else np.arange(t_eval.size)[::-1]
+    t_sorted = direction * t_eval[order]
+
+    t = np.full(n_batch, t0)
+    y = y0.copy()
+    f = np.asarray(fun(t, y, params), dtype=float)
+    h = _initial_step(fun, t, y, f, params, rtol, atol, direction)
+    h = np.minimum(h, max_step)
+    nfev = 2
+
+    # Puntatore al primo istante di uscita non ancora calcolato per ogni membro
+    ptr = np.full(n_batch, np.searchsorted(t_sorted, direction * t0, side='right'))
+    out[:, :, order[:ptr[0]]] = y[:, :, None]
+    rejected = np.zeros(n_batch, dtype=bool)
+    status = np.zeros(n_batch, dtype=int)
+    nsteps = np.zeros(n_batch, dtype=int)
+    active = np.full(n_batch, t0 != t1)
+    K = np.empty((7, n_state, n_batch))
+
+    while active.any():
+        idx = np.flatnonzero(active)
+        k = idx.size
+        ti, yi, hi = t[idx], y[:, idx], h[idx]
+        pi = _subset(params, idx, n_batch)
+
+        # L'ultimo passo termina esattamente in t1
+        last = hi >= np.abs(t1 - ti)
+        hi = np.where(last, np.abs(t1 - ti), hi)
+        step = hi * direction
+
+        Ki = K[:, :, :k]
+        Ki[0] = f[:, idx]
+        for s in range(1, 6):
+            dy = np.tensordot(A[s, :s], Ki[:s], axes=1) * step
+            Ki[s] = fun(ti + C[s] * step, yi + dy, pi)
+        y_new = yi + np.tensordot(B, Ki[:6], axes=1) * step
+        t_new = np.where(last, t1, ti + step)
+        Ki[6] = fun(t_new, y_new, pi)
+        nfev += 6
+
+        scale = atol + np.maximum(np.abs(yi), np.abs(y_new)) * rtol
+        error_norm = _rms(np.tensordot(E, Ki, axes=1) * step / scale)
+        accept = error_norm < 1
+
+        with np.errstate(divide='ignore'):
+            factor = SAFETY * error_norm ** ERROR_EXPONENT
+        grow = np.where(error_norm == 0, MAX_FACTOR, np.minimum(MAX_FACTOR, factor))
+        grow = np.where(rejected[idx], np.minimum(1, grow), grow)
+        shrink = np.maximum(MIN_FACTOR, factor)
+        h[idx] = np.minimum(np.where(accept, hi * grow, hi * shrink), max_step)
+        rejected[idx] = ~accept
+
+        # Passo collassato: il membro viene fermato come in solve_ivp
+        min_step = 10 * np.abs(np.nextafter(ti, direction * np.inf) - ti)
+        failed = ~accept & (h[idx] < min_step)
+        status[idx[failed]] = -1
+        active[idx[failed]] = False
+
+        if not accept.any():
+            continue
+        acc = idx[accept]
+        y_old, h_acc, t_old = yi[:, accept], step[accept], ti[accept]
+
+        # Uscita densa sugli istanti di t_eval attraversati dal passo
+        Q = np.einsum('smk,sq->mkq', Ki[:, :, accept], P)
+        end = np.searchsorted(t_sorted, direction * t_new[accept], side='right')
+        start = ptr[acc]
+        counts = end - start
+        for j in range(counts.max(initial=0)):
+            sel = counts > j
+            pos = order[start[sel] + j]
+            x = (t_eval[pos] - t_old[sel]) / h_acc[sel]
+            powers = x[None, :] ** np.arange(1, 5)[:, None]
+            out[:, acc[sel], pos] = y_old[:, sel] + h_acc[sel] * np.einsum(
+                'mkq,qk->mk', Q[:, sel], powers)
+        ptr[acc] = end
+
+        t[acc] = t_new[accept]
+        y[:, acc] = y_new[:, accept]
+        f[:, acc] = Ki[6][:, accept]
+        nsteps[acc] += 1
+        active[acc[last[accept]]] = False
+
+    return BatchResult(t_eval, out, status, nfev, nsteps)
@@ -0,0 +1,106 @@
+"""Simulazioni parametrizzate: schema dei parametri e punto d'ingresso
+
+Uno script di simulazione può esporre i propri parametri e una funzione da
+chiamare al posto dell'esecuzione del modulo::
+
+    PARAMETERS = {
+        'tau_m': {'default': 0.5, 'min': 0.05, 'max': 2.0,
+                  'unit': 'N·m', 'label': 'Coppia motrice'},
+        'method': {'default': 'RK45', 'choices': ['RK45', 'Radau']},
+    }
+
+    def simulate(params):
+        ...
+
+Lo schema deve essere un letterale: il sito lo legge con ``ast`` senza
+importare lo script e valida le modifiche prima di inviarle a un worker. Il
+tipo di ogni parametro è quello del suo default (numero intero o decimale,
+booleano o, con ``choices``, una delle stringhe ammesse). Nei worker il modulo
+viene importato una volta sola: ogni esecuzione costa solo la chiamata a
+``simulate`` con i default aggiornati dalle modifiche.
+"""
+import ast
+import functools
+import math
+from pathlib import Path
+
+SCHEMA_NAME = 'PARAMETERS'
+ENTRY_POINT = 'simulate'
+
+
+@functools.lru_cache(maxsize=64)
+def _read_schema(path, mtime_ns):
+    tree = ast.parse(Path(path).read_bytes(), filename=path)
+    schema, entry_point = None, False
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == ENTRY_POINT:
+            entry_point = True
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1
+              and isinstance(node.targets[0], ast.Name) and node.targets[0].id == SCHEMA_NAME):
+            schema = ast.literal_eval(node.value)
+    if schema is None or not entry_point:
+        return None
+    for name, spec in schema.items():
+        if 'default' not in spec:
+            raise ValueError(f'Parameter {name!r} has no default')
+    return schema
+
+
+def read_schema(simulation_path):
+    """Schema dei parametri di uno script, o None se non è parametrizzato"""
+    path = Path(simulation_path).resolve()
+    try:
+        return _read_schema(str(path), path.stat().st_mtime_ns)
+    except (OSError, SyntaxError):
+        return None
+
+
+def _coerce(name, spec, value):
+    default = spec['default']
+    if 'choices' in spec:
+        if value not in spec['choices']:
+            raise ValueError(f"Parameter {name!r} must be one of {', '.join(map(str, spec['choices']))}")
+        return value
+    if isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f'Parameter {name!r} must be true or false')
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'Parameter {name!r} must be a finite number')
+    if isinstance(default, int):
+        if value != int(value):
+            raise ValueError(f'Parameter {name!r} must be an integer')
+        value = int(value)
+    else:
+        value = float(value)
+    if 'min' in spec and value < spec['min']:
+        raise ValueError(f"Parameter {name!r} must be at least {spec['min']}")
+    if 'max' in spec and value > spec['max']:
+        raise ValueError(f"Parameter {name!r} must be at most {spec['max']}")
+    return value
+
+
+def validate(schema, overrides):
+    """Controlla le modifiche ai parametri
+
+    Returns:
+        dict con i soli parametri diversi dal default, con il tipo dello schema
+
+    Raises:
+        ValueError: Parametro sconosciuto, del tipo sbagliato o fuori intervallo
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError('Parameters must be a JSON object')
+    unknown = sorted(set(overrides) - set(schema))
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    validated = {name: _coerce(name, schema[name], value) for name, value in overrides.items()}
+    return {name: value for name, value in sorted(validated.items())
+            if value != schema[name]['default']}
+
+
+def resolve(schema, overrides=None):
+    """Parametri completi: default dello schema aggiornati dalle modifiche"""
+    params = {name: spec['default'] for name, spec in schema.items()}
+    params.update(overrides or {})
+    return params
@@ -0,0 +1,113 @@
+"""API per gli script di simulazione
+
+Gli script possono pubblicare, oltre a stdout e figure:
+
+- le soluzioni dense dei loro integratori, che il sito ricampiona su qualunque
+  finestra temporale senza rieseguire lo script;
+- gruppi di serie numeriche (uno per grafico), che il browser disegna da sé
+  dopo averle ricevute decimate al numero di punti visibili;
+- animazioni, renderizzate una sola volta in una sprite sheet che il browser
+  riproduce senza ricalcolare i fotogrammi.
+
+Tutte vengono salvate insieme al risultato della simulazione. Fuori da
+un'esecuzione gestita da ``simkit.executor`` (ad esempio in un notebook) le
+funzioni restituiscono comunque l'oggetto, senza salvarlo.
+
+Esempio::
+
+    sol = solve_ivp(..., dense_output=True)
+    publish_solution('state', sol, ['theta_d', 'omega_d'])
+    publish_series('forces', t_eval, {'F_N': F_N_sol}, title='Forza di contatto', ylabel='N')
+    publish_animation('mechanism', scene, fps=20)
+"""
+import contextlib
+import re
+
+from simkit.animation import Animation
+from simkit.dense import DenseSolution
+from simkit.series import SeriesSet
+
+# Tipi di oggetti pubblicabili, con il nome della chiave nel risultato
+ARTIFACT_KINDS = ('solutions', 'series', 'animations')
+
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Pubblicazioni dell'esecuzione in corso (None fuori da un'esecuzione)
+_artifacts = None
+_figures_enabled = True
+
+
+@contextlib.contextmanager
+def collect(figures=True):
+    """Raccoglie le pubblicazioni di uno script
+
+    Restituisce ``{tipo: {nome: npz in bytes}}`` per ciascuno di
+    ``ARTIFACT_KINDS``. Con ``figures=False`` le figure non verranno salvate
+    e lo script può evitare di costruirle (vedi ``figures_enabled``).
+    """
+    global _artifacts, _figures_enabled
+    previous = _artifacts, _figures_enabled
+    _artifacts = {kind: {} for kind in ARTIFACT_KINDS}
+    _figures_enabled = figures
+    try:
+        yield _artifacts
+    finally:
+        _artifacts, _figures_enabled = previous
+
+
+def figures_enabled():
+    """False se l'esecuzione richiede solo dati e le figure verranno scartate"""
+    return _figures_enabled
+
+
+def _publish(kind, name, artifact):
+    if not _NAME_PATTERN.match(name):
+        raise ValueError(f'Invalid {kind} name: {name!r}')
+    if _artifacts is not None:
+        _artifacts[kind][name] = artifact.to_bytes()
+    return artifact
+
+
+def publish_solution(name, sol, names=None):
+    """Pubblica la soluzione densa di ``solve_ivp`` con il nome ``name``
+
+    Args:
+        name: Identificativo (lettere, cifre, '_' e '-')
+        sol: Risultato di ``solve_ivp(..., dense_output=True)``
+        names: Nome di ciascuna variabile di stato
+
+    Returns:
+        DenseSolution
+    """
+    return _publish('solutions', name, DenseSolution.from_ode_solution(sol, names))
+
+
+def publish_series(name, t, series, title=None, ylabel=None, labels=None):
+    """Pubblica un gruppo di serie con asse temporale comune
+
+    Args:
+        name: Identificativo del gruppo (lettere, cifre, '_' e '-')
+        t: Istanti, crescenti
+        series: ``{nome: array}`` della stessa lunghezza di ``t``
+        title, ylabel: Titolo ed etichetta dell'asse y del grafico
+        labels: ``{nome: etichetta}`` per la legenda
+
+    Returns:
+        SeriesSet
+    """
+    return _publish('series', name, SeriesSet(t, series, title, ylabel, labels))
+
+
+def publish_animation(name, scene, fps=20, title=None):
+    """Renderizza una ``Scene`` in una sprite sheet e la pubblica
+
+    Args:
+        name: Identificativo (lettere, cifre, '_' e '-')
+        scene: ``simkit.animation.Scene`` con le posizioni di ogni fotogramma
+        fps: Fotogrammi al secondo della riproduzione
+        title: Titolo mostrato sopra l'animazione
+
+    Returns:
+        Animation
+    """
+    return _publish('animations', name, Animation.from_scene(scene, fps=fps, title=title))
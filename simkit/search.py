@@ -0,0 +1,296 @@
+"""Ricerca full-text sui file master di progetti e articoli
+
+L'indice invertito è un database SQLite su disco: per ogni termine le
+occorrenze nei documenti (``postings``), per ogni documento lunghezza, stamp
+del file master e testo per gli estratti. Un master viene reindicizzato solo
+se mtime o dimensione sono cambiati, e una ricerca legge solo le liste dei
+termini cercati, ordinando i documenti con BM25.
+
+La tokenizzazione riconosce:
+
+- numeri di brevetto in qualunque grafia (``US 6,758,109 B2``, ``US6758109B2``,
+  ``US6758109``), indicizzati come ``us6758109``, ``us6758109b2`` e ``6758109``;
+- simboli delle formule: ``$\\omega_d$``, ``ω_d`` e ``omega_d`` diventano tutti
+  ``omega_d`` (e anche ``omega``), ``$M_{b}$`` diventa ``m_b``;
+- accenti (``velocità`` e ``velocita`` coincidono).
+
+Un termine della query che termina con ``*`` cerca per prefisso.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+# Da incrementare quando cambia la tokenizzazione: l'indice viene ricostruito
+TOKENIZER_VERSION = 1
+
+# Parametri di BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Peso delle occorrenze nel nome del contenuto rispetto al testo
+NAME_WEIGHT = 3.0
+
+SNIPPET_CHARS = 200
+
+GREEK = {
+    'α': 'alpha', 'β': 'beta', 'γ': 'gamma', 'δ': 'delta', 'ε': 'epsilon', 'ζ': 'zeta',
+    'η': 'eta', 'θ': 'theta', 'ι': 'iota', 'κ': 'kappa', 'λ': 'lambda', 'μ': 'mu',
+    'ν': 'nu', 'ξ': 'xi', 'π': 'pi', 'ρ': 'rho', 'σ': 'sigma', 'ς': 'sigma', 'τ': 'tau',
+    'υ': 'upsilon', 'φ': 'phi', 'χ': 'chi', 'ψ': 'psi', 'ω': 'omega',
+}
+
+# Comandi LaTeX di sola impaginazione, da non indicizzare
+LATEX_LAYOUT = {
+    'frac', 'dfrac', 'left', 'right', 'cdot', 'times', 'quad', 'qquad', 'text', 'mathrm',
+    'mathbf', 'begin', 'end', 'big', 'bigg', 'rangle', 'langle',
+}
+
+STOPWORDS = {
+    'il', 'lo', 'la', 'le', 'gli', 'un', 'uno', 'una', 'di', 'da', 'in', 'con', 'su', 'per',
+    'tra', 'fra', 'del', 'dello', 'della', 'dei', 'degli', 'delle', 'dell', 'al', 'allo',
+    'alla', 'ai', 'agli', 'alle', 'all', 'dal', 'dalla', 'dai', 'dagli', 'dalle', 'nel',
+    'nello', 'nella', 'nei', 'negli', 'nelle', 'sul', 'sulla', 'sui', 'sugli', 'sulle',
+    'che', 'non', 'si', 'come', 'ed', 'ma', 'anche', 'sono', 'essere', 'questo', 'questa',
+    'the', 'of', 'and', 'to', 'in', 'is', 'for', 'on', 'with', 'by', 'as', 'an', 'at',
+    'from', 'or', 'be', 'are', 'this', 'that', 'it', 'its', 'has', 'have', 'where',
+}
+
+# Uffici brevettuali riconosciuti come prefisso dei numeri di brevetto
+PATENT_OFFICES = ('US', 'EP', 'WO', 'JP', 'CN', 'KR', 'DE', 'GB', 'FR', 'IT', 'ES', 'CA', 'AU', 'CH', 'RU', 'IN', 'BR')
+
+PATENT_PATTERN = re.compile(
+    r'(?<![A-Za-z0-9])(' + '|'.join(PATENT_OFFICES) + r') ?(\d{1,3}(?:[,.]\d{3})+|\d{5,})'
+    r'(?: ?([A-Z]\d?))?(?![A-Za-z0-9])', re.IGNORECASE)
+MATH_PATTERN = re.compile(r'\$\$(.+?)\$\$|\$(.+?)\$', re.DOTALL)
+LATEX_COMMAND = re.compile(r'\\([A-Za-z]+)')
+SUBSCRIPT_GROUP = re.compile(r'_\{([^{}]*)\}')
+WORD_PATTERN = re.compile(r'[a-z0-9]+(?:_[a-z0-9]+)*\*?')
+LINK_PATTERN = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+MARKUP_PATTERN = re.compile(r'[#*|`>_\-=]{2,}|[#*|`>]')
+
+
+def _fold(text):
+    """Minuscole, lettere greche per nome e accenti rimossi"""
+    text = ''.join(GREEK.get(ch, ch) for ch in text.lower())
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+
+
+def _latex(match):
+    command = match.group(1)
+    return ' ' if command in LATEX_LAYOUT else command
+
+
+def _words(text, math_mode, expand):
+    text = LATEX_COMMAND.sub(_latex, text)
+    text = SUBSCRIPT_GROUP.sub(r'_\1', text)
+    for word in WORD_PATTERN.findall(_fold(text)):
+        if not math_mode and (len(word) < 2 or word in STOPWORDS):
+            continue
+        yield word
+        if expand and '_' in word:
+            for part in word.split('_'):
+                if len(part) > 1 and part not in STOPWORDS:
+                    yield part
+
+
+def tokenize(text, expand=True):
+    """Termini di un testo markdown
+
+    Args:
+        text: Testo da tokenizzare
+        expand: Aggiunge anche le parti dei simboli composti (``omega_d`` ->
+            ``omega``); per le query si cerca solo il simbolo intero
+    """
+    tokens = []
+
+    def patent(match):
+        country, number, kind = match.group(1).lower(), re.sub(r'\D', '', match.group(2)), match.group(3)
+        tokens.extend([country + number, number])
+        if kind:
+            tokens.append(country + number + kind.lower())
+        return ' '
+
+    text = PATENT_PATTERN.sub(patent, text)
+    position = 0
+    for match in MATH_PATTERN.finditer(text):
+        tokens.extend(_words(text[position:match.start()], False, expand))
+        tokens.extend(_words(match.group(1) or match.group(2), True, expand))
+        position = match.end()
+    tokens.extend(_words(text[position:], False, expand))
+    return tokens
+
+
+def _plain_lines(markdown_text):
+    """Righe di testo senza marcatori markdown, per gli estratti"""
+    lines = []
+    for line in markdown_text.splitlines():
+        line = ' '.join(MARKUP_PATTERN.sub(' ', LINK_PATTERN.sub(r'\1', line)).split())
+        if line:
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def _snippet(text, lines):
+    """Riga in cui compare per la prima volta il maggior numero di termini cercati"""
+    rows = text.split('\n')
+    line = max(set(lines), key=lambda n: (lines.count(n), -n)) if lines else 0
+    best = rows[line] if line < len(rows) else rows[0]
+    return best if len(best) <= SNIPPET_CHARS else best[:SNIPPET_CHARS - 1].rstrip() + '…'
+
+
+class SearchIndex:
+    """Indice invertito incrementale dei contenuti
+
+    Args:
+        path: File del database SQLite
+        refresh_interval: Secondi minimi tra due controlli dei file master
+    """
+
+    def __init__(self, path, refresh_interval=2.0):
+        self.path = Path(path)
+        self.refresh_interval = refresh_interval
+        self._synced = None
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != TOKENIZER_VERSION:
+            with self._db:
+                self._db.execute('DROP TABLE IF EXISTS postings')
+                self._db.execute('DROP TABLE IF EXISTS documents')
+                self._db.execute(f'PRAGMA user_version={TOKENIZER_VERSION}')
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                'doc INTEGER PRIMARY KEY, type TEXT NOT NULL, content_id TEXT NOT NULL, name TEXT NOT NULL, '
+                'mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, length REAL NOT NULL, text TEXT NOT NULL, '
+                'UNIQUE (type, content_id))')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS postings ('
+                'term TEXT NOT NULL, doc INTEGER NOT NULL, tf REAL NOT NULL, line INTEGER NOT NULL, '
+                'PRIMARY KEY (term, doc)) WITHOUT ROWID')
+            self._db.execute('CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)')
+
+    def _index(self, entry, stamp, doc):
+        text = entry.master_path.read_text(encoding='utf-8')
+        counts = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term in tokenize(entry.name):
+            counts[term] = counts.get(term, 0) + NAME_WEIGHT
+        length = sum(counts.values())
+        # Prima riga del testo in cui compare ogni termine, per gli estratti
+        plain = _plain_lines(text)
+        first_line = {}
+        for number, line in enumerate(plain.split('\n')):
+            for term in tokenize(line):
+                first_line.setdefault(term, number)
+        row = (entry.type, entry.id, entry.name, stamp[0], stamp[1], length, plain)
+        if doc is None:
+            doc = self._db.execute(
+                'INSERT INTO documents (type, content_id, name, mtime_ns, size, length, text) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', row).lastrowid
+        else:
+            self._db.execute(
+                'UPDATE documents SET type = ?, content_id = ?, name = ?, mtime_ns = ?, size = ?, length = ?, text = ? '
+                'WHERE doc = ?', row + (doc,))
+            self._db.execute('DELETE FROM postings WHERE doc = ?', (doc,))
+        self._db.executemany('INSERT INTO postings (term, doc, tf, line) VALUES (?, ?, ?, ?)',
+                             [(term, doc, tf, first_line.get(term, 0)) for term, tf in counts.items()])
+
+    def sync(self, entries, force=False):
+        """Allinea l'indice ai contenuti (voci di ``ContentIndex``)
+
+        Reindicizza solo i master nuovi o cambiati e rimuove quelli spariti.
+
+        Returns:
+            Numero di documenti reindicizzati o rimossi
+        """
+        now = time.monotonic()
+        if not force and self._synced is not None and now - self._synced < self.refresh_interval:
+            return 0
+        changed = 0
+        with self._lock, self._db:
+            stored = {(row[1], row[2]): (row[0], (row[3], row[4])) for row in self._db.execute(
+                'SELECT doc, type, content_id, mtime_ns, size FROM documents')}
+            seen = set()
+            for entry in entries:
+                if entry.master_path is None:
+                    continue
+                try:
+                    stat = os.stat(entry.master_path)
+                except OSError:
+                    continue
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                key = (entry.type, entry.id)
+                seen.add(key)
+                doc, stored_stamp = stored.get(key, (None, None))
+                if stored_stamp != stamp:
+                    self._index(entry, stamp, doc)
+                    changed += 1
+            for key in stored.keys() - seen:
+                doc = stored[key][0]
+                self._db.execute('DELETE FROM postings WHERE doc = ?', (doc,))
+                self._db.execute('DELETE FROM documents WHERE doc = ?', (doc,))
+                changed += 1
+            self._synced = now
+        return changed
+
+    def _postings(self, term):
+        if term.endswith('*'):
+            prefix = term[:-1]
+            return self._db.execute(
+                'SELECT p.term, p.doc, p.tf, p.line, d.length FROM postings p JOIN documents d USING (doc) '
+                'WHERE p.term >= ? AND p.term < ?', (prefix, prefix + '\uffff')).fetchall()
+        return self._db.execute(
+            'SELECT p.term, p.doc, p.tf, p.line, d.length FROM postings p JOIN documents d USING (doc) '
+            'WHERE p.term = ?', (term,)).fetchall()
+
+    def search(self, query, limit=10, content_type=None):
+        """Documenti ordinati per rilevanza BM25
+
+        Returns:
+            Lista di dict con ``type``, ``id``, ``name``, ``score`` e ``snippet``
+        """
+        terms = list(dict.fromkeys(term for term in tokenize(query, expand=False) if term != '*'))
+        if not terms:
+            return []
+        with self._lock:
+            count, total = self._db.execute('SELECT COUNT(*), SUM(length) FROM documents').fetchone()
+            if not count:
+                return []
+            average = total / count
+            scores, lines = {}, {}
+            for term in terms:
+                # Con il prefisso ogni termine espanso ha la sua frequenza di documento
+                by_term = {}
+                for matched, doc, tf, line, length in self._postings(term):
+                    by_term.setdefault(matched, []).append((doc, tf, line, length))
+                for rows in by_term.values():
+                    idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                    for doc, tf, line, length in rows:
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+                        scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                        lines.setdefault(doc, []).append(line)
+            if not scores:
+                return []
+            placeholders = ','.join('?' * len(scores))
+            documents = {row[0]: row[1:] for row in self._db.execute(
+                f'SELECT doc, type, content_id, name FROM documents WHERE doc IN ({placeholders})', list(scores))}
+            ranked = [doc for doc in sorted(scores, key=scores.get, reverse=True)
+                      if not content_type or documents[doc][0] == content_type][:limit]
+            texts = dict(self._db.execute(
+                f"SELECT doc, text FROM documents WHERE doc IN ({','.join('?' * len(ranked))})", ranked))
+        return [{'type': documents[doc][0], 'id': documents[doc][1], 'name': documents[doc][2],
+                 'score': round(scores[doc], 4), 'snippet': _snippet(texts[doc], lines[doc])}
+                for doc in ranked]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
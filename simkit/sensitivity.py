@@ -0,0 +1,53 @@
+"""Equazioni di sensitività in avanti per problemi ai valori iniziali
+
+Accanto allo stato ``y`` si integra la matrice ``S = dy/dp`` rispetto a un
+vettore di parametri ``p``:
+
+    dS/dt = J_y(t, y) · S + J_p(t, y)
+
+così una sola integrazione fornisce la traiettoria e la sua derivata rispetto
+a tutti i parametri, da cui si ottengono i gradienti delle metriche.
+"""
+import numpy as np
+from scipy.integrate import solve_ivp
+
+
+def solve_forward_sensitivity(fun, jac, jac_p, t_span, y0, t_eval=None, s0=None, **solver_kwargs):
+    """Integra stato e sensitività insieme
+
+    Args:
+        fun: Sistema ``fun(t, y)``
+        jac: Jacobiana rispetto allo stato ``jac(t, y)``, shape (n, n)
+        jac_p: Jacobiana rispetto ai parametri ``jac_p(t, y)``, shape (n, m)
+        t_span, t_eval: Come in ``solve_ivp``
+        y0: Stato iniziale, shape (n,)
+        s0: Sensitività iniziale dy0/dp (default: zero)
+
+    Returns:
+        (t, y, S, sol) con ``y`` di shape (n, n_points) e ``S`` di shape
+        (n, m, n_points)
+    """
+    y0 = np.asarray(y0, dtype=float)
+    n = y0.size
+    m = np.shape(jac_p(t_span[0], y0))[1]
+    s0 = np.zeros((n, m)) if s0 is None else np.asarray(s0, dtype=float)
+
+    def rhs(t, z):
+        y = z[:n]
+        S = z[n:].reshape(n, m)
+        dS = np.asarray(jac(t, y)) @ S + np.asarray(jac_p(t, y))
+        return np.concatenate([np.asarray(fun(t, y), dtype=float), dS.ravel()])
+
+    sol = solve_ivp(rhs, t_span, np.concatenate([y0, s0.ravel()]), t_eval=t_eval, **solver_kwargs)
+    if not sol.success:
+        raise RuntimeError(sol.message)
+    return sol.t, sol.y[:n], sol.y[n:].reshape(n, m, -1), sol
+
+
+def complex_step(fn, h=1e-30):
+    """Derivata direzionale esatta di una funzione analitica con il passo complesso
+
+    ``fn(h)`` deve valutare la funzione nel punto perturbato di ``1j*h`` lungo
+    la direzione desiderata; restituisce la parte immaginaria divisa per ``h``.
+    """
+    return np.imag(fn(1j * h)) / h
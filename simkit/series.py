@@ -0,0 +1,155 @@
+"""Serie numeriche delle simulazioni per i grafici lato client
+
+Uno script pubblica gruppi di serie con un asse temporale comune (un gruppo
+per grafico). Le serie sono salvate a piena risoluzione e, a ogni richiesta,
+ritagliate sulla finestra visibile e decimate al numero di punti richiesto:
+
+- LTTB (Largest-Triangle-Three-Buckets) conserva la forma della curva con un
+  punto per intervallo;
+- min-max conserva minimo e massimo di ogni intervallo, quindi anche i picchi
+  isolati (utile per forze di contatto e accelerazioni).
+
+Il formato binario inviato al browser è: lunghezza dell'intestazione (uint32
+little-endian), intestazione JSON in UTF-8 completata con spazi a un multiplo
+di 4 byte, quindi per ogni serie i valori x e y come float32 little-endian.
+"""
+import io
+import json
+import struct
+
+import numpy as np
+
+DECIMATION_METHODS = ('lttb', 'minmax')
+
+# Numero massimo di punti per serie in una risposta
+MAX_POINTS = 20000
+
+
+def lttb(x, y, n_out):
+    """Indici dei punti scelti da Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        # Nessun intervallo interno: restano gli estremi
+        return np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        # Vertice fisso: media dell'intervallo successivo
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(x, y, n_out):
+    """Indici di minimo e massimo di ciascuno degli ``n_out // 2`` intervalli"""
+    n = len(x)
+    buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    valid = ~np.all(np.isnan(rows), axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    rows = rows[valid]
+    lo = offsets + np.nanargmin(rows, axis=1)
+    hi = offsets + np.nanargmax(rows, axis=1)
+    return np.unique(np.concatenate([[0, n - 1], lo, hi]))
+
+
+def decimate(x, y, n_out, method='lttb'):
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method: {method!r}")
+    indices = (lttb if method == 'lttb' else minmax)(x, y, n_out)
+    return x[indices], y[indices]
+
+
+class SeriesSet:
+    """Gruppo di serie con asse temporale comune
+
+    Args:
+        t: Istanti, crescenti
+        series: ``{nome: array}`` della stessa lunghezza di ``t``
+        title: Titolo del grafico
+        ylabel: Etichetta dell'asse y
+        labels: ``{nome: etichetta}`` per la legenda
+    """
+
+    def __init__(self, t, series, title=None, ylabel=None, labels=None):
+        self.t = np.asarray(t, dtype=float)
+        self.series = {name: np.asarray(values, dtype=float) for name, values in series.items()}
+        for name, values in self.series.items():
+            if values.shape != self.t.shape:
+                raise ValueError(f"Series {name!r} does not match the length of t")
+        self.title = title
+        self.ylabel = ylabel
+        self.labels = dict(labels or {})
+
+    @property
+    def t_min(self):
+        return float(self.t[0])
+
+    @property
+    def t_max(self):
+        return float(self.t[-1])
+
+    def meta(self):
+        return {'title': self.title, 'ylabel': self.ylabel, 'labels': self.labels,
+                'order': list(self.series)}
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, t=self.t, meta=np.array(json.dumps(self.meta())),
+                 **{f'series_{name}': values for name, values in self.series.items()})
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, source):
+        with np.load(source, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            series = {name: data[f'series_{name}'] for name in meta['order']}
+            return cls(data['t'], series, meta['title'], meta['ylabel'], meta['labels'])
+
+    def window(self, start=None, stop=None, points=1000, method='lttb'):
+        """Serie decimate sulla finestra [start, stop]
+
+        Returns:
+            lista di ``(nome, x, y)``
+        """
+        if not 2 <= points <= MAX_POINTS:
+            raise ValueError(f'The number of points must be between 2 and {MAX_POINTS}')
+        start = self.t_min if start is None else start
+        stop = self.t_max if stop is None else stop
+        if not start < stop:
+            raise ValueError('start must be lower than stop')
+        # Un punto oltre ciascun bordo, così la curva attraversa tutta la finestra
+        first = max(np.searchsorted(self.t, start, side='left') - 1, 0)
+        last = min(np.searchsorted(self.t, stop, side='right') + 1, len(self.t))
+        t = self.t[first:last]
+        return [(name, *decimate(t, values[first:last], points, method))
+                for name, values in self.series.items()]
+
+    def frame(self, start=None, stop=None, points=1000, method='lttb'):
+        """Serializza la finestra decimata nel formato binario per il browser"""
+        selected = self.window(start, stop, points, method)
+        header = dict(self.meta(), t_min=self.t_min, t_max=self.t_max, method=method,
+                      series=[{'name': name, 'label': self.labels.get(name, name), 'length': len(x)}
+                              for name, x, _ in selected])
+        encoded = json.dumps(header).encode('utf-8')
+        encoded += b' ' * (-len(encoded) % 4)
+        parts = [struct.pack('<I', len(encoded)), encoded]
+        for _, x, y in selected:
+            parts.append(x.astype('<f4').tobytes())
+            parts.append(y.astype('<f4').tobytes())
+        return b''.join(parts)
@@ -0,0 +1,126 @@
+"""Orbite periodiche con il metodo di shooting sulla mappa di Poincaré
+
+Per sistemi con una coordinata di fase (un angolo che avanza nel tempo, come
+la rotazione del tamburo) e forzanti periodiche in quella fase, il regime
+periodico è il punto fisso della mappa di Poincaré "fase + periodo": si
+integra finché la fase avanza di ``period`` e si confronta lo stato d'arrivo
+con quello di partenza. Il punto fisso si trova con il metodo di Newton; la
+derivata della mappa viene dalle equazioni variazionali se è disponibile la
+Jacobiana del sistema, altrimenti da differenze finite.
+"""
+import numpy as np
+from scipy.integrate import solve_ivp
+
+
+class PeriodicOrbit:
+    """Orbita periodica trovata da ``periodic_orbit``
+
+    Attributes:
+        y0: Stato iniziale sull'orbita (sezione alla fase iniziale)
+        period: Durata di un periodo [s]
+        converged: True se il residuo è sotto la tolleranza
+        iterations: Iterazioni di Newton eseguite
+        residual: Norma del residuo finale della mappa
+    """
+
+    def __init__(self, y0, period, sol, n_state, converged, iterations, residual):
+        self.y0 = y0
+        self.period = period
+        self.converged = converged
+        self.iterations = iterations
+        self.residual = residual
+        self._sol = sol
+        self._n_state = n_state
+
+    def __call__(self, t):
+        """Stato sull'orbita agli istanti ``t`` in [0, period] (uscita densa)"""
+        return self._sol(t)[:self._n_state]
+
+
+def _as_array(fun):
+    return lambda t, y, *args: np.asarray(fun(t, y, *args), dtype=float)
+
+
+def poincare_map(fun, y0, phase_index, period, jac=None, args=(), t_max=1e3, **solver_kwargs):
+    """Integra finché la fase è avanzata di ``period``
+
+    Returns:
+        (y_T, T, M, sol): stato d'arrivo, tempo impiegato, derivata della mappa
+        (None senza ``jac``) e soluzione densa
+    """
+    fun = _as_array(fun)
+    y0 = np.asarray(y0, dtype=float)
+    n = y0.size
+    target = y0[phase_index] + period
+
+    def crossing(t, y, *args):
+        return y[phase_index] - target
+    crossing.terminal = True
+    crossing.direction = 1
+
+    if jac is None:
+        rhs, z0 = fun, y0
+    else:
+        # Stato aumentato con la matrice di sensitività Φ = dy/dy0
+        def rhs(t, z, *args):
+            y, phi = z[:n], z[n:].reshape(n, n)
+            return np.concatenate([fun(t, y, *args), (np.asarray(jac(t, y, *args)) @ phi).ravel()])
+        z0 = np.concatenate([y0, np.eye(n).ravel()])
+
+    sol = solve_ivp(rhs, (0, t_max), z0, events=crossing, dense_output=True,
+                    args=args, **solver_kwargs)
+    if sol.status != 1:
+        raise RuntimeError('Phase did not advance by one period within t_max')
+
+    T = sol.t_events[0][0]
+    z_T = sol.y_events[0][0]
+    y_T = z_T[:n]
+    M = None
+    if jac is not None:
+        # Correzione per il tempo di arrivo variabile sulla sezione
+        phi = z_T[n:].reshape(n, n)
+        f_T = fun(T, y_T, *args)
+        M = phi - np.outer(f_T, phi[phase_index]) / f_T[phase_index]
+    return y_T, T, M, sol.sol
+
+
+def periodic_orbit(fun, y0, phase_index, period, jac=None, args=(), tol=1e-10,
+                   max_iter=30, t_max=1e3, rtol=1e-10, atol=1e-12, method='RK45'):
+    """Cerca l'orbita periodica con shooting e Newton
+
+    Args:
+        fun: Sistema ``fun(t, y, *args)`` come per ``solve_ivp``
+        y0: Stima iniziale; la componente di fase resta fissa
+        phase_index: Indice della coordinata di fase in ``y``
+        period: Avanzamento di fase che definisce un periodo
+        jac: Jacobiana ``jac(t, y, *args)`` opzionale (equazioni variazionali)
+        tol: Tolleranza relativa sul residuo ``P(y0) - y0``
+
+    Returns:
+        PeriodicOrbit
+    """
+    x = np.asarray(y0, dtype=float).copy()
+    n = x.size
+    free = np.array([i for i in range(n) if i != phase_index])
+    solver_kwargs = {'rtol': rtol, 'atol': atol, 'method': method, 't_max': t_max}
+
+    residual = np.inf
+    for iteration in range(1, max_iter + 1):
+        y_T, T, M, sol = poincare_map(fun, x, phase_index, period, jac, args, **solver_kwargs)
+        G = (y_T - x)[free]
+        residual = np.linalg.norm(G)
+        if residual <= tol * (1 + np.linalg.norm(x[free])):
+            return PeriodicOrbit(x, T, sol, n, True, iteration, residual)
+
+        if M is None:
+            M = np.zeros((n, n))
+            for j in free:
+                step = 1e-7 * (1 + abs(x[j]))
+                dx = np.zeros(n)
+                dx[j] = step
+                M[:, j] = (poincare_map(fun, x + dx, phase_index, period, None, args,
+                                        **solver_kwargs)[0] - y_T) / step
+        A = M[np.ix_(free, free)] - np.eye(free.size)
+        x[free] -= np.linalg.solve(A, G)
+
+    return PeriodicOrbit(x, T, sol, n, False, max_iter, residual)
@@ -0,0 +1,119 @@
+"""Post-elaborazione a blocchi di soluzioni con molti campioni
+
+Invece di materializzare tutte le serie derivate sull'intera griglia
+temporale, la soluzione viene valutata a blocchi di dimensione fissa (dalla
+sua uscita densa): per ogni blocco si calcolano le grandezze derivate, si
+aggiornano le riduzioni (min, max, media, anche su sottoinsiemi come il
+regime o il transitorio) e, se richiesto, si scrivono le serie complete su
+file .npy mappati in memoria. Il picco di memoria dipende dalla dimensione
+del blocco, non dal numero di campioni.
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+class RunningStats:
+    """Minimo, massimo e media aggiornati incrementalmente"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.total += float(np.sum(values))
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def to_dict(self):
+        return {'count': self.count, 'min': self.min, 'max': self.max, 'mean': self.mean}
+
+
+def iter_chunks(sol, t_eval, chunk_size=65536):
+    """Valuta una soluzione densa su ``t_eval`` un blocco alla volta
+
+    Args:
+        sol: Interpolante con firma ``sol(t) -> (n_state, len(t))``, ad
+            esempio ``solve_ivp(..., dense_output=True).sol``
+        t_eval: Istanti richiesti (anche un ``np.memmap``)
+
+    Yields:
+        (start, t, y) per ogni blocco
+    """
+    for start in range(0, len(t_eval), chunk_size):
+        t = np.asarray(t_eval[start:start + chunk_size])
+        yield start, t, sol(t)
+
+
+def linspace_chunks(start, stop, num, chunk_size=65536):
+    """Come ``np.linspace`` ma generata a blocchi, senza allocare la griglia"""
+    step = (stop - start) / (num - 1) if num > 1 else 0.0
+    for first in range(0, num, chunk_size):
+        index = np.arange(first, min(first + chunk_size, num))
+        t = start + index * step
+        if index[-1] == num - 1:
+            t[-1] = stop
+        yield first, t
+
+
+class StreamingPipeline:
+    """Riduzioni e salvataggio delle serie derivate, blocco per blocco
+
+    Args:
+        derive: ``derive(t, y) -> {nome: array}`` con le serie di un blocco
+        masks: ``{nome: fn(t) -> array booleano}`` per le statistiche su
+            sottoinsiemi (le statistiche su tutti i campioni sono sotto 'all')
+        spill: Nomi delle serie da scrivere integralmente su disco
+        spill_dir: Cartella dei file .npy (obbligatoria con ``spill``)
+        n_total: Numero complessivo di campioni (obbligatorio con ``spill``)
+    """
+
+    def __init__(self, derive, masks=None, spill=(), spill_dir=None, n_total=None):
+        self.derive = derive
+        self.masks = dict(masks or {})
+        self.stats = {}
+        self.spilled = {}
+        if spill:
+            if spill_dir is None or n_total is None:
+                raise ValueError('spill requires spill_dir and n_total')
+            spill_dir = Path(spill_dir)
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            for name in spill:
+                self.spilled[name] = np.lib.format.open_memmap(
+                    spill_dir / f'{name}.npy', mode='w+', dtype=np.float64, shape=(n_total,))
+
+    def consume(self, start, t, y):
+        series = self.derive(t, y)
+        selections = {'all': None}
+        selections.update({name: mask(t) for name, mask in self.masks.items()})
+        for name, values in series.items():
+            values = np.broadcast_to(values, t.shape)
+            stats = self.stats.setdefault(name, {key: RunningStats() for key in selections})
+            for key, selection in selections.items():
+                stats[key].update(values if selection is None else values[selection])
+            if name in self.spilled:
+                self.spilled[name][start:start + t.size] = values
+
+    def run(self, chunks):
+        """Consuma un iteratore di blocchi ``(start, t, y)`` e restituisce le statistiche"""
+        for start, t, y in chunks:
+            self.consume(start, t, y)
+        for array in self.spilled.values():
+            array.flush()
+        return self.results()
+
+    def results(self):
+        return {name: {key: stats.to_dict() for key, stats in by_mask.items()}
+                for name, by_mask in self.stats.items()}
+
+    def spill_paths(self):
+        return {name: Path(array.filename) for name, array in self.spilled.items()}
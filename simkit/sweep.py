@@ -0,0 +1,180 @@
+"""Sweep multidimensionali dei parametri su un pool di processi
+
+Un *design* è un dizionario ``{nome_parametro: array}`` con una riga per
+progetto da valutare: griglia fattoriale completa, Latin hypercube o sequenza
+di Sobol su un qualunque sottoinsieme dei parametri. Le righe vengono divise
+in blocchi e ogni blocco è valutato in un worker da una funzione vettoriale
+``evaluate(params)`` (ad esempio un'integrazione con ``solve_ivp_batch``) che
+restituisce metriche ridotte, una per riga. I risultati confluiscono in una
+tabella colonnare man mano che i blocchi terminano.
+
+Esempio::
+
+    design = latin_hypercube({'e': (0.01, 0.05), 'mu': (0.05, 0.2)}, 2000)
+    table = run_sweep(model.sweep_metrics, design, model.PARAMS)
+    table.save_npz('sweep.npz')
+"""
+import csv
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+def design_size(design):
+    sizes = {len(values) for values in design.values()}
+    if len(sizes) != 1:
+        raise ValueError('All design columns must have the same length')
+    return sizes.pop()
+
+
+def full_factorial(levels):
+    """Griglia fattoriale completa
+
+    Args:
+        levels: ``{nome: valori}`` con i livelli di ciascun parametro
+    """
+    names = list(levels)
+    grid = np.array(list(itertools.product(*(np.asarray(levels[name], dtype=float)
+                                            for name in names))))
+    return {name: grid[:, i] for i, name in enumerate(names)}
+
+
+def _scaled_design(sampler, bounds, n):
+    from scipy.stats import qmc
+
+    names = list(bounds)
+    lower = [bounds[name][0] for name in names]
+    upper = [bounds[name][1] for name in names]
+    sample = qmc.scale(sampler.random(n), lower, upper)
+    return {name: sample[:, i] for i, name in enumerate(names)}
+
+
+def latin_hypercube(bounds, n, seed=None):
+    """Latin hypercube di ``n`` punti
+
+    Args:
+        bounds: ``{nome: (minimo, massimo)}``
+        n: Numero di progetti
+        seed: Seme del generatore casuale
+    """
+    from scipy.stats import qmc
+    return _scaled_design(qmc.LatinHypercube(d=len(bounds), seed=seed), bounds, n)
+
+
+def sobol(bounds, n, seed=None):
+    """Sequenza di Sobol scramblata di ``n`` punti (meglio se potenza di 2)"""
+    from scipy.stats import qmc
+    return _scaled_design(qmc.Sobol(d=len(bounds), scramble=True, seed=seed), bounds, n)
+
+
+class SweepTable:
+    """Tabella colonnare dei risultati, riempita per blocchi
+
+    Le colonne del design sono note dall'inizio; quelle delle metriche vengono
+    create al primo blocco ricevuto. Le righe non ancora calcolate valgono NaN.
+    """
+
+    def __init__(self, design):
+        self.size = design_size(design)
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in design.items()}
+        self.design_columns = list(design)
+        self.metric_columns = []
+        self.completed = 0
+
+    def fill(self, start, stop, metrics):
+        for name, values in metrics.items():
+            if name not in self.columns:
+                self.columns[name] = np.full(self.size, np.nan)
+                self.metric_columns.append(name)
+            self.columns[name][start:stop] = values
+        self.completed += stop - start
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def save_npz(self, path):
+        np.savez_compressed(path, **self.columns)
+
+    def save_csv(self, path):
+        names = self.design_columns + self.metric_columns
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(self.columns[name] for name in names)))
+
+
+def _evaluate_chunk(evaluate, base_params, columns):
+    params = dict(base_params)
+    params.update(columns)
+    return {name: np.asarray(values, dtype=float) for name, values in evaluate(params).items()}
+
+
+def _default_executor(max_workers):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+def iter_sweep(evaluate, design, base_params, chunk_size=256, executor=None, max_workers=None):
+    """Valuta il design a blocchi e restituisce i risultati appena disponibili
+
+    Args:
+        evaluate: Funzione importabile ``evaluate(params) -> {metrica: array}``
+            dove i parametri del design sono array della lunghezza del blocco
+        design: ``{nome: array}`` con i valori da provare
+        base_params: Parametri nominali per tutto ciò che non è nel design
+        chunk_size: Progetti per blocco (cioè per chiamata di ``evaluate``)
+        executor: ``concurrent.futures.Executor`` esistente; se assente viene
+            creato un pool di processi (con ``max_workers=1`` si resta nel
+            processo corrente)
+
+    Yields:
+        (start, stop, metriche) per ogni blocco completato, in ordine di arrivo
+    """
+    n = design_size(design)
+    chunks = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    columns = {name: np.asarray(values, dtype=float) for name, values in design.items()}
+
+    if executor is None and max_workers == 1:
+        for start, stop in chunks:
+            chunk = {name: values[start:stop] for name, values in columns.items()}
+            yield start, stop, _evaluate_chunk(evaluate, base_params, chunk)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = _default_executor(max_workers or os.cpu_count())
+    try:
+        futures = {
+            executor.submit(_evaluate_chunk, evaluate, base_params,
+                            {name: values[start:stop] for name, values in columns.items()}): (start, stop)
+            for start, stop in chunks
+        }
+        for future in as_completed(futures):
+            start, stop = futures[future]
+            yield start, stop, future.result()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def run_sweep(evaluate, design, base_params, chunk_size=256, executor=None,
+              max_workers=None, callback=None):
+    """Esegue lo sweep completo e restituisce la ``SweepTable``
+
+    ``callback(table, start, stop)`` viene chiamata dopo ogni blocco, ad
+    esempio per salvare risultati parziali o mostrare l'avanzamento.
+    """
+    table = SweepTable(design)
+    for start, stop, metrics in iter_sweep(evaluate, design, base_params, chunk_size,
+                                           executor, max_workers):
+        table.fill(start, stop, metrics)
+        if callback is not None:
+            callback(table, start, stop)
+    return table
@@ -39,7 +39,16 @@ document.addEventListener('DOMContentLoaded', function() {
 class SimulationManager {
     constructor(containerId) {
         this.container = document.getElementById(containerId);
+        this.solutionUrl = this.container ? this.container.dataset.solutionUrl : null;
+        this.seriesUrl = this.container ? this.container.dataset.seriesUrl : null;
+        this.animationUrl = this.container ? this.container.dataset.animationUrl : null;
+        this.parametersUrl = this.container ? this.container.dataset.parametersUrl : null;
+        this.schema = null;
+        this.runParams = {};
+        this.mode = 'figures';
+        this.resultUrl = null;
         this.isRunning = false;
+        this.eventSource = null;
     }
     
     showLoading() {
@@ -54,30 +63,74 @@ class SimulationManager {
         }
     }
     
-    showResults(data) {
+    hideLoading() {
         if (this.container) {
             const loadingDiv = this.container.querySelector('#simulationLoading');
+            if (loadingDiv) loadingDiv.classList.add('d-none');
+        }
+    }
+    
+    clearResults() {
+        if (this.container) {
             const resultsDiv = this.container.querySelector('#simulationResults');
             const outputPre = this.container.querySelector('#simulationOutput');
             const plotsDiv = this.container.querySelector('#simulationPlots');
+            const chartsDiv = this.container.querySelector('#simulationCharts');
+            const animationsDiv = this.container.querySelector('#simulationAnimations');
             
-            if (loadingDiv) loadingDiv.classList.add('d-none');
+            if (outputPre) outputPre.textContent = '';
+            if (plotsDiv) plotsDiv.innerHTML = '';
+            if (chartsDiv) chartsDiv.innerHTML = '';
+            if (animationsDiv) animationsDiv.innerHTML = '';
             if (resultsDiv) resultsDiv.classList.remove('d-none');
+        }
+    }
+    
+    appendOutput(line) {
+        const outputPre = this.container && this.container.querySelector('#simulationOutput');
+        if (outputPre) {
+            outputPre.textContent += line + '\n';
+        }
+    }
+    
+    // plot maps each available format (svg, webp, png) to the URL of the stored figure
+    appendPlot(plot) {
+        const plotsDiv = this.container && this.container.querySelector('#simulationPlots');
+        if (plotsDiv) {
+            const img = document.createElement('img');
+            img.src = plot.svg || plot.png || plot.webp;
+            img.className = 'simulation-plots img-fluid mb-3 border rounded';
+            img.alt = `Simulation Plot ${plotsDiv.children.length + 1}`;
+            img.loading = 'lazy';
+            img.decoding = 'async';
+            
+            if (plot.webp && plot.png && !plot.svg) {
+                // Browsers that support WebP take the smaller file, the others fall back to PNG
+                const picture = document.createElement('picture');
+                const source = document.createElement('source');
+                source.type = 'image/webp';
+                source.srcset = plot.webp;
+                picture.appendChild(source);
+                picture.appendChild(img);
+                plotsDiv.appendChild(picture);
+            } else {
+                plotsDiv.appendChild(img);
+            }
+        }
+    }
+    
+    showResults(data) {
+        if (this.container) {
+            this.hideLoading();
+            this.clearResults();
             
+            const outputPre = this.container.querySelector('#simulationOutput');
             if (outputPre && data.output) {
                 outputPre.textContent = data.output;
             }
             
-            if (plotsDiv && data.plots) {
-                plotsDiv.innerHTML = '';
-                data.plots.forEach((plotData, index) => {
-                    const img = document.createElement('img');
-                    img.src = 'data:image/png;base64,' + plotData;
-                    img.className = 'simulation-plots img-fluid mb-3';
-                    img.alt = `Simulation Plot ${index + 1}`;
-                    img.loading = 'lazy';
-                    plotsDiv.appendChild(img);
-                });
+            if (data.plots) {
+                data.plots.forEach(plot => this.appendPlot(plot));
             }
         }
     }
@@ -94,6 +147,447 @@ class SimulationManager {
             }
         }
     }
+    
+    finish() {
+        this.isRunning = false;
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        this.setButtonsDisabled(false);
+    }
+    
+    setButtonsDisabled(disabled) {
+        ['#runSimulationBtn', '#runDataBtn'].forEach(selector => {
+            const button = this.container && this.container.querySelector(selector);
+            if (button) button.disabled = disabled;
+        });
+    }
+    
+    // Submits a background job and follows its progress over Server-Sent Events.
+    // In 'data' mode figures are not rendered: the published series are plotted client-side.
+    run(submitUrl, mode = 'figures') {
+        if (this.isRunning) return;
+        this.isRunning = true;
+        this.mode = mode;
+        this.showLoading();
+        this.setButtonsDisabled(true);
+        
+        const url = mode === 'data' ? submitUrl + '?mode=data' : submitUrl;
+        this.runParams = this.currentParams();
+        fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(Object.keys(this.runParams).length ? {params: this.runParams} : {})
+        })
+        .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+        .then(({ok, data}) => {
+            if (!ok) {
+                const retry = data.retry_after ? ` Retry in ${data.retry_after} s.` : '';
+                throw new Error((data.error || 'Simulation failed.') + retry);
+            }
+            this.resultUrl = data.result_url;
+            this.follow(data.events_url);
+        })
+        .catch(error => {
+            this.finish();
+            this.showError('Error running simulation: ' + error.message);
+        });
+    }
+    
+    // Builds the parameter form of a parameterized simulation from its schema
+    loadParameters() {
+        const form = this.container && this.container.querySelector('#simulationParameters');
+        if (!form || !this.parametersUrl) return;
+        fetch(this.parametersUrl)
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data) return;  // The simulation does not accept parameters
+                this.schema = data.parameters;
+                Object.entries(this.schema).forEach(([name, spec]) => {
+                    const column = document.createElement('div');
+                    column.className = 'col-sm-6 col-lg-4';
+                    const label = document.createElement('label');
+                    label.className = 'form-label small';
+                    label.htmlFor = 'param-' + name;
+                    label.textContent = (spec.label || name) + (spec.unit ? ` [${spec.unit}]` : '');
+                    let input;
+                    if (spec.choices) {
+                        input = document.createElement('select');
+                        input.className = 'form-select form-select-sm';
+                        spec.choices.forEach(choice => input.add(new Option(choice, choice)));
+                        input.value = spec.default;
+                    } else if (typeof spec.default === 'boolean') {
+                        input = document.createElement('input');
+                        input.type = 'checkbox';
+                        input.className = 'form-check-input d-block';
+                        input.checked = spec.default;
+                    } else {
+                        input = document.createElement('input');
+                        input.type = 'number';
+                        input.className = 'form-control form-control-sm';
+                        input.step = Number.isInteger(spec.default) ? '1' : 'any';
+                        if (spec.min !== undefined) input.min = spec.min;
+                        if (spec.max !== undefined) input.max = spec.max;
+                        input.value = spec.default;
+                    }
+                    input.id = 'param-' + name;
+                    input.dataset.name = name;
+                    column.append(label, input);
+                    form.appendChild(column);
+                });
+                form.classList.remove('d-none');
+            })
+            .catch(() => {});
+    }
+    
+    // Parameter values that differ from the schema defaults
+    currentParams() {
+        const params = {};
+        if (!this.schema) return params;
+        this.container.querySelectorAll('#simulationParameters [data-name]').forEach(input => {
+            const spec = this.schema[input.dataset.name];
+            let value;
+            if (spec.choices) value = input.value;
+            else if (typeof spec.default === 'boolean') value = input.checked;
+            else value = input.value === '' ? spec.default : Number(input.value);
+            if (value !== spec.default) params[input.dataset.name] = value;
+        });
+        return params;
+    }
+    
+    // Appends the parameters of the last run, so artifacts come from that run
+    withParams(url) {
+        if (!Object.keys(this.runParams).length) return url;
+        const separator = url.includes('?') ? '&' : '?';
+        return url + separator + new URLSearchParams({params: JSON.stringify(this.runParams)});
+    }
+    
+    // Resamples a stored dense solution over [start, stop] without re-running the simulation
+    fetchSolution(name, start, stop, points = 1000) {
+        const params = new URLSearchParams({points: points});
+        if (start !== undefined && start !== null) params.set('start', start);
+        if (stop !== undefined && stop !== null) params.set('stop', stop);
+        const url = this.solutionUrl.replace('__name__', encodeURIComponent(name)) + '?' + params;
+        return fetch(this.withParams(url))
+            .then(response => response.json().then(data => ({ok: response.ok, data: data})))
+            .then(({ok, data}) => {
+                if (!ok) {
+                    throw new Error(data.error || 'Solution not available.');
+                }
+                return data;
+            });
+    }
+    
+    // One chart per state variable of a dense solution. Zooming resamples the
+    // interpolant over the visible window, so even a single cam cycle is drawn
+    // at full resolution instead of from the decimated series.
+    showSolution(parent, name) {
+        this.fetchSolution(name)
+            .then(data => Object.keys(data.series).filter(state => state !== 't').forEach(state => {
+                const chart = new SeriesChart(parent, (start, stop, points) =>
+                    this.fetchSolution(name, start, stop, points).then(samples => ({
+                        title: `${name}: ${state}`,
+                        ylabel: state,
+                        t_min: samples.t_min,
+                        t_max: samples.t_max,
+                        series: [{name: state, label: state, length: samples.series.t.length,
+                                  x: samples.series.t, y: samples.series[state]}]
+                    })));
+                chart.load();
+            }))
+            .catch(error => this.showError('Error loading solution: ' + error.message));
+    }
+    
+    // Fetches a series group decimated to `points` per series over [start, stop]
+    fetchSeries(name, start, stop, points = 1000, method = 'lttb') {
+        const params = new URLSearchParams({points: points, method: method});
+        if (start !== undefined && start !== null) params.set('start', start);
+        if (stop !== undefined && stop !== null) params.set('stop', stop);
+        const url = this.seriesUrl.replace('__name__', encodeURIComponent(name)) + '?' + params;
+        return fetch(this.withParams(url)).then(response => {
+            if (!response.ok) {
+                return response.json().then(data => {
+                    throw new Error(data.error || 'Series not available.');
+                });
+            }
+            return response.arrayBuffer().then(parseSeriesFrame);
+        });
+    }
+    
+    // Shows what the script published besides figures: animations always,
+    // interactive charts only in data mode
+    showArtifacts() {
+        if (!this.resultUrl) return;
+        const chartsDiv = this.container.querySelector('#simulationCharts');
+        const animationsDiv = this.container.querySelector('#simulationAnimations');
+        fetch(this.resultUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (animationsDiv && this.animationUrl) {
+                    (data.animations || []).forEach(name => {
+                        const url = this.animationUrl.replace('__name__', encodeURIComponent(name));
+                        fetch(this.withParams(url))
+                            .then(response => response.json())
+                            .then(meta => new SpritePlayer(animationsDiv, meta))
+                            .catch(error => this.showError('Error loading animation: ' + error.message));
+                    });
+                }
+                if (chartsDiv && this.mode === 'data') {
+                    (data.series || []).forEach(name => {
+                        const chart = new SeriesChart(chartsDiv, (start, stop, points) =>
+                            this.fetchSeries(name, start, stop, points));
+                        chart.load();
+                    });
+                    (data.solutions || []).forEach(name => this.showSolution(chartsDiv, name));
+                }
+            })
+            .catch(error => this.showError('Error loading simulation data: ' + error.message));
+    }
+    
+    follow(eventsUrl) {
+        let started = false;
+        const start = () => {
+            if (!started) {
+                started = true;
+                this.clearResults();
+            }
+        };
+        
+        this.eventSource = new EventSource(eventsUrl);
+        this.eventSource.addEventListener('stdout', event => {
+            start();
+            this.appendOutput(JSON.parse(event.data).line);
+        });
+        this.eventSource.addEventListener('figure', event => {
+            start();
+            this.hideLoading();
+            this.appendPlot(JSON.parse(event.data).plot);
+        });
+        this.eventSource.addEventListener('done', () => {
+            start();
+            this.hideLoading();
+            const outputPre = this.container.querySelector('#simulationOutput');
+            if (outputPre && !outputPre.textContent) {
+                outputPre.textContent = 'Simulation completed successfully.';
+            }
+            this.showArtifacts();
+            this.finish();
+        });
+        this.eventSource.addEventListener('error', event => {
+            // Server-sent 'error' events carry data; connection errors do not
+            if (!event.data && this.eventSource.readyState === EventSource.CONNECTING) {
+                return;  // The browser reconnects and resumes from Last-Event-ID
+            }
+            const message = event.data ? JSON.parse(event.data).value : 'Connection to the simulation lost.';
+            this.finish();
+            this.showError(message || 'Simulation failed.');
+        });
+    }
+}
+
+// Decodes the binary format of /series: uint32 header length, JSON header padded
+// to 4 bytes, then x and y float32 arrays for each series
+function parseSeriesFrame(buffer) {
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    let offset = 4 + headerLength;
+    header.series.forEach(series => {
+        series.x = new Float32Array(buffer, offset, series.length);
+        offset += series.length * 4;
+        series.y = new Float32Array(buffer, offset, series.length);
+        offset += series.length * 4;
+    });
+    return header;
+}
+
+// Minimal canvas line chart; drag to zoom into a time window, double-click to reset.
+// Each zoom fetches the window again, decimated to the chart width.
+class SeriesChart {
+    constructor(parent, fetchWindow) {
+        this.fetchWindow = fetchWindow;
+        this.frame = null;
+        this.window = [null, null];
+        this.colors = ['#0d6efd', '#dc3545', '#198754', '#6f42c1', '#fd7e14'];
+        this.margin = {left: 64, right: 16, top: 28, bottom: 36};
+        
+        const wrapper = document.createElement('div');
+        wrapper.className = 'simulation-chart mb-3';
+        this.canvas = document.createElement('canvas');
+        wrapper.appendChild(this.canvas);
+        parent.appendChild(wrapper);
+        
+        let dragStart = null;
+        this.canvas.addEventListener('mousedown', event => {
+            dragStart = event.offsetX;
+        });
+        this.canvas.addEventListener('mouseup', event => {
+            if (dragStart !== null && Math.abs(event.offsetX - dragStart) > 5) {
+                const a = this.timeAt(Math.min(dragStart, event.offsetX));
+                const b = this.timeAt(Math.max(dragStart, event.offsetX));
+                this.load(a, b);
+            }
+            dragStart = null;
+        });
+        this.canvas.addEventListener('dblclick', () => this.load());
+    }
+    
+    load(start = null, stop = null) {
+        const points = Math.max(Math.round(this.canvas.clientWidth || 800), 100);
+        return this.fetchWindow(start, stop, points).then(frame => {
+            this.frame = frame;
+            this.window = [start === null ? frame.t_min : start, stop === null ? frame.t_max : stop];
+            this.draw();
+        });
+    }
+    
+    timeAt(px) {
+        const [t0, t1] = this.window;
+        const width = this.canvas.clientWidth - this.margin.left - this.margin.right;
+        const fraction = Math.min(Math.max((px - this.margin.left) / width, 0), 1);
+        return t0 + fraction * (t1 - t0);
+    }
+    
+    static ticks(min, max, count = 5) {
+        const step = Math.pow(10, Math.floor(Math.log10((max - min) / count || 1)));
+        const nice = [1, 2, 5, 10].map(f => f * step).find(s => (max - min) / s <= count) || step * 10;
+        const ticks = [];
+        for (let v = Math.ceil(min / nice) * nice; v <= max + nice * 1e-9; v += nice) ticks.push(v);
+        return ticks;
+    }
+    
+    draw() {
+        const ratio = window.devicePixelRatio || 1;
+        const width = this.canvas.clientWidth;
+        const height = this.canvas.clientHeight;
+        this.canvas.width = width * ratio;
+        this.canvas.height = height * ratio;
+        const ctx = this.canvas.getContext('2d');
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+        
+        const m = this.margin;
+        const [t0, t1] = this.window;
+        let yMin = Infinity, yMax = -Infinity;
+        this.frame.series.forEach(series => series.y.forEach((y, i) => {
+            const x = series.x[i];
+            if (x >= t0 && x <= t1 && Number.isFinite(y)) {
+                yMin = Math.min(yMin, y);
+                yMax = Math.max(yMax, y);
+            }
+        }));
+        if (!Number.isFinite(yMin)) { yMin = 0; yMax = 1; }
+        if (yMin === yMax) { yMin -= 1; yMax += 1; }
+        const px = t => m.left + (t - t0) / (t1 - t0) * (width - m.left - m.right);
+        const py = y => height - m.bottom - (y - yMin) / (yMax - yMin) * (height - m.top - m.bottom);
+        
+        // Grid and axis labels
+        ctx.font = '11px sans-serif';
+        ctx.strokeStyle = '#e9ecef';
+        ctx.fillStyle = '#6c757d';
+        ctx.textAlign = 'center';
+        SeriesChart.ticks(t0, t1).forEach(t => {
+            ctx.beginPath(); ctx.moveTo(px(t), m.top); ctx.lineTo(px(t), height - m.bottom); ctx.stroke();
+            ctx.fillText(+t.toPrecision(6), px(t), height - m.bottom + 14);
+        });
+        ctx.textAlign = 'right';
+        SeriesChart.ticks(yMin, yMax).forEach(y => {
+            ctx.beginPath(); ctx.moveTo(m.left, py(y)); ctx.lineTo(width - m.right, py(y)); ctx.stroke();
+            ctx.fillText(+y.toPrecision(6), m.left - 6, py(y) + 4);
+        });
+        ctx.textAlign = 'center';
+        ctx.fillText('Tempo [s]', (m.left + width - m.right) / 2, height - 6);
+        ctx.save();
+        ctx.translate(12, (m.top + height - m.bottom) / 2);
+        ctx.rotate(-Math.PI / 2);
+        ctx.fillText(this.frame.ylabel || '', 0, 0);
+        ctx.restore();
+        ctx.fillStyle = '#212529';
+        ctx.font = 'bold 13px sans-serif';
+        ctx.fillText(this.frame.title || '', width / 2, 16);
+        
+        // Series, clipped to the plot area
+        ctx.save();
+        ctx.beginPath();
+        ctx.rect(m.left, m.top, width - m.left - m.right, height - m.top - m.bottom);
+        ctx.clip();
+        this.frame.series.forEach((series, k) => {
+            ctx.strokeStyle = this.colors[k % this.colors.length];
+            ctx.lineWidth = 1.5;
+            ctx.beginPath();
+            for (let i = 0; i < series.length; i++) {
+                if (i === 0) ctx.moveTo(px(series.x[i]), py(series.y[i]));
+                else ctx.lineTo(px(series.x[i]), py(series.y[i]));
+            }
+            ctx.stroke();
+        });
+        ctx.restore();
+        
+        // Legend
+        ctx.font = '11px sans-serif';
+        ctx.textAlign = 'left';
+        this.frame.series.forEach((series, k) => {
+            ctx.fillStyle = this.colors[k % this.colors.length];
+            ctx.fillRect(m.left + 8, m.top + 6 + k * 14, 10, 3);
+            ctx.fillStyle = '#212529';
+            ctx.fillText(series.label, m.left + 22, m.top + 10 + k * 14);
+        });
+    }
+}
+
+// Plays a pre-rendered animation by cropping one frame at a time out of its
+// sprite sheet; click to pause or resume
+class SpritePlayer {
+    constructor(parent, meta) {
+        this.meta = meta;
+        this.index = 0;
+        this.timer = null;
+        
+        const wrapper = document.createElement('figure');
+        wrapper.className = 'simulation-animation mb-3';
+        this.canvas = document.createElement('canvas');
+        this.canvas.width = meta.frame_width;
+        this.canvas.height = meta.frame_height;
+        this.canvas.title = 'Click to pause or resume';
+        wrapper.appendChild(this.canvas);
+        if (meta.title) {
+            const caption = document.createElement('figcaption');
+            caption.className = 'text-muted small';
+            caption.textContent = meta.title;
+            wrapper.appendChild(caption);
+        }
+        parent.appendChild(wrapper);
+        
+        this.canvas.addEventListener('click', () => this.timer ? this.pause() : this.play());
+        this.sheet = new Image();
+        this.sheet.onload = () => {
+            this.draw();
+            this.play();
+        };
+        this.sheet.src = meta.sheet_url;
+    }
+    
+    draw() {
+        const {columns, frame_width: w, frame_height: h} = this.meta;
+        const ctx = this.canvas.getContext('2d');
+        ctx.clearRect(0, 0, w, h);
+        ctx.drawImage(this.sheet, (this.index % columns) * w, Math.floor(this.index / columns) * h,
+                      w, h, 0, 0, w, h);
+    }
+    
+    play() {
+        this.timer = setInterval(() => {
+            this.index = (this.index + 1) % this.meta.frames;
+            this.draw();
+        }, 1000 / (this.meta.fps || 20));
+    }
+    
+    pause() {
+        clearInterval(this.timer);
+        this.timer = null;
+    }
 }
 
 // Initialize simulation managers on page load
@@ -101,20 +595,27 @@ document.addEventListener('DOMContentLoaded', function() {
     const simulationContainers = document.querySelectorAll('.simulation-section');
     simulationContainers.forEach(container => {
         const manager = new SimulationManager(container.id);
+        manager.loadParameters();
         
         const runButton = container.querySelector('#runSimulationBtn');
+        const dataButton = container.querySelector('#runDataBtn');
         const resetButton = container.querySelector('#resetSimulationBtn');
         
         if (runButton) {
             runButton.addEventListener('click', function() {
-                manager.showLoading();
-                // Simulation run logic would be handled by the template's inline JavaScript
+                manager.run(container.dataset.submitUrl);
+            });
+        }
+        
+        if (dataButton) {
+            dataButton.addEventListener('click', function() {
+                manager.run(container.dataset.submitUrl, 'data');
             });
         }
         
         if (resetButton) {
             resetButton.addEventListener('click', function() {
-                manager.showResults({output: '', plots: []});
+                container.querySelector('#simulationResults').classList.add('d-none');
             });
         }
     });
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# I test importano simkit e app dalla radice del repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,94 @@
+import gzip
+import importlib
+
+import pytest
+
+from simkit.httpcache import MIN_COMPRESS_BYTES
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    cache = tmp_path_factory.mktemp('cache')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('SEARCH_INDEX_PATH', str(cache / 'search.sqlite3'))
+        mp.setenv('SIMULATION_CACHE_DIR', str(cache / 'simulations'))
+        mp.setenv('SIMULATION_FIGURE_DIR', str(cache / 'figures'))
+        mp.setenv('SIMULATION_CELL_CACHE_DIR', str(cache / 'cells'))
+        yield importlib.import_module('app')
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'page.txt'
+    path.write_text('source')
+    return path
+
+
+def respond(app_module, source, body, headers=None):
+    """Chiama conditional_response per un file sorgente e conta i render"""
+    renders = []
+
+    def render():
+        renders.append(1)
+        return body
+    with app_module.app.test_request_context('/page', headers=headers or {}):
+        response = app_module.conditional_response([str(source)], render, mimetype='text/css')
+    return response, len(renders)
+
+
+def test_large_body_is_compressed_with_the_negotiated_encoding(app_module, source):
+    body = 'a { color: red; }\n' * 100
+    response, renders = respond(app_module, source, body, {'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200 and renders == 1
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_etag()[0].endswith('-gzip')
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == body.encode('utf-8')
+
+
+def test_small_body_is_sent_uncompressed(app_module, source):
+    body = 'x' * (MIN_COMPRESS_BYTES - 1)
+    response, _ = respond(app_module, source, body, {'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert not response.get_etag()[0].endswith('-gzip')
+    assert response.get_data(as_text=True) == body
+
+
+@pytest.mark.parametrize('size', [MIN_COMPRESS_BYTES - 1, MIN_COMPRESS_BYTES * 4])
+def test_matching_etag_gets_304_without_rendering(app_module, source, size):
+    headers = {'Accept-Encoding': 'gzip'}
+    first, _ = respond(app_module, source, 'x' * size, headers)
+    etag = first.get_etag()[0]
+    response, renders = respond(app_module, source, 'x' * size, dict(headers, **{'If-None-Match': f'"{etag}"'}))
+    assert response.status_code == 304 and renders == 0
+    assert response.get_etag()[0] == etag
+    assert response.get_data() == b''
+
+
+def test_if_modified_since_gets_304(app_module, source):
+    first, _ = respond(app_module, source, 'body')
+    response, renders = respond(app_module, source, 'body',
+                                {'If-Modified-Since': first.headers['Last-Modified']})
+    assert response.status_code == 304 and renders == 0
+
+
+def test_changed_source_invalidates_the_etag(app_module, source):
+    first, _ = respond(app_module, source, 'body')
+    source.write_text('changed source')
+    response, renders = respond(app_module, source, 'body', {'If-None-Match': f'"{first.get_etag()[0]}"'})
+    assert response.status_code == 200 and renders == 1
+
+
+def test_static_css_has_validators_and_missing_files_get_the_stock_404(app_module):
+    client = app_module.app.test_client()
+    response = client.get('/static/css/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] and response.headers['Last-Modified']
+    revalidated = client.get('/static/css/style.css', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    missing = client.get('/static/css/missing.css')
+    assert missing.status_code == 404
+    assert missing.mimetype == 'text/html'
@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from simkit.executor import SimulationError
+from simkit.figures import FigureStore
+from simkit.jobs import AdmissionError, JobManager
+
+
+class FakeExecutor:
+    """Executor che completa le esecuzioni solo quando ``release`` è impostato"""
+
+    max_workers = 1
+    figure_formats = ('png',)
+    figure_dpi = 100
+
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.error = error
+        self.calls = []
+
+    def mp_context(self):
+        return multiprocessing.get_context()
+
+    def run(self, simulation_path, channel=None, figure_formats=None, params=None):
+        self.calls.append((simulation_path, params))
+        self.release.wait(10)
+        if self.error:
+            raise SimulationError(self.error)
+        return {'output': 'ok', 'figures': [], 'trace': {'started': time.time(), 'phases': {}}}
+
+
+@pytest.fixture
+def executor():
+    return FakeExecutor()
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    managers = []
+
+    def make(executor, **kwargs):
+        manager = JobManager(executor, FigureStore(tmp_path / 'figures'), **kwargs)
+        managers.append(manager)
+        return manager
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_identical_requests_attach_to_the_running_job(executor, make_manager):
+    manager = make_manager(executor)
+    job = manager.submit('a.py', params={'tau_m': 1.0}, client='x')
+    assert manager.submit('a.py', params={'tau_m': 1.0}, client='x') is job
+    assert manager.coalesced == 1
+    executor.release.set()
+    assert job.wait(10) and job.error is None
+    assert len(executor.calls) == 1
+    assert manager.inflight == 0
+
+
+def test_different_parameters_start_separate_jobs(executor, make_manager):
+    manager = make_manager(executor, max_per_client=4)
+    first = manager.submit('a.py', params={'tau_m': 1.0})
+    second = manager.submit('a.py', params={'tau_m': 2.0})
+    assert first is not second
+    assert manager.inflight == 2
+    executor.release.set()
+    assert first.wait(10) and second.wait(10)
+
+
+def test_rejects_new_runs_beyond_max_pending(executor, make_manager):
+    manager = make_manager(executor, max_pending=2)
+    manager.submit('a.py')
+    manager.submit('b.py')
+    with pytest.raises(AdmissionError) as excinfo:
+        manager.submit('c.py')
+    assert excinfo.value.retry_after >= 1
+    assert manager.rejected == 1
+    # Una richiesta identica a un job in corso non occupa un posto
+    manager.submit('a.py')
+    assert manager.coalesced == 1
+    executor.release.set()
+
+
+def test_limits_runs_per_client(executor, make_manager):
+    manager = make_manager(executor, max_per_client=1)
+    job = manager.submit('a.py', client='x')
+    with pytest.raises(AdmissionError, match='this client'):
+        manager.submit('b.py', client='x')
+    manager.submit('b.py', client='y')
+    executor.release.set()
+    assert job.wait(10)
+    # Concluso il job, il client può avviarne un altro
+    assert manager.submit('c.py', client='x').wait(10)
+
+
+def test_failed_run_releases_its_slot(make_manager):
+    executor = FakeExecutor(error='boom')
+    manager = make_manager(executor, max_pending=1)
+    job = manager.submit('a.py', client='x')
+    executor.release.set()
+    assert job.wait(10)
+    assert job.error == 'boom'
+    assert manager.inflight == 0
+    assert manager.submit('b.py', client='x').wait(10)
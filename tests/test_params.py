@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from simkit import params
+
+SIMULATION = Path(__file__).resolve().parent.parent / 'projects' / 'US6758109' / 'US6758109_sim.py'
+
+SCHEMA = {
+    'tau_m': {'default': 0.5, 'min': 0.05, 'max': 5.0},
+    'steps': {'default': 100, 'min': 1},
+    'dense': {'default': False},
+    'method': {'default': 'RK45', 'choices': ['RK45', 'Radau']},
+}
+
+
+def test_validate_keeps_only_values_that_differ_from_the_default():
+    overrides = {'tau_m': 1, 'steps': 100.0, 'dense': True, 'method': 'RK45'}
+    assert params.validate(SCHEMA, overrides) == {'dense': True, 'tau_m': 1.0}
+
+
+def test_validate_coerces_to_the_type_of_the_default():
+    validated = params.validate(SCHEMA, {'tau_m': 2, 'steps': 20.0})
+    assert type(validated['tau_m']) is float
+    assert type(validated['steps']) is int
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'unknown': 1}, 'Unknown parameters'),
+    ({'tau_m': 0.01}, 'at least'),
+    ({'tau_m': 6.0}, 'at most'),
+    ({'tau_m': float('nan')}, 'finite number'),
+    ({'tau_m': '1.0'}, 'finite number'),
+    ({'tau_m': True}, 'finite number'),
+    ({'steps': 2.5}, 'integer'),
+    ({'dense': 1}, 'true or false'),
+    ({'method': 'Euler'}, 'one of'),
+])
+def test_validate_rejects_invalid_overrides(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        params.validate(SCHEMA, overrides)
+
+
+def test_validate_rejects_non_objects():
+    with pytest.raises(ValueError, match='JSON object'):
+        params.validate(SCHEMA, [('tau_m', 1.0)])
+
+
+def test_resolve_applies_overrides_to_the_defaults():
+    resolved = params.resolve(SCHEMA, {'tau_m': 1.0})
+    assert resolved == {'tau_m': 1.0, 'steps': 100, 'dense': False, 'method': 'RK45'}
+
+
+def test_project_schema_rejects_zero_drum_damping():
+    # Senza attrito viscoso del tamburo non esiste un regime periodico
+    schema = params.read_schema(SIMULATION)
+    with pytest.raises(ValueError, match="'b_d' must be at least"):
+        params.validate(schema, {'b_d': 0.0})
+    assert params.validate(schema, {'b_d': schema['b_d']['min']}) == {'b_d': schema['b_d']['min']}
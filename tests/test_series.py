@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from simkit.series import SeriesSet, lttb
+
+
+@pytest.fixture
+def curve():
+    x = np.linspace(0, 10, 101)
+    return x, np.sin(x)
+
+
+@pytest.mark.parametrize('n_out', [101, 150])
+def test_lttb_keeps_every_point_when_not_decimating(curve, n_out):
+    x, y = curve
+    assert np.array_equal(lttb(x, y, n_out), np.arange(len(x)))
+
+
+def test_lttb_two_points_keeps_the_ends(curve):
+    x, y = curve
+    assert lttb(x, y, 2).tolist() == [0, len(x) - 1]
+
+
+@pytest.mark.parametrize('n_out', [3, 4, 10, 100])
+def test_lttb_selects_n_out_increasing_indices(curve, n_out):
+    x, y = curve
+    indices = lttb(x, y, n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_window_with_two_points_returns_two_points(curve):
+    x, y = curve
+    series = SeriesSet(x, {'y': y}, 'title', 'ylabel', {})
+    ((name, wx, wy),) = series.window(points=2)
+    assert name == 'y'
+    assert wx.tolist() == [x[0], x[-1]]
+    assert wy.tolist() == [y[0], y[-1]]
+
+
+@pytest.mark.parametrize('points', [1, 20001])
+def test_window_rejects_points_out_of_range(curve, points):
+    x, y = curve
+    with pytest.raises(ValueError):
+        SeriesSet(x, {'y': y}, 'title', 'ylabel', {}).window(points=points)